@@ -0,0 +1,148 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Avg, Count, Q
+
+from courses.enrollment import count_students
+from courses.models import Course, Enrollment
+from elearning.cache import get_region
+from quizzes.models import Quiz, QuizAttempt
+
+CACHE_KEY = 'accounts:dashboard:{user_id}'
+CATALOG_KEY = 'accounts:dashboard:catalog'
+
+region = get_region('dashboards')
+
+
+def _percentage(completed, total):
+    """Completion percentage rounded to one decimal place"""
+    return round((completed / total * 100) if total > 0 else 0, 1)
+
+
+def build_course_catalog():
+    """Published courses with their instructors and quiz totals, shared by every student"""
+    return list(
+        Course.objects.filter(is_published=True)
+        .select_related('instructor')
+        .annotate(quiz_total=Count('quizzes', distinct=True))
+    )
+
+
+def get_course_catalog():
+    return region.get_or_set(CATALOG_KEY, build_course_catalog)
+
+
+def build_student_dashboard(user):
+    """
+    Build the cacheable, per-student part of the student dashboard.
+
+    Only the student's own rows are read here, each with one aggregate
+    query, so course and quiz edits do not invalidate every student's
+    dashboard; the shared course catalog is combined with it on read.
+    """
+    # Completed quizzes per course for this student
+    completed_by_course = dict(
+        QuizAttempt.objects.filter(student=user, is_completed=True)
+        .values_list('quiz__course')
+        .annotate(completed=Count('id'))
+    )
+    stored_enrollments = {
+        enrollment.course_id: enrollment
+        for enrollment in Enrollment.objects.filter(student=user)
+    }
+
+    attempt_stats = QuizAttempt.objects.filter(student=user).aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(is_completed=True)),
+        average=Avg('score', filter=Q(is_completed=True)),
+    )
+
+    dashboard = {
+        'completed_by_course': completed_by_course,
+        'stored_enrollments': stored_enrollments,
+        'quiz_attempts': attempt_stats['total'],
+        'average_quiz_score': round(attempt_stats['average'] or 0, 1),
+    }
+    if attempt_stats['completed']:
+        dashboard['latest_quiz_attempt'] = (
+            QuizAttempt.objects.filter(student=user, is_completed=True)
+            .select_related('quiz')
+            .order_by('-completed_at')
+            .first()
+        )
+    return dashboard
+
+
+def get_student_dashboard(user):
+    """Student dashboard context; unread recommendations are always read fresh"""
+    dashboard = dict(region.get_or_set(
+        CACHE_KEY.format(user_id=user.pk), lambda: build_student_dashboard(user)
+    ))
+    completed_by_course = dashboard.pop('completed_by_course')
+    stored_enrollments = dashboard.pop('stored_enrollments')
+
+    # All students are enrolled in every published course; courses without
+    # a stored enrollment get an unsaved one instead of a write on read
+    enrolled_courses = []
+    for course in get_course_catalog():
+        enrollment = stored_enrollments.get(course.id) or Enrollment(student=user, course=course)
+        enrollment.course = course
+        completed = completed_by_course.get(course.id, 0)
+        enrollment.quiz_progress = {
+            'total': course.quiz_total,
+            'completed': completed,
+            'percentage': _percentage(completed, course.quiz_total),
+        }
+        enrolled_courses.append(enrollment)
+
+    context = dict(dashboard, enrolled_courses=enrolled_courses)
+    context['recommendations'] = user.learning_recommendations.filter(is_read=False)[:5]
+    return context
+
+
+def build_teacher_dashboard(user):
+    """
+    Build the teacher dashboard context.
+
+    Student counts are computed for all courses at once instead of being
+    counted once per row in the template.
+    """
+    User = get_user_model()
+    students = User.objects.filter(user_type='student')
+    courses = list(user.courses_taught.all())
+    student_counts = count_students({course.id: course.is_published for course in courses})
+    for course in courses:
+        course.student_count = student_counts[course.id]
+
+    # Published courses enroll every student by policy, so stored rows only
+    # matter for unpublished ones
+    published = [course for course in courses if course.is_published]
+    if published:
+        total_students = published[0].student_count
+    else:
+        total_students = students.filter(
+            enrollments__course__instructor=user
+        ).distinct().count()
+
+    published_quizzes = Quiz.objects.filter(
+        course__instructor=user,
+        is_published=True
+    ).count()
+
+    return {
+        'courses_taught': courses,
+        'total_students': total_students,
+        'published_quizzes': published_quizzes,
+    }
+
+
+def get_teacher_dashboard(user):
+    """Teacher dashboard context, cached per teacher"""
+    return region.get_or_set(CACHE_KEY.format(user_id=user.pk), lambda: build_teacher_dashboard(user))
+
+
+def invalidate_dashboard(user_id):
+    region.delete(CACHE_KEY.format(user_id=user_id))
+
+
+def invalidate_course_catalog():
+    """Course or quiz changes show up on every student's dashboard"""
+    region.delete(CATALOG_KEY)
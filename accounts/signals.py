@@ -0,0 +1,52 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from courses.models import Course, Enrollment
+from quizzes.models import Quiz, QuizAttempt
+from .dashboard import invalidate_course_catalog, invalidate_dashboard
+from .models import CustomUser
+
+
+def _invalidate_instructors(course_ids=None):
+    """Drop the dashboards of instructors of published (or the given) courses"""
+    courses = Course.objects.filter(is_published=True) if course_ids is None else Course.objects.filter(pk__in=course_ids)
+    for instructor_id in courses.values_list('instructor_id', flat=True).distinct():
+        invalidate_dashboard(instructor_id)
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_changed(sender, instance, created=None, update_fields=None, **kwargs):
+    """New or removed students change the totals of teachers with published courses"""
+    # post_delete passes no ``created``
+    if instance.user_type == 'student' and created is not False:
+        _invalidate_instructors()
+    if update_fields is None or 'user_type' in update_fields:
+        # Logins only touch last_login, which no dashboard shows
+        invalidate_dashboard(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_changed(sender, instance, **kwargs):
+    """Students see the published catalog; the instructor their own courses"""
+    invalidate_course_catalog()
+    invalidate_dashboard(instance.instructor_id)
+
+
+@receiver([post_save, post_delete], sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    invalidate_course_catalog()
+    _invalidate_instructors([instance.course_id])
+
+
+@receiver([post_save, post_delete], sender=QuizAttempt)
+def attempt_changed(sender, instance, **kwargs):
+    invalidate_dashboard(instance.student_id)
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    """Stored enrollments feed the instructor's student counts"""
+    invalidate_dashboard(instance.student_id)
+    instructor_id = Course.objects.filter(pk=instance.course_id).values_list('instructor_id', flat=True).first()
+    if instructor_id is not None:
+        invalidate_dashboard(instructor_id)
@@ -1,3 +1,103 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from courses.models import Course, Enrollment
+from elearning.cache import clear_regions
+from quizzes.models import Quiz, QuizAttempt
+from .dashboard import CACHE_KEY, region
+from .models import CustomUser
+
+
+class DashboardQueryCountTests(TestCase):
+    """The dashboard must not issue queries per course"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = CustomUser.objects.create_user(
+            username='teacher', email='teacher@example.com', password='pass', user_type='teacher'
+        )
+        cls.student = CustomUser.objects.create_user(
+            username='student', email='student@example.com', password='pass'
+        )
+
+    def setUp(self):
+        clear_regions()
+
+    def add_courses(self, count):
+        for _ in range(count):
+            index = Course.objects.count()
+            course = Course.objects.create(
+                title=f'Course {index}',
+                instructor=self.teacher,
+                overview='Overview',
+                is_published=True
+            )
+            quiz = Quiz.objects.create(title=f'Quiz {index}', course=course, is_published=True)
+            QuizAttempt.objects.create(quiz=quiz, student=self.student, score=50, is_completed=True)
+
+    def count_dashboard_queries(self, user):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_student_query_count_is_constant(self):
+        self.add_courses(2)
+        small = self.count_dashboard_queries(self.student)
+        self.add_courses(8)
+        large = self.count_dashboard_queries(self.student)
+        self.assertEqual(small, large)
+
+    def test_student_progress_values(self):
+        self.add_courses(3)
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('dashboard'))
+        enrollments = response.context['enrolled_courses']
+        self.assertEqual(len(enrollments), 3)
+        for enrollment in enrollments:
+            self.assertEqual(enrollment.quiz_progress, {'total': 1, 'completed': 1, 'percentage': 100.0})
+        self.assertEqual(response.context['average_quiz_score'], 50)
+        # Enrollment is a read-time policy; viewing the dashboard writes nothing
+        self.assertFalse(Enrollment.objects.exists())
+
+    def test_teacher_query_count_is_constant(self):
+        self.add_courses(2)
+        small = self.count_dashboard_queries(self.teacher)
+        self.add_courses(8)
+        large = self.count_dashboard_queries(self.teacher)
+        self.assertEqual(small, large)
+
+    def test_dashboard_is_cached_until_an_attempt_changes(self):
+        self.add_courses(2)
+        first = self.count_dashboard_queries(self.student)
+        cached = self.count_dashboard_queries(self.student)
+        self.assertLess(cached, first)
+
+        attempt = QuizAttempt.objects.first()
+        attempt.score = 80
+        attempt.save()
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['average_quiz_score'], 65)
+
+    def test_new_students_refresh_teacher_totals(self):
+        self.add_courses(1)
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.get(reverse('dashboard')).context['total_students'], 1)
+        CustomUser.objects.create_user(username='other', email='other@example.com')
+        self.assertEqual(self.client.get(reverse('dashboard')).context['total_students'], 2)
+
+    def test_catalog_changes_keep_other_dashboards(self):
+        self.add_courses(1)
+        other = CustomUser.objects.create_user(username='other', email='other@example.com')
+        for user in (self.student, other):
+            self.count_dashboard_queries(user)
+
+        Course.objects.create(title='New', instructor=self.teacher, overview='Overview', is_published=True)
+        # Per-student entries survive; the shared catalog is rebuilt
+        self.assertIsNotNone(region.get(CACHE_KEY.format(user_id=other.id)))
+        self.client.force_login(other)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(len(response.context['enrolled_courses']), 2)
@@ -8,6 +8,7 @@ from django.utils.translation import gettext_lazy as _
 from django.db.models import Count
 
 from .forms import UserProfileForm, TeacherProfileForm, StudentProfileForm
+from .dashboard import get_student_dashboard, get_teacher_dashboard
 from quizzes.models import QuizAttempt, Quiz
 from courses.models import Course, Enrollment
 
@@ -58,81 +59,8 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         user = self.request.user
         
         if user.is_student():
-            # Get courses the student is enrolled in
-            # Get all published courses first
-            all_courses = Course.objects.filter(is_published=True)
-            enrollments = []
-            
-            # Ensure enrollment records exist for all courses and build the enrollment list
-            for course in all_courses:
-                enrollment, created = Enrollment.objects.get_or_create(
-                    student=user,
-                    course=course
-                )
-                
-                # Calculate quiz completion progress
-                total_quizzes = course.quizzes.count()
-                completed_quizzes = QuizAttempt.objects.filter(
-                    quiz__course=course,
-                    student=user,
-                    is_completed=True
-                ).count()
-                
-                enrollment.quiz_progress = {
-                    'total': total_quizzes,
-                    'completed': completed_quizzes,
-                    'percentage': round((completed_quizzes / total_quizzes * 100) if total_quizzes > 0 else 0, 1)
-                }
-                
-                enrollments.append(enrollment)
-            
-            context['enrolled_courses'] = enrollments
-            
-            # Get quiz attempts count
-            context['quiz_attempts'] = getattr(user, 'quiz_attempts', []).count() if hasattr(user, 'quiz_attempts') else 0
-            # Get learning recommendations
-            context['recommendations'] = getattr(user, 'learning_recommendations', []).filter(is_read=False)[:5] if hasattr(user, 'learning_recommendations') else []
-            
-            # Get average quiz score
-            try:
-                quiz_attempts = QuizAttempt.objects.filter(student=user, is_completed=True)
-                if quiz_attempts.exists():
-                    total_score = sum(attempt.score for attempt in quiz_attempts)
-                    average_score = total_score / quiz_attempts.count()
-                    context['average_quiz_score'] = round(average_score, 1)
-                    # Get latest quiz attempt
-                    context['latest_quiz_attempt'] = quiz_attempts.order_by('-completed_at').first()
-                else:
-                    context['average_quiz_score'] = 0
-            except Exception as e:
-                context['average_quiz_score'] = 0
-                print(f"Error calculating quiz scores: {e}")
-            
+            context.update(get_student_dashboard(user))
         elif user.is_teacher():
-            # Get courses taught by the teacher
-            # Ensure courses_taught is a QuerySet
-            courses = user.courses_taught.all()
-            context['courses_taught'] = courses
-            
-            # Get total number of unique students across all courses (using distinct)
-            User = get_user_model()
-            
-            # Get students enrolled in any of the teacher's courses
-            total_students = User.objects.filter(
-                enrollments__course__in=courses,
-                user_type='student'
-            ).distinct().count()
-            
-            context['total_students'] = total_students
-            
-            # Get number of published quizzes
-            try:
-                published_quizzes = Quiz.objects.filter(
-                    course__instructor=user,
-                    is_published=True
-                ).count()
-            except:
-                published_quizzes = 0
-            context['published_quizzes'] = published_quizzes
+            context.update(get_teacher_dashboard(user))
             
         return context
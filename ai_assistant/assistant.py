@@ -0,0 +1,34 @@
+import openai
+from django.conf import settings
+
+from .models import OpenAISettings
+
+SYSTEM_PROMPT = "You are a friendly learning assistant, focused on helping students answer learning questions."
+
+
+class AssistantNotConfigured(Exception):
+    """No OpenAI API key in the database or settings"""
+
+
+def get_api_key():
+    # First try to get API key from database, then from settings
+    return OpenAISettings.get_active_key() or settings.OPENAI_API_KEY
+
+
+def ask_assistant(query):
+    """Send one question to the OpenAI chat API and return the answer text"""
+    api_key = get_api_key()
+    if not api_key:
+        raise AssistantNotConfigured()
+
+    client = openai.OpenAI(api_key=api_key)
+    response = client.chat.completions.create(
+        model="gpt-3.5-turbo",  # Use default model
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": query}
+        ],
+        max_tokens=500,
+        temperature=0.7,
+    )
+    return response.choices[0].message.content
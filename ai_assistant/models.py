@@ -161,8 +161,8 @@ class LearningProgress(models.Model):
     
     def mark_as_completed(self):
         """Mark course as completed"""
-        from courses.models import Enrollment
-        enrollment = Enrollment.objects.get(student=self.user, course=self.course)
+        from courses.enrollment import materialize_enrollment
+        enrollment = materialize_enrollment(self.user, self.course)
         enrollment.is_completed = True
         enrollment.save()
 
@@ -0,0 +1,18 @@
+import openai
+
+from jobs.registry import PermanentFailure, task
+from .assistant import AssistantNotConfigured, ask_assistant
+from .models import UserQuery
+
+
+@task('ai_assistant.answer_query', queue='ai', max_attempts=4, concurrency=4, retry_delay=10)
+def answer_query(query, user_id=None):
+    """Answer a question outside the request; connection and rate limit errors are retried"""
+    try:
+        response = ask_assistant(query)
+    except (AssistantNotConfigured, openai.AuthenticationError) as e:
+        raise PermanentFailure(str(e) or 'OpenAI API key is not configured')
+
+    if user_id:
+        UserQuery.objects.create(user_id=user_id, query=query, response=response)
+    return {'response': response}
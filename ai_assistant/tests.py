@@ -1,3 +1,37 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from jobs.models import Job
+
+
+@override_settings(OPENAI_API_KEY='test-key')
+class AsyncQueryTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='student', email='student@example.com')
+
+    def post(self, data):
+        return self.client.post(reverse('ai_assistant:ai_query_api'), json.dumps(data), content_type='application/json')
+
+    def test_query_is_queued(self):
+        self.client.force_login(self.user)
+        response = self.post({'query': 'What is a list?'})
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(id=response.json()['job_id'])
+        self.assertEqual(job.name, 'ai_assistant.answer_query')
+        self.assertEqual(job.payload, {'query': 'What is a list?', 'user_id': self.user.id})
+        self.assertEqual(job.created_by, self.user)
+        self.assertEqual(response.json()['status_url'], reverse('jobs:job_status', args=[job.id]))
+        # The chat page polls the status URL instead of waiting on the request
+        self.assertContains(self.client.get(reverse('ai_assistant:home')), 'js/job_status.js')
+
+    def test_rejected_requests_queue_nothing(self):
+        self.assertEqual(self.post({'query': 'What is a list?'}).status_code, 401)
+        self.client.force_login(self.user)
+        self.assertEqual(self.post({'query': ''}).status_code, 400)
+        with override_settings(OPENAI_API_KEY=''), self.assertLogs('ai_assistant.views', 'ERROR'):
+            self.assertEqual(self.post({'query': 'What is a list?'}).status_code, 500)
+        self.assertFalse(Job.objects.exists())
@@ -0,0 +1,199 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from courses.models import Chapter, Course, Enrollment, Lesson, LessonProgress
+from elearning.cache import clear_regions
+from forum.models import DiscussionBoard, Post
+from quizzes.models import Choice, Question, Quiz, QuizAttempt, StudentAnswer
+
+BATCH_SIZE = 1000
+
+
+class DatasetSpec:
+    """
+    Sizes of a generated dataset.
+
+    ``activity`` is the share of (student, lesson) and (student, quiz)
+    pairs with stored progress or a completed attempt.
+    """
+
+    FIELDS = (
+        'courses', 'chapters', 'lessons', 'students', 'quizzes',
+        'questions', 'choices', 'posts', 'activity',
+    )
+
+    def __init__(self, courses=5, chapters=3, lessons=4, students=50, quizzes=2,
+                 questions=10, choices=4, posts=20, activity=0.5):
+        self.courses = courses
+        self.chapters = chapters
+        self.lessons = lessons
+        self.students = students
+        self.quizzes = quizzes
+        self.questions = questions
+        self.choices = choices
+        self.posts = posts
+        self.activity = activity
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+# Chapters, lessons, quizzes, questions, choices and posts are per parent
+PRESETS = {
+    'tiny': DatasetSpec(courses=2, chapters=2, lessons=2, students=5, quizzes=1, questions=3, posts=3),
+    'small': DatasetSpec(),
+    'medium': DatasetSpec(courses=20, chapters=5, lessons=6, students=500, quizzes=3, questions=20, posts=100),
+}
+
+
+class Dataset:
+    """Ids of the generated rows the benchmark scenarios need"""
+
+    def __init__(self, teacher, students, courses, lessons, quizzes, boards):
+        self.teacher = teacher
+        self.students = students
+        self.courses = courses
+        self.lessons = lessons
+        self.quizzes = quizzes
+        self.boards = boards
+
+    @property
+    def student(self):
+        return self.students[0]
+
+
+def build_dataset(spec, seed=0):
+    """
+    Create a dataset of the given size with bulk inserts.
+
+    The same spec and seed always produce the same rows. bulk_create skips
+    model signals, so every cache region is cleared afterwards.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password('benchmark')
+
+    teacher = CustomUser.objects.create(
+        username='bench-teacher', email='bench-teacher@example.com',
+        user_type='teacher', password=password
+    )
+    CustomUser.objects.bulk_create([
+        CustomUser(
+            username=f'bench-student-{number}', email=f'bench-student-{number}@example.com',
+            user_type='student', password=password
+        )
+        for number in range(spec.students)
+    ], batch_size=BATCH_SIZE)
+    students = list(CustomUser.objects.filter(username__startswith='bench-student-').order_by('id'))
+
+    Course.objects.bulk_create([
+        Course(
+            title=f'Benchmark Course {number}', slug=f'benchmark-course-{number}',
+            instructor=teacher, overview='Benchmark course', is_published=True
+        )
+        for number in range(spec.courses)
+    ])
+    courses = list(Course.objects.filter(instructor=teacher).order_by('id'))
+    DiscussionBoard.objects.bulk_create([
+        DiscussionBoard(course=course, description=f'Discussion board for {course.title} course')
+        for course in courses
+    ])
+    Enrollment.objects.bulk_create([
+        Enrollment(student=student, course=course) for course in courses for student in students
+    ], batch_size=BATCH_SIZE)
+
+    Chapter.objects.bulk_create([
+        Chapter(course=course, title=f'Chapter {number}', order=number)
+        for course in courses for number in range(1, spec.chapters + 1)
+    ], batch_size=BATCH_SIZE)
+    chapters = list(Chapter.objects.filter(course__in=courses).order_by('id'))
+    Lesson.objects.bulk_create([
+        Lesson(
+            chapter=chapter, title=f'Lesson {number}', video='lesson_videos/benchmark.mp4',
+            duration=rng.randint(300, 1800), order=number
+        )
+        for chapter in chapters for number in range(1, spec.lessons + 1)
+    ], batch_size=BATCH_SIZE)
+    lessons = list(Lesson.objects.filter(chapter__in=chapters).select_related('chapter__course').order_by('id'))
+    LessonProgress.objects.bulk_create([
+        LessonProgress(
+            student=student, lesson=lesson,
+            current_position=rng.randint(0, lesson.duration), is_completed=rng.random() < 0.5
+        )
+        for student in students for lesson in lessons if rng.random() < spec.activity
+    ], batch_size=BATCH_SIZE)
+
+    Quiz.objects.bulk_create([
+        Quiz(title=f'Quiz {number}', course=course, is_published=True, time_limit=0)
+        for course in courses for number in range(1, spec.quizzes + 1)
+    ])
+    quizzes = list(Quiz.objects.filter(course__in=courses).order_by('id'))
+    Question.objects.bulk_create([
+        Question(quiz=quiz, question_number=number, question_text=f'Question {number}')
+        for quiz in quizzes for number in range(1, spec.questions + 1)
+    ], batch_size=BATCH_SIZE)
+    questions = list(Question.objects.filter(quiz__in=quizzes).order_by('id'))
+    correct = {question.id: rng.randint(1, spec.choices) for question in questions}
+    Choice.objects.bulk_create([
+        Choice(
+            question=question, choice_number=number, choice_text=f'Choice {number}',
+            is_correct=number == correct[question.id]
+        )
+        for question in questions for number in range(1, spec.choices + 1)
+    ], batch_size=BATCH_SIZE)
+    _create_attempts(rng, spec, students, quizzes, now)
+
+    boards = list(DiscussionBoard.objects.filter(course__in=courses).order_by('id'))
+    Post.objects.bulk_create([
+        Post(
+            board=board, author=rng.choice(students), title=f'Post {number}',
+            content='Benchmark post', views=rng.randint(0, 100)
+        )
+        for board in boards for number in range(spec.posts)
+    ], batch_size=BATCH_SIZE)
+
+    clear_regions()
+    return Dataset(
+        teacher=teacher,
+        students=students,
+        courses=courses,
+        lessons=lessons,
+        quizzes=quizzes,
+        boards=boards,
+    )
+
+
+def _create_attempts(rng, spec, students, quizzes, now):
+    choices = {}
+    for question_id, quiz_id, choice_id, is_correct in Choice.objects.filter(
+        question__quiz__in=quizzes
+    ).order_by('id').values_list('question_id', 'question__quiz_id', 'id', 'is_correct'):
+        choices.setdefault(quiz_id, {}).setdefault(question_id, []).append((choice_id, is_correct))
+
+    # The first student keeps every quiz open for the quiz scenario
+    pairs = [
+        (student, quiz) for student in students[1:] for quiz in quizzes
+        if rng.random() < spec.activity
+    ]
+    answers = {}
+    attempts = []
+    for student, quiz in pairs:
+        picked = [
+            (question_id, rng.choice(options)) for question_id, options in choices.get(quiz.id, {}).items()
+        ]
+        score = sum(1 for _, (_, is_correct) in picked if is_correct) / len(picked) * 100 if picked else 0
+        attempt = QuizAttempt(
+            quiz=quiz, student=student, score=score, is_completed=True, completed_at=now
+        )
+        answers[(student.id, quiz.id)] = picked
+        attempts.append(attempt)
+    QuizAttempt.objects.bulk_create(attempts, batch_size=BATCH_SIZE)
+
+    StudentAnswer.objects.bulk_create([
+        StudentAnswer(attempt=attempt, question_id=question_id, selected_choice_id=choice_id)
+        for attempt in attempts
+        for question_id, (choice_id, _) in answers[(attempt.student_id, attempt.quiz_id)]
+    ], batch_size=BATCH_SIZE)
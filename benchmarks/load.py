@@ -0,0 +1,408 @@
+import math
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from courses.models import Chapter, Course, Enrollment, Lesson, LessonProgress
+from elearning.cache import clear_regions
+from forum.models import Comment, DiscussionBoard, Post
+from quizzes.models import Choice, Question, Quiz, QuizAttempt, StudentAnswer
+
+# Rows written per bulk_create call or executemany transaction
+CHUNK_SIZE = 20000
+
+
+class Distribution:
+    """
+    A random distribution written as ``kind:param,param``.
+
+        fixed:4         always 4
+        uniform:1,5     evenly between 1 and 5
+        poisson:3       Poisson with mean 3
+        pareto:1.5,10   long tail with shape 1.5 and minimum 10
+        beta:2,5        between 0 and 1, for rates and shares
+        normal:60,15    normal with mean 60 and deviation 15
+    """
+
+    KINDS = {'fixed': 1, 'uniform': 2, 'poisson': 1, 'pareto': 2, 'beta': 2, 'normal': 2}
+
+    def __init__(self, kind, params):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown distribution {kind!r}, expected one of {', '.join(self.KINDS)}")
+        if len(params) != self.KINDS[kind] and not (kind == 'pareto' and len(params) == 1):
+            raise ValueError(f"{kind} takes {self.KINDS[kind]} parameters")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, text):
+        kind, _, params = text.partition(':')
+        try:
+            values = [float(value) for value in params.split(',')] if params else []
+        except ValueError:
+            raise ValueError(f"Invalid distribution {text!r}")
+        return cls(kind.strip(), values)
+
+    def __str__(self):
+        return f"{self.kind}:{','.join(f'{value:g}' for value in self.params)}"
+
+    def sample(self, rng):
+        params = self.params
+        if self.kind == 'fixed':
+            return params[0]
+        if self.kind == 'uniform':
+            return rng.uniform(params[0], params[1])
+        if self.kind == 'poisson':
+            return _poisson(rng, params[0])
+        if self.kind == 'pareto':
+            scale = params[1] if len(params) > 1 else 1
+            return scale * rng.paretovariate(params[0])
+        if self.kind == 'beta':
+            return rng.betavariate(params[0], params[1])
+        return rng.normalvariate(params[0], params[1])
+
+    def count(self, rng, maximum=None):
+        """A sample rounded to a non-negative whole number, at most ``maximum``"""
+        value = max(int(round(self.sample(rng))), 0)
+        return value if maximum is None else min(value, maximum)
+
+    def rate(self, rng):
+        """A sample clipped to a share between 0 and 1"""
+        return min(max(self.sample(rng), 0.0), 1.0)
+
+
+def _poisson(rng, mean):
+    if mean > 30:
+        # Normal approximation; Knuth's method needs mean + 1 draws
+        return max(rng.normalvariate(mean, math.sqrt(mean)), 0)
+    limit = math.exp(-mean)
+    count = 0
+    product = rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+class RowWriter:
+    """
+    Buffered executemany INSERT for high-volume rows.
+
+    bulk_create builds a model instance and compiles SQL for every row,
+    which dominates the cost at millions of rows. Rows whose ids are
+    never needed are written as plain tuples instead; ``defaults`` fill
+    the remaining columns with one prepared value each.
+    """
+
+    def __init__(self, model, fields, defaults=None):
+        meta = model._meta
+        defaults = defaults or {}
+        quote = connection.ops.quote_name
+        columns = [meta.get_field(name).column for name in list(fields) + list(defaults)]
+        self.label = meta.label
+        self.sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(meta.db_table), ', '.join(quote(column) for column in columns), ', '.join(['%s'] * len(columns))
+        )
+        self.constants = tuple(
+            meta.get_field(name).get_db_prep_save(value, connection) for name, value in defaults.items()
+        )
+        self.rows = []
+
+    def add(self, *values):
+        self.rows.append(values + self.constants)
+
+    def flush(self):
+        """Write buffered rows in one transaction; returns how many"""
+        rows, self.rows = self.rows, []
+        if rows:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(self.sql, rows)
+        return len(rows)
+
+
+class LoadSpec:
+    """Sizes and per-student distributions for generate_load_data"""
+
+    def __init__(self, students=1000, teachers=10, courses=20, chapters=4, lessons=5, quizzes=3,
+                 questions=10, choices=4, courses_per_student='poisson:4', engagement='beta:2,2',
+                 skill='beta:5,3', threads_per_board='pareto:1.5,20', comments_per_thread='poisson:3'):
+        self.students = students
+        self.teachers = teachers
+        self.courses = courses
+        self.chapters = chapters
+        self.lessons = lessons
+        self.quizzes = quizzes
+        self.questions = questions
+        self.choices = choices
+        self.courses_per_student = _distribution(courses_per_student)
+        self.engagement = _distribution(engagement)
+        self.skill = _distribution(skill)
+        self.threads_per_board = _distribution(threads_per_board)
+        self.comments_per_thread = _distribution(comments_per_thread)
+
+
+def _distribution(value):
+    return value if isinstance(value, Distribution) else Distribution.parse(value)
+
+
+class LoadGenerator:
+    """
+    Writes a synthetic dataset in chunks of bulk inserts.
+
+    Rows are generated lazily and buffered per model, so memory stays
+    bounded by the chunk size however many rows are written. Rows whose
+    ids are read back go through bulk_create; enrollments, progress,
+    answers and comments use RowWriter. One seeded
+    random generator drives everything, so a spec and seed always produce
+    the same data. Attempts and threads need their ids back from
+    bulk_create (SQLite 3.35+ or PostgreSQL). ``progress`` is called with (model label, rows written
+    so far) after each chunk.
+    """
+
+    def __init__(self, spec, seed=0, prefix='load', chunk_size=CHUNK_SIZE, progress=None):
+        self.spec = spec
+        self.rng = random.Random(seed)
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.counts = {}
+        self._buffers = {}
+        self._writers = {}
+
+    def run(self):
+        now = timezone.now()
+        self._writers = {
+            Enrollment: RowWriter(Enrollment, ['student', 'course'], {'date_enrolled': now, 'is_completed': False}),
+            LessonProgress: RowWriter(
+                LessonProgress, ['student', 'lesson', 'current_position', 'is_completed'], {'last_watched': now}
+            ),
+            StudentAnswer: RowWriter(StudentAnswer, ['attempt', 'question', 'selected_choice']),
+            Comment: RowWriter(
+                Comment, ['post', 'author', 'content'], {'created_at': now, 'updated_at': now, 'parent': None}
+            ),
+        }
+        teachers, students = self._create_users()
+        courses = self._create_catalog(teachers)
+        lessons = self._lessons_by_course(courses)
+        quizzes = self._quizzes_by_course(courses)
+        self._create_activity(students, courses, lessons, quizzes, now)
+        self._create_threads(students, courses)
+        self._flush_all()
+        # Bulk inserts skip the signals that keep cached data current
+        clear_regions()
+        return self.counts
+
+    # Buffered writes
+
+    def _add(self, obj):
+        buffer = self._buffers.setdefault(type(obj), [])
+        buffer.append(obj)
+        if len(buffer) >= self.chunk_size:
+            self._flush(type(obj))
+
+    def _flush(self, model):
+        self._insert(self._buffers.pop(model, []))
+
+    def _flush_all(self):
+        for model in list(self._buffers):
+            self._flush(model)
+        for writer in self._writers.values():
+            self._count(writer.label, writer.flush())
+
+    def _row(self, model, *values):
+        writer = self._writers[model]
+        writer.add(*values)
+        if len(writer.rows) >= self.chunk_size:
+            self._count(writer.label, writer.flush())
+
+    def _count(self, label, written):
+        if not written:
+            return
+        self.counts[label] = self.counts.get(label, 0) + written
+        if self.progress:
+            self.progress(label, self.counts[label])
+
+    def _insert(self, objects):
+        """Write objects now and return them with their ids set"""
+        if not objects:
+            return []
+        model = type(objects[0])
+        created = model.objects.bulk_create(objects)
+        self._count(model._meta.label, len(created))
+        return created
+
+    # Catalog
+
+    def _create_users(self):
+        password = make_password(None)
+        prefix = self.prefix
+        for number in range(self.spec.teachers):
+            self._add(CustomUser(
+                username=f'{prefix}-teacher-{number}', email=f'{prefix}-teacher-{number}@example.com',
+                user_type='teacher', password=password
+            ))
+        for number in range(self.spec.students):
+            self._add(CustomUser(
+                username=f'{prefix}-student-{number}', email=f'{prefix}-student-{number}@example.com',
+                user_type='student', password=password
+            ))
+        self._flush(CustomUser)
+        users = CustomUser.objects.filter(username__startswith=f'{prefix}-')
+        teachers = list(users.filter(user_type='teacher').order_by('id').values_list('id', flat=True))
+        students = list(users.filter(user_type='student').order_by('id').values_list('id', flat=True))
+        return teachers, students
+
+    def _create_catalog(self, teachers):
+        spec = self.spec
+        rng = self.rng
+        self._insert([
+            Course(
+                title=f'{self.prefix.title()} Course {number}', slug=f'{self.prefix}-course-{number}',
+                instructor_id=rng.choice(teachers), overview='Generated course', is_published=True
+            )
+            for number in range(spec.courses)
+        ])
+        courses = list(Course.objects.filter(slug__startswith=f'{self.prefix}-course-').order_by('id'))
+        self._insert([
+            DiscussionBoard(course=course, description=f'Discussion board for {course.title} course')
+            for course in courses
+        ])
+
+        for course in courses:
+            for number in range(1, spec.chapters + 1):
+                self._add(Chapter(course=course, title=f'Chapter {number}', order=number))
+            for number in range(1, spec.quizzes + 1):
+                self._add(Quiz(course=course, title=f'Quiz {number}', is_published=True, time_limit=0))
+        self._flush(Chapter)
+        self._flush(Quiz)
+
+        for chapter_id in Chapter.objects.filter(course__in=courses).order_by('id').values_list('id', flat=True):
+            for number in range(1, spec.lessons + 1):
+                self._add(Lesson(
+                    chapter_id=chapter_id, title=f'Lesson {number}', video='lesson_videos/generated.mp4',
+                    duration=rng.randint(120, 2400), order=number
+                ))
+        self._flush(Lesson)
+
+        for quiz_id in Quiz.objects.filter(course__in=courses).order_by('id').values_list('id', flat=True):
+            for number in range(1, spec.questions + 1):
+                self._add(Question(quiz_id=quiz_id, question_number=number, question_text=f'Question {number}'))
+        self._flush(Question)
+
+        for question_id in Question.objects.filter(quiz__course__in=courses).order_by('id').values_list('id', flat=True):
+            correct = rng.randint(1, spec.choices)
+            for number in range(1, spec.choices + 1):
+                self._add(Choice(
+                    question_id=question_id, choice_number=number,
+                    choice_text=f'Choice {number}', is_correct=number == correct
+                ))
+        self._flush(Choice)
+        return [course.id for course in courses]
+
+    def _lessons_by_course(self, courses):
+        lessons = {}
+        for lesson_id, course_id, duration in (
+            Lesson.objects.filter(chapter__course__in=courses)
+            .order_by('id').values_list('id', 'chapter__course_id', 'duration')
+        ):
+            lessons.setdefault(course_id, []).append((lesson_id, duration))
+        return lessons
+
+    def _quizzes_by_course(self, courses):
+        """course id -> [(quiz id, [(question id, correct choice id, other choice ids)])]"""
+        questions = {}
+        for question_id, quiz_id, choice_id, is_correct in (
+            Choice.objects.filter(question__quiz__course__in=courses)
+            .order_by('question_id', 'choice_number').values_list('question_id', 'question__quiz_id', 'id', 'is_correct')
+        ):
+            entry = questions.setdefault(quiz_id, {}).setdefault(question_id, [None, []])
+            if is_correct:
+                entry[0] = choice_id
+            else:
+                entry[1].append(choice_id)
+
+        quizzes = {}
+        for quiz_id, course_id in Quiz.objects.filter(course__in=courses).order_by('id').values_list('id', 'course_id'):
+            quizzes.setdefault(course_id, []).append((quiz_id, [
+                (question_id, correct, others) for question_id, (correct, others) in questions.get(quiz_id, {}).items()
+            ]))
+        return quizzes
+
+    # Learner activity
+
+    def _create_activity(self, students, courses, lessons, quizzes, now):
+        spec = self.spec
+        rng = self.rng
+        attempts = []
+        for student_id in students:
+            enrolled = rng.sample(courses, spec.courses_per_student.count(rng, len(courses)))
+            engagement = spec.engagement.rate(rng)
+            skill = spec.skill.rate(rng)
+            for course_id in enrolled:
+                self._row(Enrollment, student_id, course_id)
+                for lesson_id, duration in lessons.get(course_id, ()):
+                    if rng.random() < engagement:
+                        completed = rng.random() < engagement
+                        position = duration if completed else rng.randint(0, duration)
+                        self._row(LessonProgress, student_id, lesson_id, position, completed)
+                for quiz_id, questions in quizzes.get(course_id, ()):
+                    if rng.random() < engagement:
+                        attempts.append(self._attempt(student_id, quiz_id, questions, skill, now))
+            if len(attempts) >= self.chunk_size // max(spec.questions, 1):
+                self._write_attempts(attempts)
+                attempts = []
+        self._write_attempts(attempts)
+
+    def _attempt(self, student_id, quiz_id, questions, skill, now):
+        rng = self.rng
+        answers = []
+        correct_count = 0
+        for question_id, correct, others in questions:
+            if rng.random() < skill or not others:
+                answers.append((question_id, correct))
+                correct_count += 1
+            else:
+                answers.append((question_id, rng.choice(others)))
+        score = correct_count / len(questions) * 100 if questions else 0
+        attempt = QuizAttempt(
+            quiz_id=quiz_id, student_id=student_id, score=score, is_completed=True, completed_at=now
+        )
+        return attempt, answers
+
+    def _write_attempts(self, attempts):
+        if not attempts:
+            return
+        created = self._insert([attempt for attempt, answers in attempts])
+        for attempt, (_, answers) in zip(created, attempts):
+            for question_id, choice_id in answers:
+                self._row(StudentAnswer, attempt.pk, question_id, choice_id)
+
+    # Forum
+
+    def _create_threads(self, students, courses):
+        spec = self.spec
+        rng = self.rng
+        boards = list(DiscussionBoard.objects.filter(course__in=courses).order_by('id').values_list('id', flat=True))
+        pending = []
+        for board_id in boards:
+            for number in range(spec.threads_per_board.count(rng)):
+                post = Post(
+                    board_id=board_id, author_id=rng.choice(students), title=f'Thread {number}',
+                    content='Generated thread', views=rng.randint(0, 500)
+                )
+                pending.append((post, spec.comments_per_thread.count(rng)))
+                if len(pending) >= self.chunk_size // 10:
+                    self._write_threads(pending, students)
+                    pending = []
+        self._write_threads(pending, students)
+
+    def _write_threads(self, pending, students):
+        if not pending:
+            return
+        created = self._insert([post for post, comments in pending])
+        for post, (_, comments) in zip(created, pending):
+            for _ in range(comments):
+                self._row(Comment, post.pk, self.rng.choice(students), 'Generated reply')
@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.models import CustomUser
+from benchmarks.load import CHUNK_SIZE, Distribution, LoadGenerator, LoadSpec
+
+
+def distribution(value):
+    try:
+        return Distribution.parse(value)
+    except ValueError as e:
+        raise CommandError(str(e))
+
+
+class Command(BaseCommand):
+    help = '批量生成用于容量规划的大规模测试数据'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='随机种子，相同参数和种子生成相同数据')
+        parser.add_argument('--prefix', default='load', help='生成的用户名和课程标识前缀')
+        parser.add_argument('--students', type=int, default=1000, help='学生数量')
+        parser.add_argument('--teachers', type=int, default=10, help='教师数量')
+        parser.add_argument('--courses', type=int, default=20, help='课程数量')
+        parser.add_argument('--chapters', type=int, default=4, help='每门课程的章节数')
+        parser.add_argument('--lessons', type=int, default=5, help='每个章节的课时数')
+        parser.add_argument('--quizzes', type=int, default=3, help='每门课程的测验数')
+        parser.add_argument('--questions', type=int, default=10, help='每个测验的题目数')
+        parser.add_argument('--choices', type=int, default=4, help='每道题的选项数')
+        parser.add_argument('--courses-per-student', default='poisson:4', help='每个学生选修的课程数分布')
+        parser.add_argument('--engagement', default='beta:2,2',
+                            help='学生活跃度分布（0-1），决定观看课时和参加测验的比例')
+        parser.add_argument('--skill', default='beta:5,3', help='学生答对题目的概率分布（0-1）')
+        parser.add_argument('--threads-per-board', default='pareto:1.5,20', help='每个讨论区的帖子数分布')
+        parser.add_argument('--comments-per-thread', default='poisson:3', help='每个帖子的评论数分布')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='每次批量写入的行数')
+
+    def handle(self, *args, **options):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError('当前数据库不支持批量插入后返回主键')
+        if CustomUser.objects.filter(username__startswith=f"{options['prefix']}-").exists():
+            raise CommandError(f"已存在前缀为 {options['prefix']} 的数据，请使用 --prefix 指定新的前缀")
+
+        spec = LoadSpec(
+            students=options['students'],
+            teachers=options['teachers'],
+            courses=options['courses'],
+            chapters=options['chapters'],
+            lessons=options['lessons'],
+            quizzes=options['quizzes'],
+            questions=options['questions'],
+            choices=options['choices'],
+            courses_per_student=distribution(options['courses_per_student']),
+            engagement=distribution(options['engagement']),
+            skill=distribution(options['skill']),
+            threads_per_board=distribution(options['threads_per_board']),
+            comments_per_thread=distribution(options['comments_per_thread']),
+        )
+        verbosity = options['verbosity']
+
+        def progress(label, count):
+            if verbosity > 1:
+                self.stdout.write(f'{label}: {count}')
+
+        start = time.monotonic()
+        counts = LoadGenerator(
+            spec, seed=options['seed'], prefix=options['prefix'],
+            chunk_size=options['chunk_size'], progress=progress
+        ).run()
+        elapsed = time.monotonic() - start
+
+        for label, count in counts.items():
+            self.stdout.write(f'{label:<24} {count:>12,}')
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'共写入 {total:,} 行，用时 {elapsed:.1f} 秒（{total / max(elapsed, 0.001):,.0f} 行/秒）'
+        ))
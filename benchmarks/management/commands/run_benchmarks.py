@@ -0,0 +1,95 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from benchmarks.data import PRESETS, build_dataset
+from benchmarks.runner import LATENCY_TOLERANCE, compare_to_baseline, run_benchmarks
+from benchmarks.scenarios import SCENARIOS
+from courses.progress import progress_buffer
+from elearning.cache import clear_regions, isolated_caches
+from elearning.counters import flush_counters
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = '在独立的测试数据库中运行核心学习流程的性能基准'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(PRESETS), default='small', help='生成数据的规模')
+        parser.add_argument('--seed', type=int, default=0, help='数据生成的随机种子')
+        parser.add_argument('--iterations', type=int, default=20, help='每个场景计时的次数')
+        parser.add_argument('--warmup', type=int, default=3, help='每个场景不计时的预热次数')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=[scenario.name for scenario in SCENARIOS], help='只运行指定场景，可重复使用')
+        parser.add_argument('--output', help='结果 JSON 文件路径')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='基准结果 JSON 文件路径')
+        parser.add_argument('--update-baseline', action='store_true', help='用本次结果覆盖基准文件')
+        parser.add_argument('--latency-tolerance', type=float, default=LATENCY_TOLERANCE,
+                            help='允许的 p95 延迟增长比例')
+        parser.add_argument('--keepdb', action='store_true', help='保留测试数据库')
+
+    def handle(self, *args, **options):
+        scenarios = [scenario for scenario in SCENARIOS
+                     if not options['scenarios'] or scenario.name in options['scenarios']]
+
+        setup_test_environment()
+        # 基准数据的 id 与真实数据重叠，使用独立的进程内缓存，不读写共享缓存目录
+        caches = isolated_caches('benchmarks')
+        caches.enable()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            self.stdout.write(f"生成 {options['scale']} 规模的数据（种子 {options['seed']}）")
+            data = build_dataset(PRESETS[options['scale']], seed=options['seed'])
+            results = run_benchmarks(
+                data, scenarios, options['iterations'], options['warmup'], progress=self.report
+            )
+        finally:
+            # 缓冲的进度和计数属于测试数据库，在切回真实数据库之前写入
+            progress_buffer.flush()
+            flush_counters()
+            clear_regions()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            caches.disable()
+            teardown_test_environment()
+
+        results['scale'] = options['scale']
+        results['seed'] = options['seed']
+        results['dataset'] = PRESETS[options['scale']].as_dict()
+
+        if options['output']:
+            self.write_json(options['output'], results)
+            self.stdout.write(f"结果已写入 {options['output']}")
+
+        baseline_path = Path(options['baseline'])
+        if options['update_baseline']:
+            self.write_json(baseline_path, results)
+            self.stdout.write(self.style.SUCCESS(f'基准已更新: {baseline_path}'))
+            return
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(f'未找到基准文件 {baseline_path}，跳过比较'))
+            return
+
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get('scale') != options['scale']:
+            self.stdout.write(self.style.WARNING('基准使用了不同的数据规模，跳过比较'))
+            return
+        regressions = compare_to_baseline(results, baseline, options['latency_tolerance'])
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f'{len(regressions)} 项指标相对基准退化')
+        self.stdout.write(self.style.SUCCESS('所有场景均未超出基准'))
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:<20} p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  "
+            f"查询 {result['p50_queries']}/{result['max_queries']}"
+        )
+
+    def write_json(self, path, results):
+        Path(path).write_text(json.dumps(results, indent=2, ensure_ascii=False) + '\n')
@@ -0,0 +1,86 @@
+import platform
+import time
+
+import django
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from courses.progress import progress_buffer
+from elearning.counters import flush_counters
+from elearning.instrumentation import percentile
+from .scenarios import SCENARIOS
+
+# Allowed p95 slowdown against the baseline before a run fails; latency
+# varies between machines, query counts must not grow at all
+LATENCY_TOLERANCE = 0.5
+
+
+def run_scenario(scenario, data, iterations=20, warmup=3):
+    """Time ``iterations`` runs of a scenario after ``warmup`` untimed ones"""
+    client = Client()
+    client.force_login(data.teacher if scenario.user == 'teacher' else data.student)
+
+    durations = []
+    query_counts = []
+    for iteration in range(warmup + iterations):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            scenario.run(client, data, iteration)
+            elapsed = (time.perf_counter() - start) * 1000
+        if scenario.reset:
+            scenario.reset(data)
+        if iteration >= warmup:
+            durations.append(elapsed)
+            query_counts.append(len(queries))
+
+    durations.sort()
+    query_counts.sort()
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(durations, 0.5), 2),
+        'p95_ms': round(percentile(durations, 0.95), 2),
+        'mean_ms': round(sum(durations) / len(durations), 2),
+        'p50_queries': percentile(query_counts, 0.5),
+        'max_queries': query_counts[-1],
+    }
+
+
+def run_benchmarks(data, scenarios=None, iterations=20, warmup=3, progress=None):
+    """Run scenarios against a generated dataset and return the results document"""
+    results = {}
+    for scenario in scenarios or SCENARIOS:
+        results[scenario.name] = run_scenario(scenario, data, iterations, warmup)
+        if progress:
+            progress(scenario.name, results[scenario.name])
+    # Buffered player positions and counters belong to the benchmark database
+    progress_buffer.flush()
+    flush_counters()
+    return {
+        'created_at': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'scenarios': results,
+    }
+
+
+def compare_to_baseline(results, baseline, latency_tolerance=LATENCY_TOLERANCE):
+    """Regressions of ``results`` against ``baseline`` as readable messages"""
+    regressions = []
+    for name, result in results['scenarios'].items():
+        expected = baseline.get('scenarios', {}).get(name)
+        if expected is None:
+            continue
+        if result['max_queries'] > expected['max_queries']:
+            regressions.append(
+                f"{name}: {result['max_queries']} queries, baseline {expected['max_queries']}"
+            )
+        limit = expected['p95_ms'] * (1 + latency_tolerance)
+        if result['p95_ms'] > limit:
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']}ms, baseline {expected['p95_ms']}ms "
+                f"(limit {limit:.2f}ms)"
+            )
+    return regressions
@@ -0,0 +1,101 @@
+from django.test import RequestFactory
+from django.urls import reverse
+
+from courses.views import LessonDetailView
+from quizzes.answer_keys import get_answer_key
+from quizzes.models import QuizAttempt
+
+
+class BenchmarkError(Exception):
+    """A scenario request did not return the expected response"""
+
+
+def _check(response, status=200):
+    if response.status_code != status:
+        raise BenchmarkError(f"Request returned {response.status_code}, expected {status}")
+    return response
+
+
+class Scenario:
+    """
+    One learner journey step driven through the test client.
+
+    ``run(client, data, iteration)`` makes the timed requests; ``reset``
+    runs untimed after each iteration to undo writes that would change
+    the next one.
+    """
+
+    def __init__(self, name, run, user='student', reset=None):
+        self.name = name
+        self.run = run
+        self.user = user
+        self.reset = reset
+
+    def __repr__(self):
+        return f"<Scenario {self.name}>"
+
+
+def _lesson_url(lesson, name='courses:lesson_detail'):
+    course = lesson.chapter.course
+    if name == 'courses:lesson_detail':
+        return reverse(name, args=[course.slug, lesson.chapter_id, lesson.id])
+    return reverse(name, args=[course.slug, lesson.id])
+
+
+def dashboard(client, data, iteration):
+    _check(client.get(reverse('dashboard')))
+
+
+def course_detail(client, data, iteration):
+    course = data.courses[iteration % len(data.courses)]
+    _check(client.get(reverse('courses:course_detail', args=[course.slug])))
+
+
+def lesson_view(client, data, iteration):
+    # courses/lesson_detail.html is not part of this tree, so the view is
+    # called directly and its response is left unrendered
+    lesson = data.lessons[iteration % len(data.lessons)]
+    request = RequestFactory().get(_lesson_url(lesson))
+    request.user = data.student
+    _check(LessonDetailView.as_view()(
+        request, course_slug=lesson.chapter.course.slug, chapter_id=lesson.chapter_id, lesson_id=lesson.id
+    ))
+
+
+def progress_save(client, data, iteration):
+    lesson = data.lessons[iteration % len(data.lessons)]
+    _check(client.post(
+        _lesson_url(lesson, 'courses:save_lesson_progress'),
+        {'current_position': iteration * 5}
+    ))
+
+
+def quiz_attempt(client, data, iteration):
+    quiz = data.quizzes[0]
+    _check(client.get(reverse('quizzes:quiz_attempt', args=[quiz.id])))
+    answers = {
+        f'question_{question.id}': question.choices[iteration % len(question.choices)].id
+        for question in get_answer_key(quiz.id).questions
+    }
+    _check(client.post(reverse('quizzes:quiz_attempt', args=[quiz.id]), answers), status=302)
+
+
+def reset_quiz_attempt(data):
+    QuizAttempt.objects.filter(quiz=data.quizzes[0], student=data.student).delete()
+
+
+def forum_browse(client, data, iteration):
+    board = data.boards[iteration % len(data.boards)]
+    _check(client.get(reverse('forum:board_list')))
+    _check(client.get(reverse('forum:board_detail', args=[board.id])))
+
+
+SCENARIOS = [
+    Scenario('student_dashboard', dashboard),
+    Scenario('teacher_dashboard', dashboard, user='teacher'),
+    Scenario('course_detail', course_detail),
+    Scenario('lesson_view', lesson_view),
+    Scenario('progress_save', progress_save),
+    Scenario('quiz_attempt', quiz_attempt, reset=reset_quiz_attempt),
+    Scenario('forum_browse', forum_browse),
+]
@@ -0,0 +1,103 @@
+import random
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import models, transaction
+from django.test import TestCase
+
+from courses.models import Enrollment, Lesson, LessonProgress
+from forum.models import Comment, Post
+from quizzes.models import QuizAttempt, StudentAnswer
+from .data import PRESETS, build_dataset
+from .load import Distribution, LoadGenerator, LoadSpec
+from .runner import compare_to_baseline, run_benchmarks
+from .scenarios import SCENARIOS
+
+
+class BenchmarkHarnessTests(TestCase):
+
+    def test_dataset_is_deterministic(self):
+        spec = PRESETS['tiny']
+
+        def build():
+            data = build_dataset(spec, seed=7)
+            counts = (LessonProgress.objects.count(), QuizAttempt.objects.count(), Post.objects.count())
+            return data, counts
+
+        with transaction.atomic():
+            data, counts = build()
+            transaction.set_rollback(True)
+        self.assertEqual(len(data.students), spec.students)
+        self.assertEqual(counts[2], spec.courses * spec.posts)
+        data, again = build()
+        self.assertEqual(again, counts)
+        self.assertEqual(Lesson.objects.count(), spec.courses * spec.chapters * spec.lessons)
+        # The first student has not attempted any quiz
+        self.assertFalse(QuizAttempt.objects.filter(student=data.student).exists())
+
+    def test_every_scenario_runs(self):
+        data = build_dataset(PRESETS['tiny'])
+        results = run_benchmarks(data, iterations=2, warmup=1)
+        self.assertEqual(list(results['scenarios']), [scenario.name for scenario in SCENARIOS])
+        for result in results['scenarios'].values():
+            self.assertEqual(result['iterations'], 2)
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+            self.assertGreater(result['max_queries'], 0)
+        # The quiz scenario leaves no attempt behind
+        self.assertFalse(QuizAttempt.objects.filter(student=data.student).exists())
+
+    def test_regressions_against_baseline(self):
+        baseline = {'scenarios': {'dashboard': {'p95_ms': 10.0, 'max_queries': 3}}}
+        same = {'scenarios': {'dashboard': {'p95_ms': 14.0, 'max_queries': 3}, 'new': {'p95_ms': 1, 'max_queries': 1}}}
+        self.assertEqual(compare_to_baseline(same, baseline), [])
+        worse = {'scenarios': {'dashboard': {'p95_ms': 16.0, 'max_queries': 4}}}
+        self.assertEqual(len(compare_to_baseline(worse, baseline)), 2)
+
+
+class LoadGeneratorTests(TestCase):
+
+    def spec(self):
+        return LoadSpec(students=30, teachers=2, courses=3, chapters=2, lessons=2, quizzes=2, questions=4)
+
+    def test_generated_rows_are_consistent_and_repeatable(self):
+        with transaction.atomic():
+            counts = LoadGenerator(self.spec(), seed=3, chunk_size=50).run()
+            transaction.set_rollback(True)
+        self.assertEqual(LoadGenerator(self.spec(), seed=3, chunk_size=50).run(), counts)
+
+        self.assertEqual(counts['courses.Enrollment'], Enrollment.objects.count())
+        self.assertEqual(counts['quizzes.StudentAnswer'], counts['quizzes.QuizAttempt'] * 4)
+        self.assertEqual(StudentAnswer.objects.values('attempt').distinct().count(), QuizAttempt.objects.count())
+        self.assertEqual(counts.get('forum.Comment', 0), Comment.objects.count())
+        # Progress only exists for lessons of courses the student is enrolled in
+        self.assertFalse(
+            LessonProgress.objects.exclude(
+                lesson__chapter__course__enrollments__student=models.F('student')
+            ).exists()
+        )
+        for attempt in QuizAttempt.objects.all()[:10]:
+            self.assertEqual(attempt.score, attempt.calculate_score())
+
+    def test_distributions(self):
+        rng = random.Random(0)
+        self.assertEqual(Distribution.parse('fixed:4').count(rng), 4)
+        self.assertTrue(all(0 <= Distribution.parse('beta:2,5').rate(rng) <= 1 for _ in range(100)))
+        self.assertTrue(all(Distribution.parse('pareto:1.5,10').sample(rng) >= 10 for _ in range(100)))
+        self.assertLessEqual(Distribution.parse('poisson:3').count(rng, maximum=2), 2)
+        self.assertEqual(str(Distribution.parse('uniform:1,5')), 'uniform:1,5')
+        for text in ('zipf:2', 'beta:2', 'normal:a,b'):
+            with self.assertRaises(ValueError):
+                Distribution.parse(text)
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            'generate_load_data', students=5, courses=2, threads_per_board='fixed:2',
+            comments_per_thread='fixed:1', stdout=out
+        )
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertEqual(Comment.objects.count(), 4)
+        with self.assertRaises(CommandError):
+            call_command('generate_load_data', students=5, stdout=out)
+        with self.assertRaises(CommandError):
+            call_command('generate_load_data', prefix='other', skill='zipf:2', stdout=out)
@@ -0,0 +1,11 @@
+"""Test configuration for runners other than ``manage.py test``, such as pytest-django"""
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def isolated_cache_regions():
+    """The counterpart of elearning.testing.TestRunner: never touch the shared caches"""
+    from elearning.cache import isolated_caches
+
+    with isolated_caches('test'):
+        yield
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Course, Chapter, Lesson, CourseFile, LessonProgress
+from .tasks import reconcile_enrollments_task
 from accounts.models import CustomUser
 from django.utils.translation import gettext_lazy as _
 from django.contrib import messages
@@ -27,6 +28,10 @@ class CourseAdmin(admin.ModelAdmin):
     def publish_courses(self, request, queryset):
         """Publish selected courses"""
         updated = queryset.update(is_published=True)
+        # Backfill enrollments for the newly published courses in the background
+        reconcile_enrollments_task.enqueue(
+            course_ids=list(queryset.values_list('id', flat=True)), created_by=request.user
+        )
         self.message_user(request, f'Successfully published {updated} courses', messages.SUCCESS)
     publish_courses.short_description = "Publish selected courses"
     
@@ -0,0 +1,144 @@
+from django.db import models, transaction
+
+from .tasks import remove_media_files
+
+# Files are removed from storage by background jobs of this many files each
+CLEANUP_BATCH_SIZE = 100
+
+
+class DeletionError(Exception):
+    """Raised when a dependent row cannot be handled set-wise"""
+
+
+def _file_fields(model):
+    return [field for field in model._meta.concrete_fields if isinstance(field, models.FileField)]
+
+
+# Rows whose post_delete receivers keep cached aggregates current, and the
+# columns that say which cache entries they feed. Raw deletes skip those
+# receivers, so the plan reads these columns first and invalidates itself.
+CACHED_DEPENDANTS = {
+    'courses.Enrollment': ('student_id', 'course__instructor_id'),
+    'quizzes.QuizAttempt': ('student_id', 'quiz_id'),
+    'forum.Post': ('board_id',),
+}
+
+
+def _raw_delete(queryset):
+    # Dependants have already been deleted in order, so the collector's
+    # per-object fetch and signals are skipped
+    return queryset._raw_delete(queryset.db)
+
+
+class DeletionPlan:
+    """
+    Set-based deletion of a queryset and everything that cascades from it.
+
+    Relations are walked through model metadata: every CASCADE dependant
+    becomes a subquery-filtered queryset deleted before its parent, SET_NULL
+    references are cleared with one update, and file names are collected so
+    storage can be cleaned up by a background job after commit. Cached
+    aggregates built from deleted CACHED_DEPENDANTS rows are invalidated
+    after commit, since their post_delete receivers do not run.
+    """
+
+    def __init__(self, queryset):
+        self.updates = []
+        self.deletes = []
+        self.files = []
+        self._collect(queryset, path=())
+
+    def _collect(self, queryset, path):
+        model = queryset.model
+        path = path + (model,)
+
+        for relation in model._meta.related_objects:
+            related_model = relation.related_model
+            if relation.many_to_many:
+                through = relation.through
+                if through._meta.auto_created:
+                    self._collect_through(through, relation.field.m2m_reverse_field_name(), queryset)
+                continue
+
+            if related_model in path:
+                # Self references stay within the rows being deleted
+                continue
+            on_delete = relation.on_delete
+            dependants = related_model._base_manager.filter(**{f'{relation.field.name}__in': queryset})
+            if on_delete is models.CASCADE:
+                self._collect(dependants, path)
+            elif on_delete is models.SET_NULL:
+                self.updates.append((dependants, {relation.field.name: None}))
+            elif on_delete is not models.DO_NOTHING:
+                raise DeletionError(
+                    f"{related_model._meta.label}.{relation.field.name} uses an unsupported on_delete"
+                )
+
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            if through._meta.auto_created:
+                self._collect_through(through, field.m2m_field_name(), queryset)
+
+        for field in _file_fields(model):
+            for name in queryset.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True}) \
+                    .values_list(field.name, flat=True).iterator():
+                self.files.append((model._meta.label, field.name, name))
+
+        self.deletes.append(queryset)
+
+    def _collect_through(self, through, field_name, queryset):
+        self.deletes.insert(0, through._base_manager.filter(**{f'{field_name}__in': queryset}))
+
+    def _affected_caches(self):
+        """Distinct values of CACHED_DEPENDANTS columns per model label"""
+        affected = {}
+        for queryset in self.deletes:
+            label = queryset.model._meta.label
+            if label in CACHED_DEPENDANTS:
+                rows = set(queryset.values_list(*CACHED_DEPENDANTS[label]).distinct())
+                affected.setdefault(label, set()).update(rows)
+        return affected
+
+    def execute(self):
+        """Run the plan in one transaction; returns deleted rows per model"""
+        counts = {}
+        with transaction.atomic(using=self.deletes[-1].db):
+            affected = self._affected_caches()
+            transaction.on_commit(lambda: _invalidate_caches(affected), using=self.deletes[-1].db)
+            for queryset, values in self.updates:
+                queryset.update(**values)
+            for queryset in self.deletes:
+                deleted = _raw_delete(queryset)
+                label = queryset.model._meta.label
+                counts[label] = counts.get(label, 0) + deleted
+            # Queued in the same transaction, so files outlive a rolled back delete
+            for start in range(0, len(self.files), CLEANUP_BATCH_SIZE):
+                remove_media_files.enqueue(files=self.files[start:start + CLEANUP_BATCH_SIZE])
+        return counts
+
+
+def _invalidate_caches(affected):
+    """Drop the cached aggregates that included rows deleted by a plan"""
+    from accounts.dashboard import invalidate_dashboard
+    from forum.summaries import invalidate_board_summaries
+    from quizzes.analytics import invalidate_quiz_analytics
+
+    user_ids = set()
+    for student_id, instructor_id in affected.get('courses.Enrollment', ()):
+        user_ids.update((student_id, instructor_id))
+    quiz_ids = set()
+    for student_id, quiz_id in affected.get('quizzes.QuizAttempt', ()):
+        user_ids.add(student_id)
+        quiz_ids.add(quiz_id)
+
+    for user_id in user_ids:
+        invalidate_dashboard(user_id)
+    for quiz_id in quiz_ids:
+        invalidate_quiz_analytics(quiz_id)
+    if affected.get('forum.Post') or affected.get('courses.Enrollment'):
+        invalidate_board_summaries()
+
+
+def delete_cascade(queryset):
+    """Delete a queryset and its dependants set-wise; media is removed by background jobs"""
+    return DeletionPlan(queryset).execute()
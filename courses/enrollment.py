@@ -0,0 +1,148 @@
+from django.db.models import Count
+
+from accounts.models import CustomUser
+from .models import Course, Enrollment
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class ReconcileReport:
+    """Summary of an enrollment reconciliation run"""
+
+    def __init__(self, student_count, course_count):
+        self.student_count = student_count
+        self.course_count = course_count
+        self.courses_processed = 0
+        self.missing = 0
+        self.created = 0
+
+    def __str__(self):
+        return (
+            f"{self.created}/{self.missing} missing enrollments created across "
+            f"{self.courses_processed}/{self.course_count} courses "
+            f"for {self.student_count} students"
+        )
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def reconcile_enrollments(students=None, courses=None, batch_size=DEFAULT_BATCH_SIZE,
+                          dry_run=False, progress=None):
+    """
+    Enroll every student in every published course.
+
+    Missing (student, course) pairs are computed per course as a set
+    difference against the existing enrollments, then inserted with chunked
+    bulk_create. Conflicting rows are ignored, so the reconciler can run
+    alongside requests that enroll students themselves; ``report.created``
+    counts the rows actually inserted, recounted after each course.
+
+    ``progress`` is called after each course with its id, the number of
+    missing pairs found for it and the running report.
+    """
+    if students is None:
+        students = CustomUser.objects.filter(user_type='student')
+    if courses is None:
+        courses = Course.objects.filter(is_published=True)
+
+    student_ids = set(students.values_list('id', flat=True))
+    course_ids = list(courses.order_by('id').values_list('id', flat=True))
+    report = ReconcileReport(len(student_ids), len(course_ids))
+
+    for course_id in course_ids:
+        enrolled = set(
+            Enrollment.objects.filter(course_id=course_id).values_list('student_id', flat=True)
+        )
+        missing = sorted(student_ids - enrolled)
+
+        if not dry_run:
+            for chunk in _chunks(missing, batch_size):
+                Enrollment.objects.bulk_create(
+                    [Enrollment(student_id=student_id, course_id=course_id) for student_id in chunk],
+                    batch_size=batch_size,
+                    ignore_conflicts=True
+                )
+            if missing:
+                # ignore_conflicts hides which rows were skipped; count what is there now
+                report.created += Enrollment.objects.filter(course_id=course_id).count() - len(enrolled)
+
+        report.courses_processed += 1
+        report.missing += len(missing)
+        if progress:
+            progress(course_id, len(missing), report)
+
+    return report
+
+
+def is_enrolled(user, course):
+    """
+    Enrollment policy evaluated at read time.
+
+    Every student is enrolled in every published course, and instructors
+    always have access to their own courses. No rows are read or written.
+    """
+    if not user.is_authenticated:
+        return False
+    if user.is_student():
+        return course.is_published
+    return user.pk == course.instructor_id
+
+
+def count_students(published_by_course):
+    """
+    Map course id to its number of enrolled students under the policy.
+
+    ``published_by_course`` maps course id to the course's is_published.
+    Published courses count every student, since their enrollments are not
+    necessarily stored; other courses count their stored rows. Uses at most
+    two queries.
+    """
+    counts = {course_id: 0 for course_id in published_by_course}
+    unpublished = [course_id for course_id, published in published_by_course.items() if not published]
+    if unpublished:
+        counts.update(
+            Enrollment.objects.filter(course_id__in=unpublished)
+            .values_list('course').annotate(count=Count('id'))
+        )
+    if len(unpublished) < len(counts):
+        total = CustomUser.objects.filter(user_type='student').count()
+        for course_id, published in published_by_course.items():
+            if published:
+                counts[course_id] = total
+    return counts
+
+
+def resolve_enrollments(user, courses):
+    """
+    Map course id to the student's enrollment for each of ``courses``.
+
+    Stored rows are returned when they exist; otherwise an unsaved
+    Enrollment stands in for the policy enrollment. Uses one query.
+    """
+    courses = list(courses)
+    stored = {
+        enrollment.course_id: enrollment
+        for enrollment in Enrollment.objects.filter(
+            student=user, course__in=[course.id for course in courses]
+        )
+    }
+    enrollments = {}
+    for course in courses:
+        enrollment = stored.get(course.id) or Enrollment(student=user, course=course)
+        enrollment.course = course
+        enrollments[course.id] = enrollment
+    return enrollments
+
+
+def materialize_enrollment(user, course):
+    """
+    Return the stored enrollment, creating it on first use.
+
+    Only call this when per-student state (completion, progress) is about
+    to be written; read-only views should use is_enrolled instead.
+    """
+    enrollment, created = Enrollment.objects.get_or_create(student=user, course=course)
+    return enrollment
@@ -0,0 +1,55 @@
+import logging
+
+from django.utils import timezone
+
+from .media_probe import ProbeError, probe
+from .models import Lesson, LessonMedia
+
+logger = logging.getLogger(__name__)
+
+
+def needs_probe(lesson):
+    """Whether the lesson's current video has not been probed yet"""
+    if not lesson.video:
+        return False
+    return not LessonMedia.objects.filter(lesson=lesson, file_name=lesson.video.name).exists()
+
+
+def ingest_lesson_video(lesson):
+    """
+    Read the lesson video's container headers into its LessonMedia row and
+    set Lesson.duration from them.
+
+    Files that cannot be read are recorded as failed rather than raised,
+    since retrying will not change them; a missing file is raised so the
+    job is retried, in case the upload has not reached shared storage yet.
+    """
+    media, _ = LessonMedia.objects.get_or_create(lesson=lesson, defaults={'file_name': lesson.video.name})
+    media.file_name = lesson.video.name
+    media.probed_at = timezone.now()
+    try:
+        info = probe(lesson.video.path)
+    except ProbeError as e:
+        logger.warning("Could not read video of lesson %s: %s", lesson.pk, e)
+        media.status = LessonMedia.FAILED
+        media.error = str(e)
+        media.container = media.video_codec = ''
+        media.duration = media.width = media.height = media.bitrate = None
+        media.save()
+        return media
+
+    media.status = LessonMedia.READY
+    media.error = ''
+    media.container = info.container
+    media.video_codec = info.video_codec[:50]
+    media.duration = info.duration
+    media.width = info.width
+    media.height = info.height
+    media.bitrate = info.bitrate
+    media.file_size = info.file_size
+    media.save()
+
+    if info.duration:
+        # A queryset update, so saving the lesson does not queue another probe
+        Lesson.objects.filter(pk=lesson.pk).update(duration=round(info.duration))
+    return media
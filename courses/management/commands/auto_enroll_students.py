@@ -1,26 +1,40 @@
 from django.core.management.base import BaseCommand
-from django.db import transaction
-from courses.models import Course, Enrollment
-from accounts.models import CustomUser
+from courses.enrollment import DEFAULT_BATCH_SIZE, reconcile_enrollments
+from courses.tasks import reconcile_enrollments_task
 
 class Command(BaseCommand):
     help = '自动将所有学生注册到所有课程'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='只统计缺失的注册记录，不写入数据库')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每批写入的注册记录数')
+        parser.add_argument('--background', action='store_true', help='加入后台任务队列，由 run_jobs 执行')
+
     def handle(self, *args, **options):
-        with transaction.atomic():
-            students = CustomUser.objects.filter(user_type='student')
-            courses = Course.objects.filter(is_published=True)
-            
-            self.stdout.write(self.style.SUCCESS(f'找到 {students.count()} 名学生和 {courses.count()} 门课程'))
-            
-            enrollment_count = 0
-            for student in students:
-                for course in courses:
-                    enrollment, created = Enrollment.objects.get_or_create(
-                        student=student,
-                        course=course
-                    )
-                    if created:
-                        enrollment_count += 1
-            
-            self.stdout.write(self.style.SUCCESS(f'成功创建 {enrollment_count} 条新的注册记录')) 
\ No newline at end of file
+        if options['background']:
+            job = reconcile_enrollments_task.enqueue()
+            self.stdout.write(self.style.SUCCESS(f'已加入后台任务队列（任务 #{job.pk}）'))
+            return
+
+        dry_run = options['dry_run']
+        verbosity = options['verbosity']
+
+        def progress(course_id, missing, report):
+            if verbosity > 1 or (missing and verbosity > 0):
+                self.stdout.write(
+                    f'[{report.courses_processed}/{report.course_count}] 课程 {course_id}: 缺失 {missing} 条注册记录'
+                )
+
+        report = reconcile_enrollments(
+            batch_size=options['batch_size'],
+            dry_run=dry_run,
+            progress=progress
+        )
+
+        self.stdout.write(self.style.SUCCESS(f'找到 {report.student_count} 名学生和 {report.course_count} 门课程'))
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'试运行：需要创建 {report.missing} 条新的注册记录'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'缺失 {report.missing} 条注册记录，成功创建 {report.created} 条新的注册记录'
+            ))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from courses.ingest import ingest_lesson_video
+from courses.models import Lesson, LessonMedia
+from courses.tasks import probe_lesson_video
+
+class Command(BaseCommand):
+    help = '读取课时视频的时长、分辨率和码率，补全尚未处理的课时'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='重新读取所有课时视频，包括已处理的')
+        parser.add_argument('--failed', action='store_true', help='只重新读取上次读取失败的课时视频')
+        parser.add_argument('--background', action='store_true', help='加入后台任务队列，由 run_jobs 执行')
+
+    def handle(self, *args, **options):
+        lessons = Lesson.objects.exclude(video='').select_related('media')
+        if options['failed']:
+            lessons = lessons.filter(media__status=LessonMedia.FAILED)
+        elif not options['all']:
+            lessons = lessons.filter(media__isnull=True)
+
+        ready = failed = 0
+        for lesson in lessons.iterator(chunk_size=200):
+            if options['background']:
+                probe_lesson_video.enqueue(lesson_id=lesson.pk, file_name=lesson.video.name)
+                continue
+            try:
+                media = ingest_lesson_video(lesson)
+            except OSError as e:
+                self.stdout.write(self.style.WARNING(f'课时 {lesson.pk}: 无法打开视频文件 ({e})'))
+                failed += 1
+                continue
+            if media.status == LessonMedia.READY:
+                ready += 1
+            else:
+                self.stdout.write(self.style.WARNING(f'课时 {lesson.pk}: {media.error}'))
+                failed += 1
+
+        if options['background']:
+            self.stdout.write(self.style.SUCCESS('已加入后台任务队列'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'成功处理 {ready} 个课时视频，失败 {failed} 个'))
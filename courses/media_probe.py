@@ -0,0 +1,291 @@
+"""
+Read duration, resolution and codec from MP4 and WebM headers.
+
+Only container metadata is read, by seeking from box to box (MP4) or
+element to element (WebM); sample tables and media data are skipped, so
+probing a multi-gigabyte file reads a few kilobytes.
+
+MP4 (ISO base media):  moov/mvhd gives the duration, the first video
+                       trak's tkhd the display size and its stsd the codec.
+WebM (Matroska):       Segment/Info gives TimecodeScale and Duration,
+                       the first video TrackEntry the size and CodecID.
+"""
+import struct
+
+# Boxes read in full are small; anything bigger is a sign of a bad file
+MAX_BOX_READ = 1024 * 1024
+
+MP4_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+MP4_FIRST_BOXES = {b'ftyp', b'moov', b'free', b'wide', b'mdat'}
+
+EBML_HEADER = 0x1A45DFA3
+EBML_DOCTYPE = 0x4282
+SEGMENT = 0x18538067
+INFO = 0x1549A966
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+CLUSTER = 0x1F43B675
+WEBM_VIDEO_TRACK = 1
+
+
+class ProbeError(Exception):
+    """The file is not an MP4 or WebM file this module can read"""
+
+
+class MediaInfo:
+    """Container metadata of one media file"""
+
+    def __init__(self, container, duration=None, width=None, height=None, video_codec='', file_size=0):
+        self.container = container
+        self.duration = duration
+        self.width = width
+        self.height = height
+        self.video_codec = video_codec
+        self.file_size = file_size
+
+    def __repr__(self):
+        return f"<MediaInfo {self.container} {self.duration}s {self.width}x{self.height} {self.video_codec}>"
+
+    @property
+    def bitrate(self):
+        """Average bits per second over the whole file"""
+        if not self.duration:
+            return None
+        return int(self.file_size * 8 / self.duration)
+
+
+def _read_exact(file, size):
+    data = file.read(size)
+    if len(data) != size:
+        raise ProbeError("Unexpected end of file")
+    return data
+
+
+# MP4
+
+def _mp4_boxes(file, start, end):
+    """(type, payload start, payload end) for the boxes in [start, end)"""
+    position = start
+    while position + 8 <= end:
+        file.seek(position)
+        size, box_type = struct.unpack('>I4s', _read_exact(file, 8))
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', _read_exact(file, 8))[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header or position + size > end:
+            raise ProbeError(f"Bad {box_type!r} box size")
+        yield box_type, position + header, position + size
+        position += size
+
+
+def _read_box(file, start, end):
+    if end - start > MAX_BOX_READ:
+        raise ProbeError("Header box too large")
+    file.seek(start)
+    return _read_exact(file, end - start)
+
+
+def _mp4_track(file, start, end):
+    """Handler type, display size, codec and duration of one trak box"""
+    track = {'handler': None, 'width': None, 'height': None, 'codec': '', 'duration': None}
+
+    def walk(walk_start, walk_end):
+        for box_type, payload_start, payload_end in _mp4_boxes(file, walk_start, walk_end):
+            if box_type in MP4_CONTAINERS:
+                walk(payload_start, payload_end)
+            elif box_type == b'tkhd':
+                data = _read_box(file, payload_start, payload_end)
+                # Width and height are 16.16 fixed point, the last fields
+                width, height = struct.unpack('>II', data[-8:])
+                track['width'], track['height'] = width >> 16, height >> 16
+            elif box_type == b'mdhd':
+                data = _read_box(file, payload_start, payload_end)
+                if data[0] == 1:
+                    timescale, duration = struct.unpack('>IQ', data[20:32])
+                else:
+                    timescale, duration = struct.unpack('>II', data[12:20])
+                if timescale:
+                    track['duration'] = duration / timescale
+            elif box_type == b'hdlr':
+                track['handler'] = _read_box(file, payload_start, payload_end)[8:12]
+            elif box_type == b'stsd':
+                file.seek(payload_start + 8)
+                _, codec = struct.unpack('>I4s', _read_exact(file, 8))
+                track['codec'] = codec.decode('latin-1').strip()
+
+    walk(start, end)
+    return track
+
+
+def probe_mp4(file, file_size):
+    info = MediaInfo('mp4', file_size=file_size)
+    boxes = list(_mp4_boxes(file, 0, file_size))
+    if not boxes or boxes[0][0] not in MP4_FIRST_BOXES:
+        raise ProbeError("Not an MP4 file")
+    moov = next(((start, end) for box_type, start, end in boxes if box_type == b'moov'), None)
+    if moov is None:
+        raise ProbeError("MP4 file has no moov box")
+
+    for box_type, start, end in _mp4_boxes(file, *moov):
+        if box_type == b'mvhd':
+            data = _read_box(file, start, end)
+            if data[0] == 1:
+                timescale, duration = struct.unpack('>IQ', data[20:32])
+            else:
+                timescale, duration = struct.unpack('>II', data[12:20])
+            if timescale:
+                info.duration = duration / timescale
+        elif box_type == b'trak' and info.width is None:
+            track = _mp4_track(file, start, end)
+            if track['handler'] == b'vide':
+                info.width, info.height = track['width'], track['height']
+                info.video_codec = track['codec']
+                if not info.duration:
+                    info.duration = track['duration']
+    return info
+
+
+# WebM
+
+def _ebml_vint(file, keep_marker):
+    first = file.read(1)
+    if not first:
+        return None, 0
+    first = first[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ProbeError("Bad EBML variable length integer")
+    value = first if keep_marker else first & (mask - 1)
+    rest = _read_exact(file, length - 1)
+    for byte in rest:
+        value = (value << 8) | byte
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return (None if unknown else value), length
+
+
+def _ebml_elements(file, start, end):
+    """(id, data start, data end) for the elements in [start, end)"""
+    position = start
+    while end is None or position < end:
+        file.seek(position)
+        element_id, id_length = _ebml_vint(file, keep_marker=True)
+        if element_id is None:
+            return
+        size, size_length = _ebml_vint(file, keep_marker=False)
+        if not size_length:
+            raise ProbeError("Unexpected end of file")
+        data_start = position + id_length + size_length
+        if size is None:
+            # Unknown size, only allowed for Segment and Cluster
+            yield element_id, data_start, end
+            return
+        yield element_id, data_start, data_start + size
+        position = data_start + size
+
+
+def _ebml_uint(file, start, end):
+    return int.from_bytes(_read_box(file, start, end), 'big')
+
+
+def _ebml_float(file, start, end):
+    data = _read_box(file, start, end)
+    if len(data) == 4:
+        return struct.unpack('>f', data)[0]
+    if len(data) == 8:
+        return struct.unpack('>d', data)[0]
+    raise ProbeError("Bad EBML float")
+
+
+def _webm_track(file, start, end):
+    track = {'type': None, 'codec': '', 'width': None, 'height': None}
+    for element_id, data_start, data_end in _ebml_elements(file, start, end):
+        if element_id == TRACK_TYPE:
+            track['type'] = _ebml_uint(file, data_start, data_end)
+        elif element_id == CODEC_ID:
+            track['codec'] = _read_box(file, data_start, data_end).decode('ascii', 'replace').rstrip('\x00')
+        elif element_id == VIDEO:
+            for video_id, video_start, video_end in _ebml_elements(file, data_start, data_end):
+                if video_id == PIXEL_WIDTH:
+                    track['width'] = _ebml_uint(file, video_start, video_end)
+                elif video_id == PIXEL_HEIGHT:
+                    track['height'] = _ebml_uint(file, video_start, video_end)
+    return track
+
+
+def probe_webm(file, file_size):
+    elements = _ebml_elements(file, 0, file_size)
+    header = next(elements, None)
+    if header is None or header[0] != EBML_HEADER:
+        raise ProbeError("Not a WebM file")
+    doctype = b''
+    for element_id, start, end in _ebml_elements(file, header[1], header[2]):
+        if element_id == EBML_DOCTYPE:
+            doctype = _read_box(file, start, end).rstrip(b'\x00')
+    if doctype not in (b'webm', b'matroska'):
+        raise ProbeError(f"Unsupported EBML document type {doctype!r}")
+
+    info = MediaInfo(doctype.decode(), file_size=file_size)
+    segment = next((element for element in elements if element[0] == SEGMENT), None)
+    if segment is None:
+        raise ProbeError("WebM file has no Segment")
+
+    timecode_scale = 1000000
+    duration = None
+    have_info = have_tracks = False
+    for element_id, start, end in _ebml_elements(file, segment[1], min(segment[2], file_size)):
+        if element_id == INFO:
+            have_info = True
+            for info_id, info_start, info_end in _ebml_elements(file, start, end):
+                if info_id == TIMECODE_SCALE:
+                    timecode_scale = _ebml_uint(file, info_start, info_end)
+                elif info_id == DURATION:
+                    duration = _ebml_float(file, info_start, info_end)
+        elif element_id == TRACKS:
+            have_tracks = True
+            for track_id, track_start, track_end in _ebml_elements(file, start, end):
+                if track_id != TRACK_ENTRY:
+                    continue
+                track = _webm_track(file, track_start, track_end)
+                if track['type'] == WEBM_VIDEO_TRACK:
+                    info.width, info.height = track['width'], track['height']
+                    info.video_codec = track['codec']
+                    break
+        elif element_id == CLUSTER or (have_info and have_tracks):
+            # Media data follows; the headers come before it
+            break
+
+    if duration is not None:
+        info.duration = duration * timecode_scale / 1e9
+    return info
+
+
+def probe(path):
+    """MediaInfo for the MP4 or WebM file at ``path``; raises ProbeError"""
+    with open(path, 'rb') as file:
+        file.seek(0, 2)
+        file_size = file.tell()
+        file.seek(0)
+        magic = file.read(12)
+        file.seek(0)
+        try:
+            if magic[:4] == b'\x1a\x45\xdf\xa3':
+                return probe_webm(file, file_size)
+            if magic[4:8] in MP4_FIRST_BOXES:
+                return probe_mp4(file, file_size)
+        except struct.error:
+            raise ProbeError("Truncated header")
+    raise ProbeError("Unrecognized container")
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_chunkedupload'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lesson',
+            name='duration',
+            field=models.PositiveIntegerField(blank=True, default=0, help_text='Duration in seconds, read from the video once it is processed', verbose_name='Duration'),
+        ),
+        migrations.CreateModel(
+            name='LessonMedia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(help_text='Video file the metadata was read from', max_length=255, verbose_name='File Name')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='Status')),
+                ('container', models.CharField(blank=True, max_length=20, verbose_name='Container')),
+                ('video_codec', models.CharField(blank=True, max_length=50, verbose_name='Video Codec')),
+                ('duration', models.FloatField(blank=True, help_text='Seconds', null=True, verbose_name='Duration')),
+                ('width', models.PositiveIntegerField(blank=True, null=True, verbose_name='Width')),
+                ('height', models.PositiveIntegerField(blank=True, null=True, verbose_name='Height')),
+                ('bitrate', models.PositiveBigIntegerField(blank=True, help_text='Bits per second', null=True, verbose_name='Bitrate')),
+                ('file_size', models.PositiveBigIntegerField(default=0, verbose_name='File Size')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('probed_at', models.DateTimeField(blank=True, null=True, verbose_name='Probed At')),
+                ('lesson', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='media', to='courses.lesson', verbose_name='Lesson')),
+            ],
+            options={
+                'verbose_name': 'Lesson Media',
+                'verbose_name_plural': 'Lesson Media',
+            },
+        ),
+    ]
@@ -1,9 +1,14 @@
+import uuid
+
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 from django.conf import settings
+from django.urls import reverse
 from ckeditor.fields import RichTextField
 
+from elearning.counters import counter
+
 class Course(models.Model):
     """Course model"""
     title = models.CharField(max_length=200, verbose_name=_('Title'))
@@ -59,7 +64,6 @@ class Course(models.Model):
         # Create discussion board for this course if it doesn't exist
         if not hasattr(self, 'discussion_board'):
             board = DiscussionBoard.objects.create(
-                title=f"Discussion: {self.title}",
                 description=f"Discussion board for {self.title} course",
                 course=self
             )
@@ -72,32 +76,23 @@ class Course(models.Model):
         return reverse('courses:course_detail', kwargs={'slug': self.slug})
     
     def delete(self, *args, **kwargs):
-        """Delete course and related files"""
-        # Delete media files
-        if self.thumbnail:
-            if os.path.isfile(self.thumbnail.path):
-                os.remove(self.thumbnail.path)
-        
-        # Get all related lesson videos
-        lessons = Lesson.objects.filter(chapter__course=self)
-        for lesson in lessons:
-            if lesson.video and os.path.isfile(lesson.video.path):
-                os.remove(lesson.video.path)
+        """Delete course, its dependent rows and, after commit, its media files"""
+        from .deletion import delete_cascade
+        from .navigation import invalidate_navigation_index
+        from quizzes.analytics import invalidate_quiz_analytics
         
-        # Get all related course files
-        course_files = self.files.all()
-        for file in course_files:
-            if file.file and os.path.isfile(file.file.path):
-                os.remove(file.file.path)
+        quiz_ids = list(self.quizzes.values_list('id', flat=True))
+        counts = delete_cascade(Course._base_manager.filter(pk=self.pk))
         
-        # Delete discussion board
-        try:
-            if hasattr(self, 'discussion_board'):
-                self.discussion_board.delete()
-        except:
-            pass
+        # Raw deletes skip the model signals that normally clear these
+        invalidate_navigation_index(self.pk)
+        for quiz_id in quiz_ids:
+            invalidate_quiz_analytics(quiz_id)
+        # The course itself still announces its deletion to cache regions
+        models.signals.post_delete.send(sender=Course, instance=self, using=self._state.db, origin=self)
         
-        super().delete(*args, **kwargs)
+        self.pk = None
+        return sum(counts.values()), counts
 
 class Chapter(models.Model):
     """Course chapter model"""
@@ -131,7 +126,9 @@ class Lesson(models.Model):
     video = models.FileField(upload_to='lesson_videos/', verbose_name=_('Video'))
     content = RichTextField(blank=True, verbose_name=_('Content'))
     duration = models.PositiveIntegerField(
-        help_text=_('Duration in seconds'),
+        default=0,
+        blank=True,
+        help_text=_('Duration in seconds, read from the video once it is processed'),
         verbose_name=_('Duration')
     )
     order = models.PositiveIntegerField(default=0, verbose_name=_('Order'))
@@ -144,6 +141,42 @@ class Lesson(models.Model):
     def __str__(self):
         return f"{self.chapter.title} - {self.title}"
 
+class LessonMedia(models.Model):
+    """Metadata read from a lesson's video file by the courses.probe_lesson_video task"""
+    PENDING = 'pending'
+    READY = 'ready'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (READY, _('Ready')),
+        (FAILED, _('Failed')),
+    )
+    
+    lesson = models.OneToOneField(
+        Lesson,
+        on_delete=models.CASCADE,
+        related_name='media',
+        verbose_name=_('Lesson')
+    )
+    file_name = models.CharField(max_length=255, verbose_name=_('File Name'), help_text=_('Video file the metadata was read from'))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING, verbose_name=_('Status'))
+    container = models.CharField(max_length=20, blank=True, verbose_name=_('Container'))
+    video_codec = models.CharField(max_length=50, blank=True, verbose_name=_('Video Codec'))
+    duration = models.FloatField(null=True, blank=True, verbose_name=_('Duration'), help_text=_('Seconds'))
+    width = models.PositiveIntegerField(null=True, blank=True, verbose_name=_('Width'))
+    height = models.PositiveIntegerField(null=True, blank=True, verbose_name=_('Height'))
+    bitrate = models.PositiveBigIntegerField(null=True, blank=True, verbose_name=_('Bitrate'), help_text=_('Bits per second'))
+    file_size = models.PositiveBigIntegerField(default=0, verbose_name=_('File Size'))
+    error = models.TextField(blank=True, verbose_name=_('Error'))
+    probed_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Probed At'))
+    
+    class Meta:
+        verbose_name = _('Lesson Media')
+        verbose_name_plural = _('Lesson Media')
+    
+    def __str__(self):
+        return f"{self.lesson.title} ({self.status})"
+
 class Enrollment(models.Model):
     """Student course enrollment model"""
     student = models.ForeignKey(
@@ -228,6 +261,61 @@ class CourseFile(models.Model):
         return self.title
     
     def increment_download_count(self):
-        """Increment download count"""
-        self.download_count += 1
-        self.save()
+        """Count a download; buffered and written in batches by download_counter"""
+        download_counter.increment(self.pk)
+
+
+class ChunkedUpload(models.Model):
+    """A large file received in parts; see courses/uploads.py"""
+    UPLOADING = 'uploading'
+    ASSEMBLING = 'assembling'
+    COMPLETE = 'complete'
+    STATUS_CHOICES = (
+        (UPLOADING, _('Uploading')),
+        (ASSEMBLING, _('Assembling')),
+        (COMPLETE, _('Complete')),
+    )
+    LESSON_VIDEO = 'lesson_video'
+    COURSE_FILE = 'course_file'
+    TARGET_CHOICES = (
+        (LESSON_VIDEO, _('Lesson Video')),
+        (COURSE_FILE, _('Course File')),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='chunked_uploads',
+        verbose_name=_('Owner')
+    )
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES, verbose_name=_('Target'))
+    filename = models.CharField(max_length=255, verbose_name=_('File Name'))
+    size = models.PositiveBigIntegerField(verbose_name=_('Size'))
+    chunk_size = models.PositiveIntegerField(verbose_name=_('Chunk Size'))
+    sha256 = models.CharField(max_length=64, blank=True, verbose_name=_('SHA-256'))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=UPLOADING, verbose_name=_('Status'))
+    file_name = models.CharField(max_length=255, blank=True, verbose_name=_('Stored File'))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Completed At'))
+    
+    class Meta:
+        verbose_name = _('Chunked Upload')
+        verbose_name_plural = _('Chunked Uploads')
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+    
+    @property
+    def part_count(self):
+        return -(-self.size // self.chunk_size)
+    
+    def part_size(self, index):
+        """Expected size of part ``index``; only the last part is shorter"""
+        if index == self.part_count - 1:
+            return self.size - self.chunk_size * index
+        return self.chunk_size
+
+
+download_counter = counter(CourseFile, 'download_count')
@@ -0,0 +1,94 @@
+from elearning.cache import get_region
+
+from .models import Lesson
+
+CACHE_KEY = 'courses:navigation:{course_id}'
+
+region = get_region('course_catalog')
+
+
+class LessonEntry:
+    """Position of a single lesson in the flattened course sequence"""
+
+    __slots__ = ('id', 'title', 'chapter_id', 'chapter_title', 'position')
+
+    def __init__(self, id, title, chapter_id, chapter_title, position):
+        self.id = id
+        self.title = title
+        self.chapter_id = chapter_id
+        self.chapter_title = chapter_title
+        self.position = position
+
+    def __repr__(self):
+        return f"<LessonEntry {self.position}: {self.title}>"
+
+
+class NavigationIndex:
+    """
+    Flattened, ordered lesson sequence for one course.
+
+    All lookups are dictionary or list accesses, so once the index is
+    cached lesson navigation needs no queries.
+    """
+
+    def __init__(self, course_id, entries):
+        self.course_id = course_id
+        self.entries = entries
+        self.by_lesson = {entry.id: entry for entry in entries}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getstate__(self):
+        return {'course_id': self.course_id, 'entries': self.entries}
+
+    def __setstate__(self, state):
+        self.__init__(state['course_id'], state['entries'])
+
+    def position(self, lesson_id):
+        """Zero-based position of a lesson in the course, or None"""
+        entry = self.by_lesson.get(lesson_id)
+        return entry.position if entry else None
+
+    def next(self, lesson_id):
+        entry = self.by_lesson.get(lesson_id)
+        if entry is None or entry.position + 1 >= len(self.entries):
+            return None
+        return self.entries[entry.position + 1]
+
+    def previous(self, lesson_id):
+        entry = self.by_lesson.get(lesson_id)
+        if entry is None or entry.position == 0:
+            return None
+        return self.entries[entry.position - 1]
+
+    def resume(self, completed_lesson_ids):
+        """First lesson not yet completed, or None when all are done"""
+        for entry in self.entries:
+            if entry.id not in completed_lesson_ids:
+                return entry
+        return None
+
+
+def build_navigation_index(course_id):
+    rows = (
+        Lesson.objects.filter(chapter__course_id=course_id)
+        .order_by('chapter__order', 'chapter_id', 'order', 'id')
+        .values_list('id', 'title', 'chapter_id', 'chapter__title')
+    )
+    entries = [
+        LessonEntry(lesson_id, title, chapter_id, chapter_title, position)
+        for position, (lesson_id, title, chapter_id, chapter_title) in enumerate(rows)
+    ]
+    return NavigationIndex(course_id, entries)
+
+
+def get_navigation_index(course_id):
+    """Return the cached navigation index for a course, building it on a miss"""
+    return region.get_or_set(
+        CACHE_KEY.format(course_id=course_id), lambda: build_navigation_index(course_id)
+    )
+
+
+def invalidate_navigation_index(course_id):
+    region.delete(CACHE_KEY.format(course_id=course_id))
@@ -0,0 +1,107 @@
+from django.db.models import Prefetch
+
+from .models import Chapter, Lesson, LessonProgress
+from .progress import get_buffered_positions
+
+
+def _percentage(completed, total):
+    return round((completed / total * 100) if total > 0 else 0, 1)
+
+
+class CourseOutline:
+    """Chapters, lessons and a student's progress for one course"""
+
+    def __init__(self, course, chapters, progress):
+        self.course = course
+        self.chapters = chapters
+        self.progress = progress
+
+        self.lessons = [lesson for chapter in chapters for lesson in chapter.lessons.all()]
+        self.chapter_completion = {}
+        for chapter in chapters:
+            lessons = chapter.lessons.all()
+            completed = sum(1 for lesson in lessons if self.is_completed(lesson))
+            self.chapter_completion[chapter.id] = _percentage(completed, len(lessons))
+            chapter.completion = self.chapter_completion[chapter.id]
+
+        completed = sum(1 for lesson in self.lessons if self.is_completed(lesson))
+        self.completed_lessons = completed
+        self.completion = _percentage(completed, len(self.lessons))
+
+        # Durations come from the probed video files, so watched time is
+        # measured against them rather than against what the player reports
+        self.total_duration = sum(lesson.duration for lesson in self.lessons)
+        self.watched_duration = sum(self.watched_seconds(lesson) for lesson in self.lessons)
+        self.time_completion = _percentage(self.watched_duration, self.total_duration)
+
+    def get_progress(self, lesson):
+        """Stored progress for a lesson, or None"""
+        return self.progress.get(lesson.id)
+
+    def is_completed(self, lesson):
+        progress = self.progress.get(lesson.id)
+        return bool(progress and progress.is_completed)
+
+    def watched_seconds(self, lesson):
+        """Seconds of a lesson watched, at most its duration"""
+        if self.is_completed(lesson):
+            return lesson.duration
+        progress = self.progress.get(lesson.id)
+        return min(progress.current_position, lesson.duration) if progress else 0
+
+    def get_chapter(self, chapter_id):
+        for chapter in self.chapters:
+            if chapter.id == chapter_id:
+                return chapter
+        return None
+
+    def get_lesson(self, lesson_id):
+        for lesson in self.lessons:
+            if lesson.id == lesson_id:
+                return lesson
+        return None
+
+    @property
+    def progress_dict(self):
+        """Lesson id to progress for every lesson, None when not started"""
+        return {lesson.id: self.progress.get(lesson.id) for lesson in self.lessons}
+
+
+def load_course_outline(course, user=None):
+    """
+    Load a course outline in a fixed number of queries.
+
+    Chapters and their ordered lessons are fetched with one prefetch, and
+    the student's LessonProgress rows for the whole course with one more
+    query, regardless of how many chapters and lessons the course has.
+    Positions still buffered by courses.progress replace the stored ones.
+    """
+    chapters = list(
+        Chapter.objects.filter(course=course)
+        .order_by('order')
+        .prefetch_related(
+            Prefetch('lessons', queryset=Lesson.objects.order_by('order'))
+        )
+    )
+    for chapter in chapters:
+        chapter.course = course
+
+    progress = {}
+    if user is not None and user.is_authenticated:
+        progress = {
+            item.lesson_id: item
+            for item in LessonProgress.objects.filter(
+                student=user,
+                lesson__chapter__course=course
+            )
+        }
+        # Heartbeats not yet flushed to the database are newer than the rows
+        lesson_ids = [lesson.id for chapter in chapters for lesson in chapter.lessons.all()]
+        for lesson_id, position in get_buffered_positions(user.id, lesson_ids).items():
+            item = progress.get(lesson_id)
+            if item is None:
+                progress[lesson_id] = LessonProgress(student=user, lesson_id=lesson_id, current_position=position)
+            elif not item.is_completed:
+                item.current_position = position
+
+    return CourseOutline(course, chapters, progress)
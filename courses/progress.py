@@ -0,0 +1,180 @@
+import atexit
+import threading
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from elearning.cache import get_region
+from elearning.flushing import flusher
+from .models import Enrollment, Lesson, LessonProgress
+
+CACHE_KEY = 'courses:progress:{student_id}:{lesson_id}'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+region = get_region('lesson_progress')
+
+# Flush buffered positions at least this often (seconds) or once this many
+# (student, lesson) pairs are pending, whichever comes first
+FLUSH_INTERVAL = 30
+MAX_PENDING = 500
+
+
+def _parse_position(value):
+    try:
+        return max(int(float(value)), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse_flag(value):
+    """A JSON or form boolean; raises ValueError for anything else"""
+    if value in (True, 'true', '1', 1):
+        return True
+    if value in (None, False, 'false', '0', 0, ''):
+        return False
+    raise ValueError(f"Not a boolean: {value!r}")
+
+
+class ProgressBuffer:
+    """
+    Coalesces video heartbeat positions per (student, lesson).
+
+    Positions are kept in memory and mirrored to the cache so any process
+    can read the latest resume point. They reach the database in periodic
+    bulk_update flushes, started by a later heartbeat or by the periodic
+    flusher (see elearning.flushing); completion is written immediately.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, student_id, lesson_id, position, is_completed=False):
+        """Record a position update; completion bypasses the buffer"""
+        position = _parse_position(position)
+        key = CACHE_KEY.format(student_id=student_id, lesson_id=lesson_id)
+
+        if is_completed:
+            with self._lock:
+                self._pending.pop((student_id, lesson_id), None)
+            region.delete(key)
+            self._write_completion(student_id, lesson_id, position)
+            return
+
+        with self._lock:
+            self._pending[(student_id, lesson_id)] = position
+            due = (
+                len(self._pending) >= self.max_pending or
+                time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        region.set(key, position, CACHE_TIMEOUT)
+
+        if due:
+            self.flush()
+
+    def flush_if_due(self):
+        """Flush when the flush interval has passed since the last flush"""
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            return self.flush()
+        return 0
+
+    def flush(self):
+        """Write all pending positions with one bulk_update and one bulk_create"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        student_ids = {student_id for student_id, _ in pending}
+        lesson_ids = {lesson_id for _, lesson_id in pending}
+        now = timezone.now()
+
+        with transaction.atomic():
+            existing = {
+                (progress.student_id, progress.lesson_id): progress
+                for progress in LessonProgress.objects.filter(
+                    student_id__in=student_ids, lesson_id__in=lesson_ids
+                )
+            }
+
+            updated = []
+            created = []
+            for (student_id, lesson_id), position in pending.items():
+                progress = existing.get((student_id, lesson_id))
+                if progress is None:
+                    created.append(LessonProgress(
+                        student_id=student_id, lesson_id=lesson_id, current_position=position
+                    ))
+                elif progress.current_position != position:
+                    progress.current_position = position
+                    progress.last_watched = now
+                    updated.append(progress)
+
+            if updated:
+                LessonProgress.objects.bulk_update(updated, ['current_position', 'last_watched'])
+            if created:
+                LessonProgress.objects.bulk_create(created, ignore_conflicts=True)
+                _materialize_enrollments({(p.student_id, p.lesson_id) for p in created})
+
+        return len(updated) + len(created)
+
+    def _write_completion(self, student_id, lesson_id, position):
+        with transaction.atomic():
+            progress, created = LessonProgress.objects.get_or_create(
+                student_id=student_id, lesson_id=lesson_id
+            )
+            if position:
+                progress.current_position = position
+            progress.is_completed = True
+            progress.save()
+            if created:
+                _materialize_enrollments({(student_id, lesson_id)})
+
+
+def _materialize_enrollments(pairs):
+    """Store enrollments for students saving their first progress in a course"""
+    student_ids = set(
+        CustomUser.objects.filter(
+            id__in={student_id for student_id, _ in pairs}, user_type='student'
+        ).values_list('id', flat=True)
+    )
+    course_ids = dict(
+        Lesson.objects.filter(id__in={lesson_id for _, lesson_id in pairs})
+        .values_list('id', 'chapter__course_id')
+    )
+    Enrollment.objects.bulk_create(
+        [
+            Enrollment(student_id=student_id, course_id=course_id)
+            for student_id, course_id in {
+                (student_id, course_ids[lesson_id])
+                for student_id, lesson_id in pairs
+                if student_id in student_ids and lesson_id in course_ids
+            }
+        ],
+        ignore_conflicts=True
+    )
+
+
+def get_buffered_position(student_id, lesson_id):
+    """Latest position not yet flushed to the database, or None"""
+    return region.get(CACHE_KEY.format(student_id=student_id, lesson_id=lesson_id))
+
+
+def get_buffered_positions(student_id, lesson_ids):
+    """Positions not yet flushed for several lessons, {lesson_id: position}"""
+    keys = {CACHE_KEY.format(student_id=student_id, lesson_id=lesson_id): lesson_id for lesson_id in lesson_ids}
+    return {keys[key]: position for key, position in region.cache.get_many(keys).items()}
+
+
+progress_buffer = ProgressBuffer()
+atexit.register(progress_buffer.flush)
+flusher.register(progress_buffer.flush_if_due)
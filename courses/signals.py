@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .ingest import needs_probe
+from .models import Chapter, Lesson
+from .navigation import invalidate_navigation_index
+from .tasks import probe_lesson_video
+
+
+def _lesson_course_id(lesson):
+    if Lesson.chapter.is_cached(lesson):
+        return lesson.chapter.course_id
+    return Chapter.objects.filter(pk=lesson.chapter_id).values_list('course_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Chapter)
+def chapter_changed(sender, instance, **kwargs):
+    """Chapter order or title changed, rebuild the course lesson sequence"""
+    invalidate_navigation_index(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def lesson_changed(sender, instance, **kwargs):
+    """Lesson added, removed or reordered, rebuild the course lesson sequence"""
+    course_id = _lesson_course_id(instance)
+    if course_id is not None:
+        invalidate_navigation_index(course_id)
+
+
+@receiver(post_save, sender=Lesson)
+def lesson_video_saved(sender, instance, update_fields=None, **kwargs):
+    """Queue metadata extraction for a new or replaced video"""
+    if update_fields is not None and 'video' not in update_fields:
+        return
+    if needs_probe(instance):
+        probe_lesson_video.enqueue(lesson_id=instance.pk, file_name=instance.video.name)
@@ -0,0 +1,58 @@
+import logging
+
+from django.apps import apps
+
+from jobs.registry import task
+from .enrollment import reconcile_enrollments
+from .ingest import ingest_lesson_video
+from .models import Course, Lesson
+from .uploads import expire_uploads
+
+logger = logging.getLogger(__name__)
+
+
+@task('courses.remove_media_files', queue='maintenance', priority=-10, max_attempts=5)
+def remove_media_files(files):
+    """
+    Delete stored files left behind by deleted rows.
+
+    ``files`` are (model label, field name, file name) triples; the field
+    supplies the storage the file was saved with.
+    """
+    removed = 0
+    for label, field_name, name in files:
+        storage = apps.get_model(label)._meta.get_field(field_name).storage
+        try:
+            storage.delete(name)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.exception("Could not remove %s", name)
+            raise
+    return {'removed': removed}
+
+
+@task('courses.reconcile_enrollments', queue='maintenance', concurrency=1)
+def reconcile_enrollments_task(course_ids=None):
+    """Backfill enrollments for all or some published courses"""
+    courses = Course.objects.filter(id__in=course_ids) if course_ids else None
+    report = reconcile_enrollments(courses=courses)
+    return {'missing': report.missing, 'created': report.created, 'courses': report.courses_processed}
+
+
+@task('courses.expire_uploads', queue='maintenance', priority=-10, concurrency=1)
+def expire_uploads_task():
+    """Remove chunked uploads that were abandoned or never attached"""
+    return {'expired': expire_uploads()}
+
+
+@task('courses.probe_lesson_video', queue='media', max_attempts=3, retry_delay=60)
+def probe_lesson_video(lesson_id, file_name):
+    """Read duration, size and codec from an uploaded lesson video"""
+    lesson = Lesson.objects.filter(pk=lesson_id).first()
+    if lesson is None or lesson.video.name != file_name:
+        # Deleted, or replaced by a newer upload with its own job
+        return {'skipped': True}
+    media = ingest_lesson_video(lesson)
+    return {'status': media.status, 'duration': media.duration}
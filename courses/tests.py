@@ -1,3 +1,726 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from elearning.cache import clear_regions
+from elearning.counters import flush_counters
+from jobs.models import Job
+from jobs.worker import run_pending
+from .enrollment import is_enrolled, reconcile_enrollments
+from .media_probe import ProbeError, probe
+from .navigation import get_navigation_index
+from .outline import load_course_outline
+from .progress import ProgressBuffer, get_buffered_position, progress_buffer
+from .models import (
+    Chapter, ChunkedUpload, Course, CourseFile, Enrollment, Lesson, LessonMedia, LessonProgress, download_counter
+)
+from .uploads import MIN_CHUNK_SIZE, expire_uploads, received_parts
+from .views import LessonDetailView, TeacherCourseListView
+
+
+class CourseTestMixin:
+    """Shared fixtures for course tests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = CustomUser.objects.create_user(
+            username='teacher', email='teacher@example.com', user_type='teacher'
+        )
+        cls.student = CustomUser.objects.create_user(
+            username='student', email='student@example.com'
+        )
+
+    @classmethod
+    def create_course(cls, title='Course', **kwargs):
+        kwargs.setdefault('is_published', True)
+        return Course.objects.create(title=title, instructor=cls.teacher, overview='Overview', **kwargs)
+
+
+class EnrollmentReconcilerTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        self.students = [self.student] + [
+            CustomUser.objects.create_user(username=f's{i}', email=f's{i}@example.com')
+            for i in range(4)
+        ]
+        self.courses = [self.create_course(f'Course {i}') for i in range(3)]
+        self.create_course('Draft', is_published=False)
+        Enrollment.objects.create(student=self.student, course=self.courses[0])
+
+    def test_creates_only_missing_pairs(self):
+        report = reconcile_enrollments(batch_size=2)
+        self.assertEqual(report.missing, 5 * 3 - 1)
+        self.assertEqual(report.created, 5 * 3 - 1)
+        self.assertEqual(Enrollment.objects.count(), 15)
+        self.assertEqual(reconcile_enrollments().missing, 0)
+
+    def test_dry_run_writes_nothing(self):
+        report = reconcile_enrollments(dry_run=True)
+        self.assertEqual(report.missing, 14)
+        self.assertEqual(report.created, 0)
+        self.assertEqual(Enrollment.objects.count(), 1)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('auto_enroll_students', '--batch-size', '3', stdout=out)
+        self.assertIn('成功创建 14 条', out.getvalue())
+        self.assertEqual(Enrollment.objects.count(), 15)
+
+
+class LazyEnrollmentTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        self.course = self.create_course()
+
+    def test_course_detail_does_not_write(self):
+        self.client.force_login(self.student)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('courses:course_detail', args=[self.course.slug]))
+        self.assertTrue(response.context['is_enrolled'])
+        writes = [q['sql'] for q in queries if not q['sql'].lstrip().upper().startswith(('SELECT', 'SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(writes, [])
+        self.assertFalse(Enrollment.objects.exists())
+
+    def test_teacher_course_list_counts_policy_students(self):
+        draft = self.create_course('Draft', is_published=False)
+        Enrollment.objects.create(student=self.student, course=draft)
+        CustomUser.objects.create_user(username='other', email='other@example.com')
+        # The course detail route shadows manage/, so call the view directly
+        request = RequestFactory().get('/courses/manage/')
+        request.user = self.teacher
+        response = TeacherCourseListView.as_view()(request).render()
+        counts = {course.title: course.student_count for course in response.context_data['courses']}
+        self.assertEqual(counts, {'Course': 2, 'Draft': 1})
+
+    def test_policy(self):
+        draft = self.create_course('Draft', is_published=False)
+        self.assertTrue(is_enrolled(self.student, self.course))
+        self.assertFalse(is_enrolled(self.student, draft))
+        self.assertTrue(is_enrolled(self.teacher, draft))
+
+    def test_materialize_on_first_progress_save(self):
+        chapter = Chapter.objects.create(course=self.course, title='Chapter')
+        lesson = Lesson.objects.create(chapter=chapter, title='Lesson', video='v.mp4', duration=60)
+        self.client.force_login(self.student)
+        response = self.client.post(
+            reverse('courses:save_lesson_progress', args=[self.course.slug, lesson.id]),
+            {'current_position': 10}
+        )
+        self.assertEqual(response.status_code, 200)
+        progress_buffer.flush()
+        self.assertTrue(Enrollment.objects.filter(student=self.student, course=self.course).exists())
+
+
+class CourseOutlineTests(CourseTestMixin, TestCase):
+
+    def build_course(self, chapters, lessons_per_chapter):
+        course = self.create_course(f'Outline {chapters}')
+        for c in range(chapters):
+            chapter = Chapter.objects.create(course=course, title=f'Chapter {c}', order=c)
+            for l in range(lessons_per_chapter):
+                lesson = Lesson.objects.create(
+                    chapter=chapter, title=f'Lesson {l}', video='v.mp4', duration=60, order=l
+                )
+                if l == 0:
+                    LessonProgress.objects.create(student=self.student, lesson=lesson, is_completed=True)
+        return course
+
+    def test_fixed_query_count(self):
+        for chapters, lessons in [(1, 1), (4, 5)]:
+            course = self.build_course(chapters, lessons)
+            with self.assertNumQueries(3):
+                outline = load_course_outline(course, self.student)
+                titles = [lesson.title for chapter in outline.chapters for lesson in chapter.lessons.all()]
+                [lesson.chapter.course.title for lesson in outline.lessons]
+            self.assertEqual(len(titles), chapters * lessons)
+
+    def test_chapter_completion(self):
+        course = self.build_course(2, 4)
+        outline = load_course_outline(course, self.student)
+        self.assertEqual(list(outline.chapter_completion.values()), [25.0, 25.0])
+        self.assertEqual(outline.completion, 25.0)
+        self.assertEqual(sum(1 for value in outline.progress_dict.values() if value is None), 6)
+
+
+class NavigationIndexTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        clear_regions()
+        self.course = self.create_course()
+        self.first = Chapter.objects.create(course=self.course, title='First', order=1)
+        self.second = Chapter.objects.create(course=self.course, title='Second', order=2)
+        self.a = Lesson.objects.create(chapter=self.first, title='A', video='v.mp4', duration=60, order=1)
+        self.b = Lesson.objects.create(chapter=self.first, title='B', video='v.mp4', duration=60, order=2)
+        self.c = Lesson.objects.create(chapter=self.second, title='C', video='v.mp4', duration=60, order=1)
+
+    def test_lookups_without_queries(self):
+        get_navigation_index(self.course.id)
+        with self.assertNumQueries(0):
+            index = get_navigation_index(self.course.id)
+            self.assertEqual(index.next(self.b.id).id, self.c.id)
+            self.assertEqual(index.previous(self.c.id).id, self.b.id)
+            self.assertIsNone(index.previous(self.a.id))
+            self.assertIsNone(index.next(self.c.id))
+            self.assertEqual(index.position(self.c.id), 2)
+            self.assertEqual(index.resume({self.a.id}).id, self.b.id)
+            self.assertIsNone(index.resume({self.a.id, self.b.id, self.c.id}))
+
+    def test_lesson_detail_uses_outline_and_index(self):
+        LessonProgress.objects.create(student=self.student, lesson=self.b, current_position=30)
+        request = RequestFactory().get('/')
+        request.user = self.student
+        view = LessonDetailView()
+        view.setup(request, course_slug=self.course.slug, chapter_id=self.first.id, lesson_id=self.b.id)
+        view.object = view.get_object()
+        context = view.get_context_data()
+        self.assertEqual(context['outline'].completion, 0)
+        self.assertEqual(context['progress'].current_position, 30)
+        self.assertEqual((context['previous_lesson'].id, context['next_lesson'].id), (self.a.id, self.c.id))
+        self.assertEqual((context['lesson_position'], context['lesson_count']), (1, 3))
+
+    def test_reorder_invalidates(self):
+        get_navigation_index(self.course.id)
+        self.second.order = 0
+        self.second.save()
+        index = get_navigation_index(self.course.id)
+        self.assertEqual([entry.id for entry in index.entries], [self.c.id, self.a.id, self.b.id])
+        self.b.delete()
+        self.assertEqual(len(get_navigation_index(self.course.id)), 2)
+
+
+class ProgressBufferTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        clear_regions()
+        course = self.create_course()
+        chapter = Chapter.objects.create(course=course, title='Chapter')
+        self.lessons = [
+            Lesson.objects.create(chapter=chapter, title=f'L{i}', video='v.mp4', duration=600, order=i)
+            for i in range(3)
+        ]
+        self.buffer = ProgressBuffer(flush_interval=3600, max_pending=100)
+
+    def test_heartbeats_are_coalesced(self):
+        with self.assertNumQueries(0):
+            for position in range(0, 100, 5):
+                for lesson in self.lessons:
+                    self.buffer.record(self.student.id, lesson.id, position)
+        self.assertEqual(len(self.buffer), 3)
+        self.assertEqual(get_buffered_position(self.student.id, self.lessons[0].id), 95)
+        self.buffer.flush()
+        self.assertEqual(
+            list(LessonProgress.objects.values_list('current_position', flat=True)), [95, 95, 95]
+        )
+        self.buffer.record(self.student.id, self.lessons[0].id, 120)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(LessonProgress.objects.get(lesson=self.lessons[0]).current_position, 120)
+
+    def test_completion_is_written_immediately(self):
+        self.buffer.record(self.student.id, self.lessons[1].id, 30)
+        self.buffer.record(self.student.id, self.lessons[1].id, 600, is_completed=True)
+        progress = LessonProgress.objects.get(lesson=self.lessons[1])
+        self.assertTrue(progress.is_completed)
+        self.assertEqual(progress.current_position, 600)
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_batch_view(self):
+        self.client.force_login(self.student)
+        response = self.client.post(
+            reverse('courses:save_progress_batch'),
+            data=json.dumps({'updates': [
+                {'lesson_id': self.lessons[0].id, 'current_position': 42},
+                {'lesson_id': 0, 'current_position': 1},
+            ]}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.json()['accepted'], 1)
+        self.assertEqual(get_buffered_position(self.student.id, self.lessons[0].id), 42)
+        progress_buffer.flush()
+
+    def test_batch_view_parses_flags_strictly(self):
+        self.client.force_login(self.student)
+        url = reverse('courses:save_progress_batch')
+        response = self.client.post(url, data=json.dumps({'updates': [
+            {'lesson_id': self.lessons[0].id, 'current_position': 42, 'is_completed': 'false'},
+        ]}), content_type='application/json')
+        self.assertEqual(response.json()['accepted'], 1)
+        self.assertFalse(LessonProgress.objects.filter(is_completed=True).exists())
+        progress_buffer.flush()
+
+        for payload in [{'updates': None}, {}, [], {'updates': [{'lesson_id': self.lessons[0].id, 'is_completed': 'yes'}]}]:
+            response = self.client.post(url, data=json.dumps(payload), content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_outline_includes_unflushed_positions(self):
+        LessonProgress.objects.create(student=self.student, lesson=self.lessons[0], current_position=10)
+        self.buffer.record(self.student.id, self.lessons[0].id, 200)
+        self.buffer.record(self.student.id, self.lessons[1].id, 50)
+        outline = load_course_outline(self.lessons[0].chapter.course, self.student)
+        self.assertEqual(outline.get_progress(self.lessons[0]).current_position, 200)
+        self.assertEqual(outline.get_progress(self.lessons[1]).current_position, 50)
+        self.assertIsNone(outline.get_progress(self.lessons[2]))
+
+    def test_idle_buffer_flushes_when_due(self):
+        buffer = ProgressBuffer(flush_interval=0, max_pending=100)
+        buffer._pending[(self.student.id, self.lessons[2].id)] = 33
+        self.assertEqual(buffer.flush_if_due(), 1)
+        self.assertEqual(LessonProgress.objects.get(lesson=self.lessons[2]).current_position, 33)
+        self.assertEqual(self.buffer.flush_if_due(), 0)
+
+
+class CascadeDeletionTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def populate(self, course):
+        from ai_assistant.models import LearningRecommendation, UserQuery
+        from forum.models import Comment, Post
+        from quizzes.models import Choice, Question, Quiz, QuizAttempt, StudentAnswer
+
+        chapter = Chapter.objects.create(course=course, title='Chapter')
+        lesson = Lesson.objects.create(
+            chapter=chapter, title='Lesson', duration=60,
+            video=SimpleUploadedFile('video.mp4', b'video')
+        )
+        LessonProgress.objects.create(student=self.student, lesson=lesson)
+        Enrollment.objects.create(student=self.student, course=course)
+        CourseFile.objects.create(
+            course=course, title='Notes', uploaded_by=self.teacher,
+            file=SimpleUploadedFile('notes.pdf', b'notes')
+        )
+
+        quiz = Quiz.objects.create(title='Quiz', course=course)
+        question = Question.objects.create(quiz=quiz, question_text='Q')
+        choice = Choice.objects.create(question=question, choice_text='A', is_correct=True)
+        for student in [self.student, self.teacher]:
+            attempt = QuizAttempt.objects.create(quiz=quiz, student=student)
+            StudentAnswer.objects.create(attempt=attempt, question=question, selected_choice=choice)
+
+        post = Post.objects.create(board=course.discussion_board, author=self.student, title='P', content='C')
+        parent = Comment.objects.create(post=post, author=self.student, content='C')
+        Comment.objects.create(post=post, author=self.teacher, content='R', parent=parent)
+
+        query = UserQuery.objects.create(user=self.student, query='q', response='r', course=course)
+        recommendation = LearningRecommendation.objects.create(user=self.student, title='T', description='D')
+        recommendation.recommended_courses.add(course)
+        return lesson, query, recommendation
+
+    def test_course_delete(self):
+        from quizzes.models import QuizAttempt, StudentAnswer
+
+        course = self.create_course()
+        other = self.create_course('Other')
+        lesson, query, recommendation = self.populate(course)
+        self.populate(other)
+        video_path = lesson.video.path
+        self.assertTrue(os.path.exists(video_path))
+
+        deleted, counts = course.delete()
+        self.assertTrue(os.path.exists(video_path))
+        # File cleanup only; the fixture videos are not real media to probe
+        run_pending(queues=['maintenance'])
+
+        self.assertFalse(Course.objects.filter(title='Course').exists())
+        self.assertEqual(counts['quizzes.StudentAnswer'], 2)
+        self.assertEqual(counts['forum.Comment'], 2)
+        self.assertEqual(StudentAnswer.objects.count(), 2)
+        self.assertEqual(QuizAttempt.objects.count(), 2)
+        self.assertEqual(Lesson.objects.count(), 1)
+        query.refresh_from_db()
+        self.assertIsNone(query.course_id)
+        self.assertFalse(recommendation.recommended_courses.exists())
+        self.assertFalse(os.path.exists(video_path))
+        self.assertEqual(CourseFile.objects.count(), 1)
+        self.assertTrue(os.path.exists(CourseFile.objects.get().file.path))
+
+    def test_cached_aggregates_of_deleted_rows_are_invalidated(self):
+        from accounts import dashboard
+        from forum import summaries
+        from quizzes import analytics
+        from .deletion import delete_cascade
+
+        course = self.create_course()
+        self.populate(course)
+        quiz_id = course.quizzes.get().id
+        keys = [
+            (dashboard.region, dashboard.CACHE_KEY.format(user_id=self.student.id)),
+            (dashboard.region, dashboard.CACHE_KEY.format(user_id=self.teacher.id)),
+            (analytics.region, analytics.CACHE_KEY.format(quiz_id=quiz_id)),
+            (summaries.region, summaries.CACHE_KEY),
+        ]
+        for region, key in keys:
+            region.set(key, 'stale')
+
+        # Without Course.delete, so no post_delete of the course itself
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_cascade(Course._base_manager.filter(pk=course.pk))
+        self.assertEqual([region.get(key) for region, key in keys], [None] * len(keys))
+
+    def test_files_kept_when_rolled_back(self):
+        from django.db import transaction
+
+        course = self.create_course()
+        lesson, query, recommendation = self.populate(course)
+        try:
+            with transaction.atomic():
+                course.delete()
+                self.assertTrue(Job.objects.filter(name='courses.remove_media_files').exists())
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(Job.objects.filter(name='courses.remove_media_files').exists())
+        self.assertTrue(Course.objects.filter(title='Course').exists())
+        self.assertTrue(os.path.exists(lesson.video.path))
+
+
+class FileDeliveryTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        flush_counters()
+        clear_regions()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.course = self.create_course()
+        self.content = bytes(range(256)) * 40
+        self.course_file = CourseFile.objects.create(
+            course=self.course, title='Notes', uploaded_by=self.teacher,
+            file=SimpleUploadedFile('notes.pdf', self.content)
+        )
+        chapter = Chapter.objects.create(course=self.course, title='Chapter')
+        self.lesson = Lesson.objects.create(
+            chapter=chapter, title='Lesson', duration=60,
+            video=SimpleUploadedFile('video.mp4', self.content)
+        )
+        self.url = reverse('courses:course_file_download', args=[self.course.slug, self.course_file.id])
+        self.client.force_login(self.student)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_full_download_and_conditional_get(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('attachment', response['Content-Disposition'])
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MATCH='"other"').status_code, 412)
+
+        # Revalidations are not downloads; the count is read before any flush
+        self.assertEqual(download_counter.value(self.course_file), 1)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '100')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-10:])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10000-')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10000:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+        # Multiple ranges and a stale If-Range fall back to the whole file
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-1,5-6').status_code, 200)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+        # Only the 200s count; resumed ranges do not
+        flush_counters()
+        self.course_file.refresh_from_db()
+        self.assertEqual(self.course_file.download_count, 2)
+
+    def test_lesson_video(self):
+        url = reverse('courses:lesson_video', args=[self.course.slug, self.lesson.id])
+        response = self.client.get(url, HTTP_RANGE='bytes=0-99')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertNotIn('attachment', response.get('Content-Disposition', ''))
+        self.assertEqual(b''.join(response.streaming_content), self.content[:100])
+        self.assertEqual(
+            self.client.get(reverse('courses:lesson_video', args=['other', self.lesson.id])).status_code, 404
+        )
+
+    def test_offloaded_delivery(self):
+        with override_settings(PROTECTED_MEDIA_BACKEND='x-accel-redirect'):
+            response = self.client.get(self.url)
+            self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.course_file.file.name}')
+            self.assertEqual(response.content, b'')
+            self.assertIn('attachment', response['Content-Disposition'])
+            # The proxy resumes the transfer, which is not a new download
+            self.client.get(self.url, HTTP_RANGE='bytes=100-')
+        with override_settings(PROTECTED_MEDIA_BACKEND='x-sendfile'):
+            response = self.client.get(reverse('courses:lesson_video', args=[self.course.slug, self.lesson.id]))
+            self.assertEqual(response['X-Sendfile'], os.path.realpath(self.lesson.video.path))
+            self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(download_counter.value(self.course_file), 1)
+
+
+class ChunkedUploadTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.course = self.create_course()
+        self.content = os.urandom(MIN_CHUNK_SIZE * 2 + 1000)
+        self.client.force_login(self.teacher)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def start(self, **data):
+        data = {
+            'target': 'course_file', 'filename': 'lecture notes.pdf', 'size': len(self.content),
+            'chunk_size': MIN_CHUNK_SIZE, 'sha256': hashlib.sha256(self.content).hexdigest(), **data
+        }
+        return self.client.post(reverse('courses:chunked_upload_start'), json.dumps(data), content_type='application/json')
+
+    def put_part(self, upload_id, index, data=None, checksum=None):
+        data = self.content[index * MIN_CHUNK_SIZE:(index + 1) * MIN_CHUNK_SIZE] if data is None else data
+        return self.client.put(
+            reverse('courses:chunked_upload_part', args=[upload_id, index]), data,
+            content_type='application/octet-stream',
+            HTTP_X_PART_SHA256=checksum or hashlib.sha256(data).hexdigest()
+        )
+
+    def test_resumable_upload_attached_to_course_file(self):
+        status = self.start().json()
+        upload_id = status['upload_id']
+        self.assertEqual((status['part_count'], status['received']), (3, []))
+
+        self.assertEqual(self.put_part(upload_id, 2).status_code, 200)
+        self.assertEqual(self.put_part(upload_id, 0).status_code, 200)
+        # Interrupted here; the client asks what the server already has
+        detail = reverse('courses:chunked_upload_detail', args=[upload_id])
+        self.assertEqual(self.client.get(detail).json()['received'], [0, 2])
+        complete = reverse('courses:chunked_upload_complete', args=[upload_id])
+        response = self.client.post(complete)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Missing parts: 1', response.json()['error'])
+
+        self.put_part(upload_id, 1)
+        status = self.client.post(complete).json()
+        self.assertEqual(status['status'], 'complete')
+        self.assertTrue(status['file_name'].startswith('course_files/lecture_notes'))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'chunked_uploads', upload_id)))
+
+        response = self.client.post(
+            reverse('courses:course_file_upload', args=[self.course.slug]),
+            {'title': 'Notes', 'description': 'Week 1', 'file_upload': upload_id}
+        )
+        self.assertEqual(response.status_code, 302)
+        course_file = CourseFile.objects.get()
+        self.assertEqual(course_file.file.name, status['file_name'])
+        with course_file.file.open('rb') as file:
+            self.assertEqual(file.read(), self.content)
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_parts_and_file_are_verified(self):
+        upload_id = self.start(sha256=hashlib.sha256(b'other').hexdigest()).json()['upload_id']
+        self.assertEqual(self.put_part(upload_id, 0, checksum='0' * 64).status_code, 400)
+        self.assertEqual(self.put_part(upload_id, 0, data=b'short').status_code, 400)
+        self.assertEqual(self.put_part(upload_id, 3, data=b'extra').status_code, 400)
+        for index in range(3):
+            self.put_part(upload_id, index)
+        response = self.client.post(reverse('courses:chunked_upload_complete', args=[upload_id]))
+        self.assertEqual(response.json()['error'], 'File does not match its checksum.')
+        # Parts are kept so the client can resend the bad ones
+        self.assertEqual(ChunkedUpload.objects.get().status, ChunkedUpload.UPLOADING)
+        self.assertEqual(len(received_parts(ChunkedUpload.objects.get())), 3)
+
+        self.client.delete(reverse('courses:chunked_upload_detail', args=[upload_id]))
+        self.assertFalse(ChunkedUpload.objects.exists())
+
+    def test_only_owner_and_teachers(self):
+        self.assertEqual(self.start(target='unknown').status_code, 400)
+        upload_id = self.start().json()['upload_id']
+        self.client.force_login(self.student)
+        self.assertEqual(self.start().status_code, 403)
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', user_type='teacher')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('courses:chunked_upload_detail', args=[upload_id])).status_code, 404)
+        response = self.client.post(
+            reverse('courses:course_file_upload', args=[self.course.slug]),
+            {'title': 'Notes', 'description': 'D', 'file_upload': upload_id}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(CourseFile.objects.exists())
+
+    def test_abandoned_uploads_expire(self):
+        upload_id = self.start().json()['upload_id']
+        self.put_part(upload_id, 0)
+        ChunkedUpload.objects.update(created_at=timezone.now() - timedelta(days=3))
+        self.assertEqual(expire_uploads(), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'chunked_uploads', upload_id)))
+
+
+def mp4_box(box_type, payload):
+    return struct.pack('>I4s', len(payload) + 8, box_type) + payload
+
+
+def build_mp4(seconds, width, height, timescale=1000):
+    """Minimal MP4 headers: one video track and a stand-in mdat"""
+    mvhd = mp4_box(b'mvhd', bytes(4) + struct.pack('>IIII', 0, 0, timescale, seconds * timescale) + bytes(80))
+    tkhd = mp4_box(b'tkhd', bytes(76) + struct.pack('>II', width << 16, height << 16))
+    mdhd = mp4_box(b'mdhd', bytes(4) + struct.pack('>IIII', 0, 0, 90000, seconds * 90000) + bytes(4))
+    hdlr = mp4_box(b'hdlr', bytes(8) + b'vide' + bytes(12) + b'Video\x00')
+    stsd = mp4_box(b'stsd', bytes(4) + struct.pack('>I', 1) + mp4_box(b'avc1', bytes(78)))
+    minf = mp4_box(b'minf', mp4_box(b'stbl', stsd))
+    trak = mp4_box(b'trak', tkhd + mp4_box(b'mdia', mdhd + hdlr + minf))
+    return (
+        mp4_box(b'ftyp', b'isom' + bytes(4) + b'isomavc1') +
+        mp4_box(b'moov', mvhd + trak) +
+        mp4_box(b'mdat', bytes(4096))
+    )
+
+
+def ebml(element_id, payload):
+    """One EBML element with an 8 byte size"""
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big')
+    return id_bytes + bytes([0x01]) + len(payload).to_bytes(7, 'big') + payload
+
+
+def build_webm(seconds, width, height):
+    """Minimal WebM headers: Info, one video track and a stand-in Cluster"""
+    header = ebml(0x1A45DFA3, ebml(0x4282, b'webm'))
+    info = ebml(0x1549A966, ebml(0x2AD7B1, (1000000).to_bytes(3, 'big')) + ebml(0x4489, struct.pack('>d', seconds * 1000.0)))
+    video = ebml(0xE0, ebml(0xB0, width.to_bytes(2, 'big')) + ebml(0xBA, height.to_bytes(2, 'big')))
+    track = ebml(0xAE, ebml(0x83, bytes([1])) + ebml(0x86, b'V_VP9') + video)
+    cluster = ebml(0x1F43B675, bytes(4096))
+    return header + ebml(0x18538067, info + ebml(0x1654AE6B, track) + cluster)
+
+
+class LessonMediaTests(CourseTestMixin, TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.course = self.create_course()
+        self.chapter = Chapter.objects.create(course=self.course, title='Chapter', order=1)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.media_root, name)
+        with open(path, 'wb') as file:
+            file.write(content)
+        return path
+
+    def create_lesson(self, content, name='lesson.mp4', **kwargs):
+        return Lesson.objects.create(
+            chapter=self.chapter, title=name, video=SimpleUploadedFile(name, content), **kwargs
+        )
+
+    def test_probe_reads_mp4_and_webm_headers(self):
+        content = build_mp4(125, 1280, 720)
+        info = probe(self.write('a.mp4', content))
+        self.assertEqual((info.container, info.duration, info.width, info.height), ('mp4', 125, 1280, 720))
+        self.assertEqual(info.video_codec, 'avc1')
+        self.assertEqual(info.bitrate, int(len(content) * 8 / 125))
+
+        info = probe(self.write('b.webm', build_webm(90.5, 640, 360)))
+        self.assertEqual((info.container, info.duration, info.width, info.height), ('webm', 90.5, 640, 360))
+        self.assertEqual(info.video_codec, 'V_VP9')
+
+    def test_probe_rejects_other_files(self):
+        with self.assertRaises(ProbeError):
+            probe(self.write('notes.txt', b'not a video at all'))
+        with self.assertRaises(ProbeError):
+            probe(self.write('cut.mp4', build_mp4(10, 320, 240)[:60]))
+
+    def test_uploaded_video_is_probed_in_background(self):
+        lesson = self.create_lesson(build_mp4(300, 1920, 1080))
+        self.assertEqual(Job.objects.filter(name='courses.probe_lesson_video').count(), 1)
+        self.assertEqual(Lesson.objects.get(pk=lesson.pk).duration, 0)
+
+        run_pending(queues=['media'])
+        lesson = Lesson.objects.select_related('media').get(pk=lesson.pk)
+        self.assertEqual(lesson.duration, 300)
+        self.assertEqual(lesson.media.status, LessonMedia.READY)
+        self.assertEqual((lesson.media.width, lesson.media.height), (1920, 1080))
+        self.assertEqual(lesson.media.file_name, lesson.video.name)
+
+        # Saving the lesson again does not probe the same file twice
+        lesson.title = 'Renamed'
+        lesson.save()
+        self.assertEqual(Job.objects.filter(name='courses.probe_lesson_video').count(), 1)
+
+        lesson.video = SimpleUploadedFile('new.webm', build_webm(60, 640, 360))
+        lesson.save()
+        run_pending(queues=['media'])
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.duration, 60)
+        self.assertEqual(lesson.media.container, 'webm')
+
+    def test_unreadable_video_is_recorded_as_failed(self):
+        lesson = self.create_lesson(b'garbage' * 100, name='broken.mp4')
+        with self.assertLogs('courses.ingest', 'WARNING') as logs:
+            run_pending(queues=['media'])
+        self.assertIn(f'Could not read video of lesson {lesson.pk}', logs.output[0])
+        media = LessonMedia.objects.get(lesson=lesson)
+        self.assertEqual(media.status, LessonMedia.FAILED)
+        self.assertTrue(media.error)
+
+    def test_backfill_command(self):
+        lesson = self.create_lesson(build_mp4(42, 320, 240))
+        Job.objects.all().delete()
+        out = StringIO()
+        call_command('probe_lesson_videos', stdout=out)
+        self.assertEqual(Lesson.objects.get(pk=lesson.pk).duration, 42)
+        self.assertIn('1', out.getvalue())
+
+    def test_outline_totals_use_video_durations(self):
+        first = self.create_lesson(build_mp4(100, 320, 240), order=1)
+        second = self.create_lesson(build_mp4(300, 320, 240), order=2)
+        run_pending(queues=['media'])
+        LessonProgress.objects.create(student=self.student, lesson=first, current_position=100, is_completed=True)
+        # Positions past the end of the video count as the whole video
+        LessonProgress.objects.create(student=self.student, lesson=second, current_position=5000)
+
+        outline = load_course_outline(self.course, self.student)
+        self.assertEqual(outline.total_duration, 400)
+        self.assertEqual(outline.watched_duration, 400)
+        LessonProgress.objects.filter(lesson=second).update(current_position=100)
+        outline = load_course_outline(self.course, self.student)
+        self.assertEqual(outline.watched_duration, 200)
+        self.assertEqual(outline.time_completion, 50.0)
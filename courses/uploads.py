@@ -0,0 +1,214 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+from django.utils.translation import gettext as _
+
+from .models import ChunkedUpload, CourseFile, Lesson
+
+# Large files arrive as numbered parts of ``chunk_size`` bytes (the last
+# part may be shorter), each written straight to its own file under
+# MEDIA_ROOT/chunked_uploads/<upload id>/. A part can be sent again until
+# it arrives whole, so an interrupted upload resumes from the parts the
+# server reports as received. Completing the upload copies the parts into
+# one file, hashing as it goes, and moves that file into place in the
+# target field's storage without reading it into memory.
+
+UPLOAD_DIR = 'chunked_uploads'
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+BLOCK_SIZE = 1024 * 1024
+# Unfinished uploads older than this are removed by courses.expire_uploads
+UPLOAD_EXPIRY = timedelta(days=2)
+
+TARGETS = {
+    ChunkedUpload.LESSON_VIDEO: (Lesson, 'video'),
+    ChunkedUpload.COURSE_FILE: (CourseFile, 'file'),
+}
+
+SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class AssembledFile(File):
+    """A finished upload on local disk; lets storage move it instead of copying"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def max_upload_size():
+    return getattr(settings, 'CHUNKED_UPLOAD_MAX_SIZE', 20 * 1024 ** 3)
+
+
+def upload_dir(upload):
+    return Path(settings.MEDIA_ROOT) / UPLOAD_DIR / str(upload.id)
+
+
+def _part_path(upload, index):
+    return upload_dir(upload) / f'{index:06d}.part'
+
+
+def _target_field(target):
+    model, field_name = TARGETS[target]
+    return model._meta.get_field(field_name)
+
+
+def start_upload(owner, target, filename, size, sha256='', chunk_size=None):
+    """Validate an upload's metadata and create its ChunkedUpload"""
+    if target not in TARGETS:
+        raise ValidationError(_("Unknown upload target."))
+    filename = get_valid_filename(os.path.basename(str(filename or '')))[:200]
+    if not filename:
+        raise ValidationError(_("A file name is required."))
+    try:
+        size = int(size)
+        chunk_size = int(chunk_size or DEFAULT_CHUNK_SIZE)
+    except (TypeError, ValueError):
+        raise ValidationError(_("Size and chunk size must be numbers."))
+    if not 0 < size <= max_upload_size():
+        raise ValidationError(_("File size is out of range."))
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        raise ValidationError(_("Chunk size is out of range."))
+    sha256 = (sha256 or '').lower()
+    if sha256 and not SHA256_RE.match(sha256):
+        raise ValidationError(_("Checksum must be a SHA-256 hex digest."))
+
+    upload = ChunkedUpload.objects.create(
+        owner=owner, target=target, filename=filename,
+        size=size, chunk_size=chunk_size, sha256=sha256
+    )
+    upload_dir(upload).mkdir(parents=True, exist_ok=True)
+    return upload
+
+
+def received_parts(upload):
+    """Indexes of the parts stored so far"""
+    directory = upload_dir(upload)
+    if not directory.is_dir():
+        return []
+    return sorted(int(path.stem) for path in directory.glob('*.part'))
+
+
+def write_part(upload, index, stream, length, sha256=None):
+    """
+    Store part ``index`` read from ``stream`` in blocks.
+
+    The part goes to a temporary file first and replaces any earlier copy
+    only once it has the expected length and, when ``sha256`` is given,
+    that checksum.
+    """
+    if upload.status != ChunkedUpload.UPLOADING:
+        raise ValidationError(_("Upload is no longer accepting parts."))
+    if not 0 <= index < upload.part_count:
+        raise ValidationError(_("Part number is out of range."))
+    expected = upload.part_size(index)
+    if length != expected:
+        raise ValidationError(_("Part {} must be {} bytes.").format(index, expected))
+
+    path = _part_path(upload, index)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    temporary = Path(temporary)
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with os.fdopen(descriptor, 'wb') as output:
+            while written < expected:
+                block = stream.read(min(BLOCK_SIZE, expected - written))
+                if not block:
+                    break
+                output.write(block)
+                digest.update(block)
+                written += len(block)
+        if written != expected:
+            raise ValidationError(_("Part {} was cut short.").format(index))
+        if sha256 and digest.hexdigest() != sha256.lower():
+            raise ValidationError(_("Part {} does not match its checksum.").format(index))
+        os.replace(temporary, path)
+    finally:
+        temporary.unlink(missing_ok=True)
+    return written
+
+
+def complete_upload(upload):
+    """Assemble the parts, verify size and checksum, and store the file"""
+    # Only one request may assemble an upload
+    claimed = ChunkedUpload.objects.filter(pk=upload.pk, status=ChunkedUpload.UPLOADING).update(
+        status=ChunkedUpload.ASSEMBLING
+    )
+    if not claimed:
+        raise ValidationError(_("Upload is already complete."))
+
+    directory = upload_dir(upload)
+    assembled = directory / 'assembled'
+    try:
+        missing = sorted(set(range(upload.part_count)) - set(received_parts(upload)))
+        if missing:
+            raise ValidationError(_("Missing parts: {}.").format(', '.join(map(str, missing[:20]))))
+
+        digest = hashlib.sha256()
+        with open(assembled, 'wb') as output:
+            for index in range(upload.part_count):
+                with open(_part_path(upload, index), 'rb') as part:
+                    while block := part.read(BLOCK_SIZE):
+                        output.write(block)
+                        digest.update(block)
+        if assembled.stat().st_size != upload.size:
+            raise ValidationError(_("Assembled file has the wrong size."))
+        if upload.sha256 and digest.hexdigest() != upload.sha256:
+            raise ValidationError(_("File does not match its checksum."))
+
+        field = _target_field(upload.target)
+        with open(assembled, 'rb') as file:
+            name = field.storage.save(field.generate_filename(None, upload.filename), AssembledFile(file))
+    except BaseException:
+        assembled.unlink(missing_ok=True)
+        ChunkedUpload.objects.filter(pk=upload.pk).update(status=ChunkedUpload.UPLOADING)
+        upload.status = ChunkedUpload.UPLOADING
+        raise
+
+    shutil.rmtree(directory, ignore_errors=True)
+    upload.status = ChunkedUpload.COMPLETE
+    upload.file_name = name
+    upload.completed_at = timezone.now()
+    upload.save(update_fields=['status', 'file_name', 'completed_at'])
+    return upload
+
+
+def claim_upload(upload_id, owner, target):
+    """The owner's completed upload for ``target``, ready to attach to a model"""
+    try:
+        return ChunkedUpload.objects.get(
+            id=upload_id, owner=owner, target=target, status=ChunkedUpload.COMPLETE
+        )
+    except (ChunkedUpload.DoesNotExist, ValidationError, ValueError):
+        raise ValidationError(_("Upload not found or not complete."))
+
+
+def abort_upload(upload):
+    """Remove an upload and whatever it has stored"""
+    shutil.rmtree(upload_dir(upload), ignore_errors=True)
+    if upload.status == ChunkedUpload.COMPLETE and upload.file_name:
+        _target_field(upload.target).storage.delete(upload.file_name)
+    upload.delete()
+
+
+def expire_uploads(max_age=UPLOAD_EXPIRY):
+    """Abort uploads, finished or not, that were never attached within ``max_age``"""
+    expired = 0
+    for upload in ChunkedUpload.objects.filter(created_at__lt=timezone.now() - max_age).iterator():
+        with transaction.atomic():
+            abort_upload(upload)
+        expired += 1
+    return expired
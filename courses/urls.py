@@ -6,6 +6,13 @@ app_name = 'courses'
 urlpatterns = [
     # 课程列表和详情
     path('', views.CourseListView.as_view(), name='course_list'),
+    path('progress/batch/', views.SaveProgressBatchView.as_view(), name='save_progress_batch'),
+    
+    # 大文件分段上传，放在课程 slug 路由之前
+    path('uploads/', views.ChunkedUploadStartView.as_view(), name='chunked_upload_start'),
+    path('uploads/<uuid:upload_id>/', views.ChunkedUploadDetailView.as_view(), name='chunked_upload_detail'),
+    path('uploads/<uuid:upload_id>/parts/<int:index>/', views.ChunkedUploadPartView.as_view(), name='chunked_upload_part'),
+    path('uploads/<uuid:upload_id>/complete/', views.ChunkedUploadCompleteView.as_view(), name='chunked_upload_complete'),
     path('<slug:slug>/', views.CourseDetailView.as_view(), name='course_detail'),
     
     # 课程文件
@@ -18,6 +25,7 @@ urlpatterns = [
     path('<slug:course_slug>/chapters/', views.ChapterListView.as_view(), name='chapter_list'),
     path('<slug:course_slug>/chapters/<int:chapter_id>/', views.ChapterDetailView.as_view(), name='chapter_detail'),
     path('<slug:course_slug>/chapters/<int:chapter_id>/lessons/<int:lesson_id>/', views.LessonDetailView.as_view(), name='lesson_detail'),
+    path('<slug:course_slug>/lessons/<int:lesson_id>/video/', views.LessonVideoView.as_view(), name='lesson_video'),
     
     # 课程进度
     path('<slug:course_slug>/progress/', views.CourseProgressView.as_view(), name='course_progress'),
@@ -1,12 +1,22 @@
 from django.shortcuts import render
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import ValidationError
 from django.urls import reverse_lazy
-from django.http import JsonResponse, FileResponse
-import os
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+import json
 from django.utils.text import slugify
 
-from .models import Course, Chapter, Lesson, Enrollment, LessonProgress, CourseFile
+from .models import Course, Chapter, Lesson, Enrollment, LessonProgress, CourseFile, ChunkedUpload, download_counter
+from elearning.database import replica_alias
+from elearning.delivery import deliver, is_new_download
+from .enrollment import count_students, is_enrolled, materialize_enrollment
+from .navigation import get_navigation_index
+from .outline import load_course_outline
+from .progress import parse_flag, progress_buffer
+from .tasks import reconcile_enrollments_task
+from .uploads import abort_upload, claim_upload, complete_upload, received_parts, start_upload, write_part
 from accounts.models import CustomUser
 
 class CourseListView(ListView):
@@ -15,7 +25,8 @@ class CourseListView(ListView):
     context_object_name = 'courses'
     
     def get_queryset(self):
-        queryset = Course.objects.filter(is_published=True)
+        # 公开课程列表可以容忍只读副本的复制延迟
+        queryset = Course.objects.using(replica_alias()).filter(is_published=True)
         # 移除按分类过滤的逻辑
         return queryset
     
@@ -39,19 +50,8 @@ class CourseDetailView(DetailView):
             is_published=True
         ).exclude(id=course.id).order_by('-created_at')[:5]
         
-        # 所有学生都被视为已注册
-        if self.request.user.is_authenticated and self.request.user.is_student():
-            context['is_enrolled'] = True
-            
-            # 确保学生已注册该课程
-            Enrollment.objects.get_or_create(
-                student=self.request.user,
-                course=course
-            )
-        elif self.request.user.is_authenticated and self.request.user == course.instructor:
-            context['is_enrolled'] = True
-        else:
-            context['is_enrolled'] = False
+        # 所有学生都被视为已注册（读取时按策略判断，不写入数据库）
+        context['is_enrolled'] = is_enrolled(self.request.user, course)
             
         return context
 
@@ -62,21 +62,14 @@ class ChapterListView(LoginRequiredMixin, ListView):
     
     def get_queryset(self):
         course_slug = self.kwargs.get('course_slug')
-        course = Course.objects.get(slug=course_slug)
-        
-        # 确保学生已注册该课程
-        if self.request.user.is_student():
-            Enrollment.objects.get_or_create(
-                student=self.request.user,
-                course=course
-            )
-            
-        return Chapter.objects.filter(course=course).order_by('order')
+        self.course = Course.objects.get(slug=course_slug)
+        self.outline = load_course_outline(self.course, self.request.user)
+        return self.outline.chapters
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        course_slug = self.kwargs.get('course_slug')
-        context['course'] = Course.objects.get(slug=course_slug)
+        context['course'] = self.course
+        context['outline'] = self.outline
         return context
 
 class ChapterDetailView(LoginRequiredMixin, DetailView):
@@ -89,14 +82,6 @@ class ChapterDetailView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         chapter = self.get_object()
         course = chapter.course
-        
-        # 确保学生已注册该课程
-        if self.request.user.is_student():
-            Enrollment.objects.get_or_create(
-                student=self.request.user,
-                course=course
-            )
-            
         context['course'] = course
         context['lessons'] = chapter.lessons.all().order_by('order')
         return context
@@ -107,82 +92,51 @@ class LessonDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'lesson'
     pk_url_kwarg = 'lesson_id'
     
+    def get_queryset(self):
+        return Lesson.objects.select_related('chapter__course')
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        lesson = self.get_object()
+        lesson = self.object
         chapter = lesson.chapter
         course = chapter.course
-        
-        # 确保学生已注册该课程
-        if self.request.user.is_student():
-            Enrollment.objects.get_or_create(
-                student=self.request.user,
-                course=course
-            )
-            
         context['chapter'] = chapter
         context['course'] = course
         
-        # 获取用户的观看进度
+        # 课时导航（前后课时、在课程中的位置）来自缓存的课程索引，不查询数据库
+        navigation = get_navigation_index(course.id)
+        context['previous_lesson'] = navigation.previous(lesson.id)
+        context['lesson_position'] = navigation.position(lesson.id)
+        context['lesson_count'] = len(navigation)
+        
+        # 获取用户的观看进度（课程大纲已合并尚未写入数据库的播放位置）
         if self.request.user.is_authenticated:
-            progress, created = LessonProgress.objects.get_or_create(
-                student=self.request.user,
-                lesson=lesson
-            )
-            context['progress'] = progress
+            outline = load_course_outline(course, self.request.user)
+            context['outline'] = outline
             
-            # 获取下一课
-            next_lesson = Lesson.objects.filter(
-                chapter=chapter,
-                order__gt=lesson.order
-            ).order_by('order').first()
+            # 没有进度记录时使用未保存的默认进度，避免读取页面时写库
+            progress = outline.get_progress(lesson)
+            context['progress'] = progress or LessonProgress(student=self.request.user, lesson=lesson)
             
-            if not next_lesson:
-                # 如果当前章节没有下一课，查找下一章节的第一课
-                next_chapter = Chapter.objects.filter(
-                    course=chapter.course,
-                    order__gt=chapter.order
-                ).order_by('order').first()
-                
-                if next_chapter:
-                    next_lesson = next_chapter.lessons.order_by('order').first()
-            
-            context['next_lesson'] = next_lesson
+            # 获取下一课（包括下一章节的第一课）
+            context['next_lesson'] = navigation.next(lesson.id)
             
         return context
 
 class EnrollCourseView(LoginRequiredMixin, View):
     def post(self, request, course_slug):
         course = Course.objects.get(slug=course_slug)
-        enrollment, created = Enrollment.objects.get_or_create(
-            student=request.user,
-            course=course
-        )
+        materialize_enrollment(request.user, course)
         return JsonResponse({'success': True, 'enrolled': True})
     
     def get(self, request, course_slug):
         # 自动注册所有课程
-        if request.user.is_student():
-            course = Course.objects.get(slug=course_slug)
-            Enrollment.objects.get_or_create(
-                student=request.user,
-                course=course
-            )
-        return JsonResponse({'success': True, 'enrolled': True})
+        course = Course.objects.get(slug=course_slug)
+        return JsonResponse({'success': True, 'enrolled': is_enrolled(request.user, course)})
 
-# 自动注册所有学生到所有课程的函数
+# 自动注册所有学生到所有课程的函数（在后台任务中执行）
 def auto_enroll_all_students():
-    students = CustomUser.objects.filter(user_type='student')
-    courses = Course.objects.filter(is_published=True)
-    
-    for student in students:
-        for course in courses:
-            Enrollment.objects.get_or_create(
-                student=student,
-                course=course
-            )
-    
-    return len(students) * len(courses)
+    return reconcile_enrollments_task.enqueue()
 
 class TeacherCourseListView(LoginRequiredMixin, ListView):
     model = Course
@@ -192,6 +146,16 @@ class TeacherCourseListView(LoginRequiredMixin, ListView):
     def get_queryset(self):
         return Course.objects.filter(instructor=self.request.user)
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # 按注册策略统计学生人数，已发布课程不一定有注册记录
+        courses = list(context['courses'])
+        student_counts = count_students({course.id: course.is_published for course in courses})
+        for course in courses:
+            course.student_count = student_counts[course.id]
+        context['courses'] = courses
+        return context
+
 class CourseCreateView(LoginRequiredMixin, CreateView):
     model = Course
     template_name = 'courses/course_form.html'
@@ -207,6 +171,13 @@ class CourseUpdateView(LoginRequiredMixin, UpdateView):
     template_name = 'courses/course_form.html'
     fields = ['title', 'overview', 'thumbnail', 'is_published']  # 移除category字段
     
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        # 发布课程后在后台补全学生注册记录
+        if self.object.is_published and 'is_published' in form.changed_data:
+            reconcile_enrollments_task.enqueue(course_ids=[self.object.id], created_by=self.request.user)
+        return response
+    
     def get_success_url(self):
         return reverse_lazy('courses:course_detail', kwargs={'slug': self.object.slug})
 
@@ -248,10 +219,46 @@ class ChapterDeleteView(LoginRequiredMixin, DeleteView):
     def get_success_url(self):
         return reverse_lazy('courses:chapter_list', kwargs={'course_slug': self.kwargs.get('course_slug')})
 
-class LessonCreateView(LoginRequiredMixin, CreateView):
+class ChunkedUploadFormMixin:
+    """
+    允许表单用分段上传的文件代替直接上传的文件。
+
+    表单提交 ``<upload_field>_upload``（已完成的分段上传 ID）时，文件字段可以为空，
+    保存时直接使用已组装好的文件。
+    """
+    upload_field = None
+    upload_target = None
+    
+    def get_upload_id(self):
+        return self.request.POST.get(f'{self.upload_field}_upload')
+    
+    def get_form(self, form_class=None):
+        form = super().get_form(form_class)
+        if self.get_upload_id():
+            form.fields[self.upload_field].required = False
+        return form
+    
+    def form_valid(self, form):
+        upload_id = self.get_upload_id()
+        if not upload_id:
+            return super().form_valid(form)
+        try:
+            upload = claim_upload(upload_id, self.request.user, self.upload_target)
+        except ValidationError as e:
+            form.add_error(self.upload_field, e)
+            return self.form_invalid(form)
+        setattr(form.instance, self.upload_field, upload.file_name)
+        response = super().form_valid(form)
+        # 文件已归属于模型，上传记录不再需要
+        upload.delete()
+        return response
+
+class LessonCreateView(ChunkedUploadFormMixin, LoginRequiredMixin, CreateView):
     model = Lesson
     template_name = 'courses/lesson_form.html'
-    fields = ['title', 'video', 'content', 'duration', 'order']
+    fields = ['title', 'video', 'content', 'order']
+    upload_field = 'video'
+    upload_target = ChunkedUpload.LESSON_VIDEO
     
     def form_valid(self, form):
         chapter_id = self.kwargs.get('chapter_id')
@@ -264,10 +271,12 @@ class LessonCreateView(LoginRequiredMixin, CreateView):
             'chapter_id': self.kwargs.get('chapter_id')
         })
 
-class LessonUpdateView(LoginRequiredMixin, UpdateView):
+class LessonUpdateView(ChunkedUploadFormMixin, LoginRequiredMixin, UpdateView):
     model = Lesson
     template_name = 'courses/lesson_form.html'
-    fields = ['title', 'video', 'content', 'duration', 'order']
+    fields = ['title', 'video', 'content', 'order']
+    upload_field = 'video'
+    upload_target = ChunkedUpload.LESSON_VIDEO
     pk_url_kwarg = 'lesson_id'
     
     def get_success_url(self):
@@ -299,48 +308,62 @@ class CourseProgressView(LoginRequiredMixin, DetailView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        course = self.get_object()
+        course = self.object
         
-        # 获取所有章节和课程
-        chapters = course.chapters.all().order_by('order')
-        context['chapters'] = chapters
+        # 获取所有章节、课时和用户的学习进度
+        outline = load_course_outline(course, self.request.user)
+        context['outline'] = outline
+        context['chapters'] = outline.chapters
+        context['chapter_completion'] = outline.chapter_completion
         
-        # 获取用户的学习进度
         if self.request.user.is_authenticated:
-            progress_dict = {}
-            for chapter in chapters:
-                for lesson in chapter.lessons.all():
-                    try:
-                        progress = LessonProgress.objects.get(
-                            student=self.request.user,
-                            lesson=lesson
-                        )
-                        progress_dict[lesson.id] = progress
-                    except LessonProgress.DoesNotExist:
-                        progress_dict[lesson.id] = None
+            context['progress_dict'] = outline.progress_dict
             
-            context['progress_dict'] = progress_dict
+            # 从第一个未完成的课时继续学习
+            completed = {lesson_id for lesson_id, progress in outline.progress.items() if progress.is_completed}
+            context['resume_lesson'] = get_navigation_index(course.id).resume(completed)
             
         return context
 
 class SaveLessonProgressView(LoginRequiredMixin, View):
     def post(self, request, course_slug, lesson_id):
-        lesson = Lesson.objects.get(id=lesson_id)
+        # 播放器心跳只写入缓冲区，定期批量写库；完成状态立即写入
         current_position = request.POST.get('current_position', 0)
         is_completed = request.POST.get('is_completed', False) == 'true'
         
-        progress, created = LessonProgress.objects.get_or_create(
-            student=request.user,
-            lesson=lesson
-        )
+        if not Lesson.objects.filter(id=lesson_id).exists():
+            return JsonResponse({'success': False}, status=404)
         
-        progress.current_position = current_position
-        if is_completed:
-            progress.is_completed = True
-        progress.save()
+        progress_buffer.record(request.user.id, lesson_id, current_position, is_completed)
         
         return JsonResponse({'success': True})
 
+class SaveProgressBatchView(LoginRequiredMixin, View):
+    """Accept several buffered player position updates in one request"""
+    def post(self, request):
+        try:
+            data = json.loads(request.body)
+            updates = [
+                (int(update['lesson_id']), update.get('current_position', 0), parse_flag(update.get('is_completed')))
+                for update in data['updates']
+            ]
+        except (ValueError, TypeError, KeyError):
+            # 请求体不是对象、updates 不是列表，或某条更新缺少字段/类型错误
+            return JsonResponse({'success': False, 'error': 'Invalid JSON data'}, status=400)
+        
+        valid_ids = set(
+            Lesson.objects.filter(id__in={lesson_id for lesson_id, _, _ in updates}).values_list('id', flat=True)
+        )
+        
+        accepted = 0
+        for lesson_id, position, is_completed in updates:
+            if lesson_id not in valid_ids:
+                continue
+            progress_buffer.record(request.user.id, lesson_id, position, is_completed)
+            accepted += 1
+        
+        return JsonResponse({'success': True, 'accepted': accepted})
+
 class CourseFileListView(LoginRequiredMixin, ListView):
     """课程文件列表视图"""
     model = CourseFile
@@ -354,6 +377,8 @@ class CourseFileListView(LoginRequiredMixin, ListView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        # 加上尚未写入数据库的下载次数
+        context['files'] = download_counter.overlay(context['files'])
         course = Course.objects.get(slug=self.kwargs['course_slug'])
         context['course'] = course
         
@@ -362,13 +387,6 @@ class CourseFileListView(LoginRequiredMixin, ListView):
                                 self.request.user == course.instructor or
                                 self.request.user.is_teacher())
         
-        # 添加调试信息
-        print(f"用户: {self.request.user.username}")
-        print(f"是否是教师: {self.request.user.is_teacher()}")
-        print(f"是否是课程教师: {self.request.user == course.instructor}")
-        print(f"是否是管理员: {self.request.user.is_staff}")
-        print(f"can_upload: {context['can_upload']}")
-        
         return context
 
 class CourseFileDeleteView(LoginRequiredMixin, DeleteView):
@@ -387,26 +405,33 @@ class CourseFileDeleteView(LoginRequiredMixin, DeleteView):
         return CourseFile.objects.filter(uploaded_by=self.request.user)
 
 class CourseFileDownloadView(LoginRequiredMixin, View):
-    """下载课程文件的视图"""
+    """下载课程文件的视图，支持断点续传和条件请求"""
     def get(self, request, course_slug, file_id):
-        course_file = CourseFile.objects.get(id=file_id, course__slug=course_slug)
+        course_file = get_object_or_404(CourseFile, id=file_id, course__slug=course_slug)
         
         # 所有登录用户都可以下载文件
-        # 增加下载计数
-        course_file.download_count += 1
-        course_file.save()
+        response = deliver(request, course_file.file.path, as_attachment=True)
         
-        # 返回文件
-        file_path = course_file.file.path
-        response = FileResponse(open(file_path, 'rb'))
-        response['Content-Disposition'] = f'attachment; filename="{os.path.basename(file_path)}"'
+        # 只有新的下载才计数，续传的分段请求和 304 不计
+        if is_new_download(request, response):
+            course_file.increment_download_count()
         return response
 
-class CourseFileUploadView(LoginRequiredMixin, CreateView):
+class LessonVideoView(LoginRequiredMixin, View):
+    """课时视频，支持 Range 请求以便拖动进度条和续传"""
+    def get(self, request, course_slug, lesson_id):
+        lesson = get_object_or_404(Lesson, id=lesson_id, chapter__course__slug=course_slug)
+        if not lesson.video:
+            raise Http404("Lesson has no video")
+        return deliver(request, lesson.video.path)
+
+class CourseFileUploadView(ChunkedUploadFormMixin, LoginRequiredMixin, CreateView):
     """View for teachers to upload course files"""
     model = CourseFile
     template_name = 'courses/course_file_form.html'
     fields = ['title', 'description', 'file']
+    upload_field = 'file'
+    upload_target = ChunkedUpload.COURSE_FILE
     
     def get_success_url(self):
         return reverse_lazy('courses:course_files', kwargs={'course_slug': self.kwargs['course_slug']})
@@ -416,12 +441,6 @@ class CourseFileUploadView(LoginRequiredMixin, CreateView):
         # Ensure only teachers or admins can upload files
         if not (self.request.user.is_staff or self.request.user == course.instructor or self.request.user.is_teacher()):
             return self.handle_no_permission()
-            
-        # Add debug information
-        print(f"Upload file - User: {self.request.user.username}")
-        print(f"Upload file - Is teacher: {self.request.user.is_teacher()}")
-        print(f"Upload file - Is course instructor: {self.request.user == course.instructor}")
-        print(f"Upload file - Is admin: {self.request.user.is_staff}")
         
         form.instance.course = course
         form.instance.uploaded_by = self.request.user
@@ -431,3 +450,72 @@ class CourseFileUploadView(LoginRequiredMixin, CreateView):
         context = super().get_context_data(**kwargs)
         context['course'] = Course.objects.get(slug=self.kwargs['course_slug'])
         return context
+
+
+class ChunkedUploadMixin(LoginRequiredMixin):
+    """Chunked upload API for teachers and staff; errors are JSON"""
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not (request.user.is_staff or request.user.is_teacher()):
+            return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ValidationError as e:
+            return JsonResponse({'success': False, 'error': e.messages[0]}, status=400)
+    
+    def get_upload(self):
+        return get_object_or_404(ChunkedUpload, id=self.kwargs['upload_id'], owner=self.request.user)
+    
+    def upload_status(self, upload):
+        return JsonResponse({
+            'success': True,
+            'upload_id': str(upload.id),
+            'status': upload.status,
+            'size': upload.size,
+            'chunk_size': upload.chunk_size,
+            'part_count': upload.part_count,
+            'received': received_parts(upload),
+            'file_name': upload.file_name,
+        })
+
+class ChunkedUploadStartView(ChunkedUploadMixin, View):
+    """Start an upload: {"target", "filename", "size", "sha256", "chunk_size"}"""
+    def post(self, request):
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Invalid JSON data'}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({'success': False, 'error': 'Invalid JSON data'}, status=400)
+        upload = start_upload(
+            request.user, data.get('target'), data.get('filename'), data.get('size'),
+            sha256=data.get('sha256'), chunk_size=data.get('chunk_size')
+        )
+        response = self.upload_status(upload)
+        response.status_code = 201
+        return response
+
+class ChunkedUploadDetailView(ChunkedUploadMixin, View):
+    """Upload status, including the parts received so far for resuming"""
+    def get(self, request, upload_id):
+        return self.upload_status(self.get_upload())
+    
+    def delete(self, request, upload_id):
+        abort_upload(self.get_upload())
+        return JsonResponse({'success': True})
+
+class ChunkedUploadPartView(ChunkedUploadMixin, View):
+    """PUT one part as the raw request body, with an optional X-Part-SHA256 header"""
+    def put(self, request, upload_id, index):
+        upload = self.get_upload()
+        try:
+            length = int(request.headers.get('Content-Length', ''))
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Content-Length is required'}, status=411)
+        # 直接从请求流读取写入磁盘，不经过上传处理器，也不整体读入内存
+        write_part(upload, index, request, length, request.headers.get('X-Part-SHA256'))
+        return JsonResponse({'success': True, 'index': index})
+
+class ChunkedUploadCompleteView(ChunkedUploadMixin, View):
+    """Assemble the parts and check the file's checksum"""
+    def post(self, request, upload_id):
+        return self.upload_status(complete_upload(self.get_upload()))
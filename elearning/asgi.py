@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'elearning.settings')
 
 application = get_asgi_application()
+
+# Flush buffered progress and counters even while no requests arrive
+from elearning.flushing import flusher  # noqa: E402
+
+flusher.start()
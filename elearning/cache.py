@@ -0,0 +1,218 @@
+"""
+Named cache regions.
+
+Each region is its own cache alias with its own timeout and size limit, so
+one busy region cannot evict another region's entries and a region can be
+cleared on its own. ``build_caches`` turns ``CACHE_REGIONS`` into the
+``CACHES`` setting for one of these backends:
+
+    file      one directory per region, shared by every process on a host;
+              the default. Past ``max_entries`` a random third of the
+              entries is culled, so eviction is not LRU
+    database  one table per region in the default (SQLite) database, shared
+              by every process using it; create the tables with
+              ``manage.py createcachetable``. Past ``max_entries`` expired
+              entries are removed, then a third of the rest in key order
+    locmem    per-process memory, least recently used entries are evicted
+              first. Invalidations, buffered counters and cached pages are
+              only seen by the process that made them, so use it only with
+              a single process
+
+``isolated_caches`` swaps every region for an empty locmem cache; the test
+runner and the benchmark harness run under it so they never read or write
+the shared caches.
+
+Regions count their hits and misses in process and add them to shared
+counters in the default cache every ``STATS_FLUSH_EVERY`` lookups.
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, InvalidCacheBackendError
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'database': 'django.core.cache.backends.db.DatabaseCache',
+}
+
+DEFAULT_MAX_ENTRIES = 1000
+STATS_FLUSH_EVERY = 100
+STATS_KEY = 'cache_regions:{region}:{field}'
+
+_MISSING = object()
+
+
+def _location(backend, name, directory):
+    if backend == 'file':
+        return str(directory / name)
+    if backend == 'database':
+        return f'cache_{name}'
+    return f'region-{name}'
+
+
+def build_caches(regions, backend='locmem', directory=None):
+    """
+    Build a CACHES setting with a default alias plus one alias per region.
+
+    ``regions`` maps region names to ``{'timeout': ..., 'max_entries': ...}``.
+    ``directory`` is only used by the file backend.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown cache backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+
+    caches_setting = {
+        DEFAULT_CACHE_ALIAS: {
+            'BACKEND': BACKENDS[backend],
+            'LOCATION': _location(backend, 'default', directory),
+        }
+    }
+    for name, options in regions.items():
+        caches_setting[name] = {
+            'BACKEND': BACKENDS[backend],
+            'LOCATION': _location(backend, name, directory),
+            'TIMEOUT': options.get('timeout', 300),
+            'OPTIONS': {
+                'MAX_ENTRIES': options.get('max_entries', DEFAULT_MAX_ENTRIES),
+            },
+        }
+    return caches_setting
+
+
+def isolated_caches(name='isolated'):
+    """
+    An override_settings that gives every region its own locmem cache.
+
+    Locmem caches with the same location share their entries within a
+    process, so ``name`` keeps separate users of this apart.
+    """
+    from django.test.utils import override_settings
+
+    caches_setting = build_caches(getattr(settings, 'CACHE_REGIONS', {}), 'locmem')
+    for options in caches_setting.values():
+        options['LOCATION'] = f"{name}-{options['LOCATION']}"
+    return override_settings(CACHES=caches_setting)
+
+
+class CacheRegion:
+    """
+    A named cache region with hit and miss counters.
+
+    Regions missing from ``CACHE_REGIONS`` fall back to the default cache,
+    so keys should still be namespaced by their owner.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def __repr__(self):
+        return f"<CacheRegion {self.name}>"
+
+    @property
+    def cache(self):
+        try:
+            return caches[self.name]
+        except InvalidCacheBackendError:
+            return caches[DEFAULT_CACHE_ALIAS]
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+            due = self._hits + self._misses >= STATS_FLUSH_EVERY
+        if due:
+            self.flush_stats()
+
+    def get(self, key, default=None):
+        value = self.cache.get(key, _MISSING)
+        self._count(value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self.cache.set(key, value, timeout)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def get_or_set(self, key, build, timeout=DEFAULT_TIMEOUT):
+        """Return the cached value for ``key``, storing ``build()`` on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = build()
+            self.set(key, value, timeout)
+        return value
+
+    def clear(self):
+        self.cache.clear()
+
+    def flush_stats(self):
+        """Add this process's counts to the shared counters"""
+        with self._lock:
+            counts = {'hits': self._hits, 'misses': self._misses}
+            self._hits = self._misses = 0
+        shared = caches[DEFAULT_CACHE_ALIAS]
+        for field, count in counts.items():
+            if not count:
+                continue
+            key = STATS_KEY.format(region=self.name, field=field)
+            if not shared.add(key, count, None):
+                try:
+                    shared.incr(key, count)
+                except ValueError:
+                    # Expired or evicted between add and incr
+                    shared.set(key, count, None)
+
+    def stats(self):
+        """Hits, misses and hit rate across processes, including unflushed counts"""
+        shared = caches[DEFAULT_CACHE_ALIAS].get_many([
+            STATS_KEY.format(region=self.name, field=field) for field in ('hits', 'misses')
+        ])
+        with self._lock:
+            hits = shared.get(STATS_KEY.format(region=self.name, field='hits'), 0) + self._hits
+            misses = shared.get(STATS_KEY.format(region=self.name, field='misses'), 0) + self._misses
+        lookups = hits + misses
+        return {
+            'region': self.name,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else None,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits = self._misses = 0
+        caches[DEFAULT_CACHE_ALIAS].delete_many([
+            STATS_KEY.format(region=self.name, field=field) for field in ('hits', 'misses')
+        ])
+
+
+_regions = {}
+_regions_lock = threading.Lock()
+
+
+def get_region(name):
+    """Return the process-wide CacheRegion for ``name``"""
+    with _regions_lock:
+        region = _regions.get(name)
+        if region is None:
+            region = _regions[name] = CacheRegion(name)
+        return region
+
+
+def configured_regions():
+    """Regions named in CACHE_REGIONS, in settings order"""
+    return [get_region(name) for name in getattr(settings, 'CACHE_REGIONS', {})]
+
+
+def clear_regions():
+    """Clear the default cache and every configured region"""
+    caches[DEFAULT_CACHE_ALIAS].clear()
+    for region in configured_regions():
+        region.clear()
+        region.reset_stats()
@@ -0,0 +1,177 @@
+"""
+Buffered counters.
+
+A counter adds to an integer model field without a read-modify-write on
+the request path. ``increment`` records the amount in this process and
+adds it to a shared delta in the ``counters`` cache region. Flushes
+write all pending amounts with ``UPDATE ... SET field = field + n``
+statements, one per distinct amount, so concurrent flushes from several
+processes never lose an increment. A flush runs every ``FLUSH_INTERVAL``
+seconds or ``MAX_PENDING`` rows, whichever comes first, checked on every
+increment and by the periodic flusher (see elearning.flushing) so idle
+processes flush too, and when the process exits.
+
+Reads add the shared delta to the stored value (``value``, ``overlay``)
+so counts are current across processes before they are flushed; that
+needs a shared cache backend (see elearning.cache). If the delta is
+evicted, or two processes update it at once on the file backend, whose
+incr is not atomic, the displayed count is off until the next flush;
+the stored count is not affected. A process killed without running its
+exit handlers loses at most the increments of its last flush interval.
+
+    download_counter = counter(CourseFile, 'download_count')
+    download_counter.increment(course_file.pk)
+    download_counter.overlay(files)
+"""
+import atexit
+import threading
+import time
+
+from django.db import transaction
+from django.db.models import F
+
+from .cache import get_region
+from .flushing import flusher
+
+CACHE_KEY = 'counters:{label}:{pk}'
+
+FLUSH_INTERVAL = 10
+MAX_PENDING = 1000
+# Primary keys per UPDATE, well below SQLite's variable limit
+BATCH_SIZE = 500
+
+region = get_region('counters')
+
+
+class Counter:
+    """Buffered increments of one integer field of one model"""
+
+    def __init__(self, model, field, flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        self.model = model
+        self.field = field
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def __repr__(self):
+        return f"<Counter {self.label}>"
+
+    def __len__(self):
+        return len(self._pending)
+
+    @property
+    def label(self):
+        return f'{self.model._meta.label_lower}.{self.field}'
+
+    def _key(self, pk):
+        return CACHE_KEY.format(label=self.label, pk=pk)
+
+    def _add_delta(self, pk, amount):
+        cache = region.cache
+        key = self._key(pk)
+        if amount > 0 and cache.add(key, amount):
+            return
+        try:
+            if amount >= 0:
+                cache.incr(key, amount)
+            elif cache.decr(key, -amount) <= 0:
+                # Fully flushed, or evicted and rebuilt after these amounts
+                # were added; a negative delta would undercount for good
+                cache.delete(key)
+        except ValueError:
+            # Expired or evicted since it was read
+            if amount > 0:
+                cache.set(key, amount)
+
+    def increment(self, pk, amount=1):
+        with self._lock:
+            self._pending[pk] = self._pending.get(pk, 0) + amount
+            due = (
+                len(self._pending) >= self.max_pending or
+                time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        self._add_delta(pk, amount)
+
+        if due:
+            self.flush()
+
+    def buffered(self, pks):
+        """Unflushed amounts across processes, {pk: amount}"""
+        keys = {self._key(pk): pk for pk in pks}
+        return {keys[key]: amount for key, amount in region.cache.get_many(keys).items()}
+
+    def value(self, instance):
+        """The stored value of ``instance`` plus its unflushed amount"""
+        return getattr(instance, self.field) + self.buffered([instance.pk]).get(instance.pk, 0)
+
+    def overlay(self, instances):
+        """Add unflushed amounts to the field of loaded instances"""
+        instances = list(instances)
+        deltas = self.buffered(instance.pk for instance in instances)
+        for instance in instances:
+            if instance.pk in deltas:
+                setattr(instance, self.field, getattr(instance, self.field) + deltas[instance.pk])
+        return instances
+
+    def flush_if_due(self):
+        """Flush when the flush interval has passed since the last flush"""
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            return self.flush()
+        return 0
+
+    def flush(self):
+        """Write pending amounts with one UPDATE per distinct amount and batch"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        pending = {pk: amount for pk, amount in pending.items() if amount}
+        if not pending:
+            return 0
+
+        by_amount = {}
+        for pk, amount in pending.items():
+            by_amount.setdefault(amount, []).append(pk)
+
+        with transaction.atomic():
+            for amount, pks in by_amount.items():
+                for start in range(0, len(pks), BATCH_SIZE):
+                    self.model._base_manager.filter(pk__in=pks[start:start + BATCH_SIZE]).update(
+                        **{self.field: F(self.field) + amount}
+                    )
+
+        # The stored counts now include these amounts
+        for pk, amount in pending.items():
+            self._add_delta(pk, -amount)
+        return len(pending)
+
+
+_counters = []
+_counters_lock = threading.Lock()
+
+
+def counter(model, field, **options):
+    """Create and register a counter for ``model.field``"""
+    created = Counter(model, field, **options)
+    with _counters_lock:
+        _counters.append(created)
+    return created
+
+
+def registered_counters():
+    with _counters_lock:
+        return list(_counters)
+
+
+def flush_counters():
+    """Flush every registered counter; returns the number of rows written"""
+    return sum(registered.flush() for registered in registered_counters())
+
+
+def flush_due_counters():
+    return sum(registered.flush_if_due() for registered in registered_counters())
+
+
+atexit.register(flush_counters)
+flusher.register(flush_due_counters)
@@ -0,0 +1,117 @@
+"""
+Database profile.
+
+``build_databases`` turns a few environment variables into the DATABASES
+setting. Connections are kept open between requests (``CONN_MAX_AGE``)
+and every new SQLite connection is tuned with these pragmas:
+
+    journal_mode=WAL      readers no longer block the writer and the
+                          writer no longer blocks readers
+    synchronous=NORMAL    fsync on checkpoint instead of on every commit;
+                          safe against corruption in WAL mode
+    busy_timeout          wait for a lock instead of failing at once with
+                          "database is locked"
+    cache_size            page cache per connection, negative is KiB
+    temp_store=MEMORY     sorts and temporary indexes stay in memory
+
+Transactions start with ``BEGIN IMMEDIATE`` so a writer takes the write
+lock up front; a deferred transaction that reads first and writes later
+cannot wait for the lock and fails straight away when another writer
+holds it.
+
+When ``DATABASE_REPLICA_PATH`` is set a ``replica`` alias is added. The
+replica lags behind the primary, so reading from it is opt-in per
+queryset: reads that tolerate stale rows, such as the public course list,
+use ``queryset.using(replica_alias())``. Everything else, including every
+read after a write in the same request and the job worker, stays on the
+primary, which ``PrimaryReplicaRouter`` also picks for writes and
+migrations. The replica file is expected to be kept in sync by external
+replication (Litestream, LiteFS or a file copy); it is never migrated or
+written.
+
+Environment variables:
+
+    DATABASE_PATH            SQLite file, default db.sqlite3 in BASE_DIR
+    DATABASE_REPLICA_PATH    read replica file, default none
+    DATABASE_CONN_MAX_AGE    seconds a connection is reused, default 60
+    DATABASE_BUSY_TIMEOUT    seconds to wait for a lock, default 20
+    DATABASE_CACHE_SIZE_KB   page cache per connection, default 20000
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_ALIAS = 'replica'
+
+
+def sqlite_options(busy_timeout=20, cache_size_kb=20000, read_only=False):
+    """OPTIONS for a tuned SQLite connection"""
+    pragmas = [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f'PRAGMA busy_timeout={int(busy_timeout * 1000)}',
+        f'PRAGMA cache_size=-{int(cache_size_kb)}',
+        'PRAGMA temp_store=MEMORY',
+    ]
+    if read_only:
+        pragmas.append('PRAGMA query_only=ON')
+    return {
+        # sqlite3.connect() timeout, the busy timeout Python applies itself
+        'timeout': busy_timeout,
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': ';'.join(pragmas),
+    }
+
+
+def build_databases(path, replica_path=None, conn_max_age=60, busy_timeout=20, cache_size_kb=20000):
+    """Build a DATABASES setting with a tuned primary and an optional read replica"""
+    databases = {
+        DEFAULT_DB_ALIAS: {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': path,
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': conn_max_age != 0,
+            'OPTIONS': sqlite_options(busy_timeout, cache_size_kb),
+        }
+    }
+    if replica_path:
+        databases[REPLICA_ALIAS] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': replica_path,
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': conn_max_age != 0,
+            'OPTIONS': sqlite_options(busy_timeout, cache_size_kb, read_only=True),
+            # Tests read the primary through this alias
+            'TEST': {'MIRROR': DEFAULT_DB_ALIAS},
+        }
+    return databases
+
+
+def database_routers(databases):
+    """DATABASE_ROUTERS for a DATABASES setting built by build_databases"""
+    if REPLICA_ALIAS in databases:
+        return ['elearning.database.PrimaryReplicaRouter']
+    return []
+
+
+def replica_alias():
+    """Alias for reads that tolerate replication lag: the replica if configured"""
+    return REPLICA_ALIAS if REPLICA_ALIAS in settings.DATABASES else DEFAULT_DB_ALIAS
+
+
+class PrimaryReplicaRouter:
+    """Keep reads and writes on the primary unless a queryset asks for the replica"""
+
+    def db_for_read(self, model, **hints):
+        # Rows fetched from the replica are re-read from the primary when
+        # followed through relations; only explicit .using() reads lag
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,260 @@
+"""
+Protected file delivery.
+
+Views check permissions and then call ``deliver``, which hands the file
+to the backend named by ``PROTECTED_MEDIA_BACKEND``:
+
+    python            Django streams the file itself with ``serve_file``;
+                      the default and what the tests use
+    x-accel-redirect  nginx: the response carries an X-Accel-Redirect to
+                      ``PROTECTED_MEDIA_INTERNAL_URL`` plus the path under
+                      MEDIA_ROOT, an ``internal`` location aliased to
+                      MEDIA_ROOT
+    x-sendfile        Apache mod_xsendfile and lighttpd: the response
+                      carries the absolute path in X-Sendfile
+
+The offloading backends return an empty response at once, so the worker
+is free while the proxy sends the file; the proxy also deals with Range
+and conditional requests.
+
+``serve_file`` answers a GET or HEAD for a file on disk:
+
+    If-None-Match / If-Modified-Since    304 when the client's copy is current
+    If-Match / If-Unmodified-Since       412 when it is not
+    Range: bytes=...                     206 with one byte range, or 416
+    If-Range                             the range is only honoured while
+                                         the file is unchanged
+
+The body is a FileResponse over the open file, positioned at the start of
+the range. Under a WSGI server that offers ``wsgi.file_wrapper`` with
+sendfile (gunicorn, uWSGI) the kernel copies the bytes straight from the
+file to the socket, bounded by Content-Length; other servers read it in
+blocks.
+"""
+import mimetypes
+import os
+import re
+from pathlib import Path
+from stat import S_ISREG
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.http import content_disposition_header
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+BLOCK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class FileRange:
+    """A file object that reads at most ``length`` bytes from ``start``"""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        # Lets the WSGI server sendfile() from the current offset
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single byte range header, or None to send
+    the whole file.
+
+    Malformed and multi-range headers are ignored, as RFC 9110 allows.
+    Raises RangeNotSatisfiable when the range starts past the end.
+    """
+    match = RANGE_RE.match(header.strip().replace(' ', ''))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the final N bytes
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, min(end, size - 1)
+
+
+def _if_range_passes(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve_file(request, path, filename=None, as_attachment=False, content_type=None):
+    """Return a 200, 206, 304, 412 or 416 response for the file at ``path``"""
+    try:
+        stat = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("File not found")
+    if not S_ISREG(stat.st_mode):
+        # Directories and devices are never served
+        raise Http404("File not found")
+    size = stat.st_size
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        return _validators(conditional, etag, last_modified)
+
+    byte_range = None
+    if request.method in ('GET', 'HEAD') and 'HTTP_RANGE' in request.META and _if_range_passes(
+        request, etag, last_modified
+    ):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return _validators(response, etag, last_modified)
+
+    file = open(path, 'rb')
+    filename = filename or os.path.basename(path)
+    if byte_range is None:
+        response = FileResponse(
+            file, as_attachment=as_attachment, filename=filename, content_type=content_type
+        )
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            FileRange(file, start, end - start + 1), status=206,
+            as_attachment=as_attachment, filename=filename, content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response.block_size = BLOCK_SIZE
+    return _validators(response, etag, last_modified)
+
+
+class PythonBackend:
+    """Stream the file from this process"""
+
+    def serve(self, request, path, filename=None, as_attachment=False, content_type=None):
+        return serve_file(request, path, filename, as_attachment, content_type)
+
+
+class OffloadBackend:
+    """Leave the transfer to the front proxy through a response header"""
+
+    header = None
+
+    def location(self, path):
+        raise NotImplementedError
+
+    def serve(self, request, path, filename=None, as_attachment=False, content_type=None):
+        if not os.path.isfile(path):
+            raise Http404("File not found")
+        filename = filename or os.path.basename(path)
+        if content_type is None:
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = HttpResponse(content_type=content_type)
+        response[self.header] = self.location(path)
+        if disposition := content_disposition_header(as_attachment, filename):
+            response['Content-Disposition'] = disposition
+        return response
+
+
+class XAccelRedirectBackend(OffloadBackend):
+    header = 'X-Accel-Redirect'
+
+    def location(self, path):
+        try:
+            relative = Path(path).resolve().relative_to(Path(settings.MEDIA_ROOT).resolve())
+        except ValueError:
+            raise Http404("File is outside MEDIA_ROOT")
+        prefix = getattr(settings, 'PROTECTED_MEDIA_INTERNAL_URL', '/protected-media/')
+        return prefix.rstrip('/') + '/' + quote(relative.as_posix())
+
+
+class XSendfileBackend(OffloadBackend):
+    header = 'X-Sendfile'
+
+    def location(self, path):
+        return str(Path(path).resolve())
+
+
+BACKENDS = {
+    'python': PythonBackend,
+    'x-accel-redirect': XAccelRedirectBackend,
+    'x-sendfile': XSendfileBackend,
+}
+
+OFFLOAD_HEADERS = tuple(
+    backend.header for backend in BACKENDS.values() if issubclass(backend, OffloadBackend)
+)
+
+
+def get_backend():
+    name = getattr(settings, 'PROTECTED_MEDIA_BACKEND', 'python')
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Unknown PROTECTED_MEDIA_BACKEND {name!r}, expected one of {', '.join(BACKENDS)}"
+        )
+
+
+def deliver(request, path, filename=None, as_attachment=False, content_type=None):
+    """Send the file at ``path`` through the configured backend; check permissions first"""
+    return get_backend().serve(request, path, filename, as_attachment, content_type)
+
+
+def is_new_download(request, response):
+    """Whether a response starts a download, rather than resuming or revalidating one"""
+    if response.status_code == 206:
+        return response['Content-Range'].startswith('bytes 0-')
+    if response.status_code != 200:
+        return False
+    if any(header in response for header in OFFLOAD_HEADERS):
+        # The proxy answers Range and conditional requests, so judge by the request
+        if 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META:
+            return False
+        byte_range = request.META.get('HTTP_RANGE', '').replace(' ', '')
+        return not byte_range or byte_range.startswith('bytes=0-')
+    return True
@@ -0,0 +1,84 @@
+"""
+Periodic flushing of write-behind buffers.
+
+Buffers such as ``courses.progress.ProgressBuffer`` flush when a write
+finds them due and when the process exits. A process that stops receiving
+writes would hold its pending rows until then, so web processes also run
+every registered flush on a daemon thread every ``TICK`` seconds; each
+buffer decides whether it is due. The thread is started by the WSGI and
+ASGI entry points (management commands and tests do not start it) and is
+started again in children forked by a preloading server.
+
+A process killed without running its exit handlers loses at most what it
+buffered since its last flush.
+
+    flusher.register(progress_buffer.flush_if_due)
+"""
+import logging
+import os
+import threading
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+TICK = 5
+
+
+class PeriodicFlusher:
+    """Calls registered functions every ``interval`` seconds on a daemon thread"""
+
+    def __init__(self, interval=TICK):
+        self.interval = interval
+        self._functions = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def register(self, func):
+        with self._lock:
+            self._functions.append(func)
+        return func
+
+    def flush(self):
+        """Run every registered function once; failures are logged"""
+        with self._lock:
+            functions = list(self._functions)
+        for func in functions:
+            try:
+                func()
+            except Exception:
+                logger.exception("Periodic flush %r failed", func)
+
+    def _run(self):
+        stop = threading.Event()
+        while not stop.wait(self.interval):
+            try:
+                self.flush()
+            finally:
+                # Connections are per thread; do not hold one between ticks
+                connections.close_all()
+
+    def start(self):
+        """Start the flush thread in this process unless it is running"""
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='periodic-flush', daemon=True)
+            self._thread.start()
+
+
+flusher = PeriodicFlusher()
+
+
+def _restart_after_fork():
+    # Threads do not survive fork; only restart where one was running
+    flusher._lock = threading.Lock()
+    if flusher._thread is not None:
+        flusher._thread = None
+        flusher.start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
@@ -0,0 +1,191 @@
+"""
+Per-view latency and SQL instrumentation.
+
+InstrumentationMiddleware times every sampled request and wraps the
+database connections with an execute wrapper that counts queries, adds up
+their time and notes identical statements run repeatedly, the usual sign
+of an N+1 pattern. One small record per request is appended to a bounded
+ring buffer in this process; nothing is written to the database.
+
+Settings:
+
+    INSTRUMENTATION_ENABLED               default True
+    INSTRUMENTATION_BUFFER_SIZE           requests kept, default 5000
+    INSTRUMENTATION_SAMPLE_RATE           share of requests recorded, default 1.0
+    INSTRUMENTATION_N_PLUS_ONE_THRESHOLD  repeats of one statement flagged, default 5
+"""
+import math
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+# Stored statements are cut to this many characters
+MAX_SQL_LENGTH = 300
+
+
+class QueryRecorder:
+    """Database execute wrapper that counts statements and their time"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            # Parameters are left out so the same query for different rows matches
+            self.statements[sql] += 1
+
+    def most_repeated(self):
+        """(statement, times run) for the most repeated statement, or (None, 0)"""
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+
+class RequestRecord:
+    __slots__ = (
+        'url_name', 'method', 'status', 'duration_ms', 'query_count', 'sql_ms',
+        'duplicate_queries', 'repeated_sql', 'repeated_count', 'timestamp',
+    )
+
+    def __init__(self, url_name, method, status, duration_ms, query_count, sql_ms,
+                 duplicate_queries, repeated_sql, repeated_count, timestamp):
+        self.url_name = url_name
+        self.method = method
+        self.status = status
+        self.duration_ms = duration_ms
+        self.query_count = query_count
+        self.sql_ms = sql_ms
+        self.duplicate_queries = duplicate_queries
+        self.repeated_sql = repeated_sql
+        self.repeated_count = repeated_count
+        self.timestamp = timestamp
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class RequestLog:
+    """Ring buffer of the most recent request records"""
+
+    def __init__(self, size):
+        self._records = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    @property
+    def size(self):
+        return self._records.maxlen
+
+    def append(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def summary(self, n_plus_one_threshold=None):
+        """Per URL name statistics, slowest 95th percentile first"""
+        if n_plus_one_threshold is None:
+            n_plus_one_threshold = setting('N_PLUS_ONE_THRESHOLD', 5)
+        grouped = {}
+        for record in self.records():
+            grouped.setdefault(record.url_name, []).append(record)
+
+        rows = []
+        for url_name, records in grouped.items():
+            durations = sorted(record.duration_ms for record in records)
+            flagged = [record for record in records if record.repeated_count >= n_plus_one_threshold]
+            worst = max(flagged, key=lambda record: record.repeated_count, default=None)
+            rows.append({
+                'url_name': url_name,
+                'requests': len(records),
+                'p50_ms': percentile(durations, 0.5),
+                'p95_ms': percentile(durations, 0.95),
+                'p99_ms': percentile(durations, 0.99),
+                'max_ms': durations[-1],
+                'avg_queries': round(sum(record.query_count for record in records) / len(records), 1),
+                'max_queries': max(record.query_count for record in records),
+                'avg_sql_ms': round(sum(record.sql_ms for record in records) / len(records), 2),
+                'n_plus_one_requests': len(flagged),
+                'repeated_sql': worst.repeated_sql if worst else None,
+                'repeated_count': worst.repeated_count if worst else 0,
+            })
+        rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+        return rows
+
+
+def setting(name, default):
+    return getattr(settings, f'INSTRUMENTATION_{name}', default)
+
+
+request_log = RequestLog(setting('BUFFER_SIZE', 5000))
+
+
+def _url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+class InstrumentationMiddleware:
+    """Record latency and SQL statistics for sampled requests"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not setting('ENABLED', True) or random.random() >= setting('SAMPLE_RATE', 1.0):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        sql_ms = recorder.seconds * 1000
+        repeated_sql, repeated_count = recorder.most_repeated()
+        request_log.append(RequestRecord(
+            url_name=_url_name(request),
+            method=request.method,
+            status=response.status_code,
+            duration_ms=round(duration_ms, 2),
+            query_count=recorder.count,
+            sql_ms=round(sql_ms, 2),
+            duplicate_queries=recorder.count - len(recorder.statements),
+            repeated_sql=repeated_sql[:MAX_SQL_LENGTH] if repeated_count > 1 else None,
+            repeated_count=repeated_count,
+            timestamp=time.time(),
+        ))
+        response['Server-Timing'] = f'app;dur={duration_ms:.1f}, db;dur={sql_ms:.1f}'
+        return response
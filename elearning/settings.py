@@ -14,6 +14,9 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 
+from .cache import build_caches
+from .database import build_databases, database_routers
+
 # Load environment variables
 load_dotenv()
 
@@ -56,9 +59,13 @@ INSTALLED_APPS = [
     'quizzes',
     'forum',
     'ai_assistant',
+    'jobs',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover every other middleware
+    'elearning.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,14 +99,51 @@ WSGI_APPLICATION = 'elearning.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+# Persistent, WAL-mode SQLite connections; see elearning/database.py for
+# the pragmas and the DATABASE_* environment variables
+
+DATABASES = build_databases(
+    os.environ.get('DATABASE_PATH', BASE_DIR / 'db.sqlite3'),
+    replica_path=os.environ.get('DATABASE_REPLICA_PATH'),
+    conn_max_age=int(os.environ.get('DATABASE_CONN_MAX_AGE', '60')),
+    busy_timeout=float(os.environ.get('DATABASE_BUSY_TIMEOUT', '20')),
+    cache_size_kb=int(os.environ.get('DATABASE_CACHE_SIZE_KB', '20000')),
+)
+
+DATABASE_ROUTERS = database_routers(DATABASES)
+
+
+# Cache regions
+# Each region gets its own cache alias; CACHE_BACKEND selects file or
+# database (shared between processes) or locmem (one process only: cache
+# invalidation and buffered counters would not reach other processes).
+# Tests run under elearning.cache.isolated_caches, see TEST_RUNNER
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')
+
+CACHE_REGIONS = {
+    'course_catalog': {'timeout': 60 * 60 * 24, 'max_entries': 1000},
+    'lesson_progress': {'timeout': 60 * 60 * 24, 'max_entries': 20000},
+    'quiz_keys': {'timeout': 60 * 60 * 24, 'max_entries': 1000},
+    'quiz_analytics': {'timeout': 60 * 10, 'max_entries': 500},
+    'dashboards': {'timeout': 60 * 5, 'max_entries': 5000},
+    'forum_boards': {'timeout': 60 * 10, 'max_entries': 100},
+    'counters': {'timeout': 60 * 60 * 24, 'max_entries': 20000},
 }
 
+CACHES = build_caches(CACHE_REGIONS, CACHE_BACKEND, BASE_DIR / 'cache')
+
+TEST_RUNNER = 'elearning.testing.TestRunner'
+
+
+# Request instrumentation, see elearning/instrumentation.py
+# Statistics are shown at /admin/instrumentation/
+
+INSTRUMENTATION_ENABLED = True
+INSTRUMENTATION_BUFFER_SIZE = 5000
+INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get('INSTRUMENTATION_SAMPLE_RATE', '1.0'))
+INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -137,6 +181,16 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Protected media, see elearning/delivery.py. With nginx use
+# x-accel-redirect and an internal location such as
+#     location /protected-media/ { internal; alias /path/to/media/; }
+PROTECTED_MEDIA_BACKEND = os.environ.get('PROTECTED_MEDIA_BACKEND', 'python')
+PROTECTED_MEDIA_INTERNAL_URL = '/protected-media/'
+# Served to anyone; everything else under MEDIA_URL needs a signed-in user
+PUBLIC_MEDIA_PREFIXES = ('course_thumbnails/', 'profile_pics/', 'uploads/')
+# Never served, even to signed-in users: parts of unfinished chunked uploads
+PRIVATE_MEDIA_PREFIXES = ('chunked_uploads/',)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -0,0 +1,16 @@
+from django.test.runner import DiscoverRunner
+
+from .cache import isolated_caches
+
+
+class TestRunner(DiscoverRunner):
+    """Runs the tests against per-process locmem caches, never the shared cache directory"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._caches = isolated_caches('test')
+        self._caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,241 @@
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from .cache import STATS_FLUSH_EVERY, CacheRegion, build_caches
+from .database import PrimaryReplicaRouter, build_databases, database_routers, replica_alias
+from .flushing import PeriodicFlusher
+from .instrumentation import QueryRecorder, RequestLog, RequestRecord, percentile, request_log
+
+REGIONS = {'small': {'timeout': 60, 'max_entries': 3}}
+
+
+@override_settings(CACHES=build_caches(REGIONS), CACHE_REGIONS=REGIONS)
+class CacheRegionTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.region = CacheRegion('small')
+        self.region.clear()
+
+    def test_regions_are_separate_caches(self):
+        self.region.set('key', 'region')
+        caches['default'].set('key', 'default')
+        self.assertEqual(self.region.get('key'), 'region')
+        self.region.clear()
+        self.assertIsNone(self.region.get('key'))
+        self.assertEqual(caches['default'].get('key'), 'default')
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for key in 'abc':
+            self.region.set(key, key)
+        # Reading 'a' makes 'b' the least recently used entry
+        self.region.get('a')
+        self.region.set('d', 'd')
+        self.assertEqual(self.region.get('a'), 'a')
+        self.assertIsNone(self.region.get('b'))
+
+    def test_get_or_set_and_stats(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            return None
+
+        # Cached None values are hits, not misses
+        self.assertIsNone(self.region.get_or_set('none', build))
+        self.assertIsNone(self.region.get_or_set('none', build))
+        self.assertEqual(len(calls), 1)
+        stats = self.region.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_stats_are_shared_between_region_instances(self):
+        other = CacheRegion('small')
+        for _ in range(STATS_FLUSH_EVERY):
+            self.region.get('missing')
+        self.assertEqual(other.stats()['misses'], STATS_FLUSH_EVERY)
+        other.reset_stats()
+        self.assertEqual(self.region.stats()['misses'], 0)
+
+    def test_unknown_region_uses_default_cache(self):
+        region = CacheRegion('unknown')
+        region.set('key', 'value')
+        self.assertEqual(caches['default'].get('key'), 'value')
+
+    def test_shared_backends(self):
+        file_caches = build_caches(REGIONS, 'file', Path(tempfile.gettempdir()))
+        self.assertEqual(file_caches['small']['BACKEND'], 'django.core.cache.backends.filebased.FileBasedCache')
+        self.assertTrue(file_caches['small']['LOCATION'].endswith('small'))
+        db_caches = build_caches(REGIONS, 'database')
+        self.assertEqual(db_caches['small']['LOCATION'], 'cache_small')
+        self.assertEqual(db_caches['small']['OPTIONS']['MAX_ENTRIES'], 3)
+        with self.assertRaises(ValueError):
+            build_caches(REGIONS, 'redis')
+
+
+class PeriodicFlusherTests(SimpleTestCase):
+
+    def test_flush_runs_every_function_despite_failures(self):
+        flusher = PeriodicFlusher()
+        calls = []
+
+        def broken():
+            raise RuntimeError
+
+        flusher.register(broken)
+        flusher.register(lambda: calls.append(1))
+        with self.assertLogs('elearning.flushing', 'ERROR'):
+            flusher.flush()
+        self.assertEqual(calls, [1])
+
+
+class InstrumentationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            username='admin', email='admin@example.com', password='password'
+        )
+
+    def setUp(self):
+        request_log.clear()
+
+    def test_requests_are_recorded_per_url_name(self):
+        self.client.force_login(self.admin)
+        for _ in range(3):
+            response = self.client.get(reverse('forum:board_list'))
+        self.assertIn('Server-Timing', response)
+        row = next(row for row in request_log.summary() if row['url_name'] == 'forum:board_list')
+        self.assertEqual(row['requests'], 3)
+        self.assertGreater(row['avg_queries'], 0)
+        self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+        self.assertEqual(row['n_plus_one_requests'], 0)
+
+    def test_repeated_statements_are_flagged(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for user_id in range(6):
+                list(CustomUser.objects.filter(id=user_id))
+        sql, count = recorder.most_repeated()
+        self.assertEqual((recorder.count, count), (6, 6))
+        request_log.append(RequestRecord(
+            'courses:course_list', 'GET', 200, 12.5, recorder.count, 1.0,
+            recorder.count - len(recorder.statements), sql, count, 0,
+        ))
+        row = request_log.summary()[0]
+        self.assertEqual((row['n_plus_one_requests'], row['repeated_count']), (1, 6))
+
+    def test_ring_buffer_is_bounded(self):
+        log = RequestLog(2)
+        for index in range(3):
+            log.append(RequestRecord(f'view-{index}', 'GET', 200, 1, 0, 0, 0, None, 0, 0))
+        self.assertEqual([record.url_name for record in log.records()], ['view-1', 'view-2'])
+        self.assertEqual(percentile([1, 2, 3, 4], 0.5), 2)
+        self.assertEqual(percentile([1, 2, 3, 4], 0.99), 4)
+
+    def test_admin_page_and_json_export(self):
+        url = reverse('admin_instrumentation')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.admin)
+        self.client.get(reverse('forum:board_list'))
+        self.assertContains(self.client.get(url), 'forum:board_list')
+        data = self.client.get(url, {'format': 'json'}).json()
+        self.assertIn('forum:board_list', [row['url_name'] for row in data['summary']])
+        self.assertIn('dashboards', [region['region'] for region in data['cache_regions']])
+        self.assertTrue(data['requests'])
+
+
+class DatabaseProfileTests(TestCase):
+
+    def pragma(self, cursor, name):
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            self.assertEqual(self.pragma(cursor, 'busy_timeout'), 20000)
+            self.assertEqual(self.pragma(cursor, 'synchronous'), 1)
+            self.assertEqual(self.pragma(cursor, 'cache_size'), -20000)
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+    def test_file_database_uses_wal(self):
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = build_databases(Path(directory) / 'db.sqlite3', replica_path=Path(directory) / 'db.sqlite3')
+            primary = DatabaseWrapper({**connection.settings_dict, **settings_dict['default']}, alias='primary')
+            replica = DatabaseWrapper({**connection.settings_dict, **settings_dict['replica']}, alias='replica')
+            try:
+                with primary.cursor() as cursor:
+                    self.assertEqual(self.pragma(cursor, 'journal_mode'), 'wal')
+                    cursor.execute('CREATE TABLE t (id integer)')
+                with replica.cursor() as cursor:
+                    with self.assertRaises(OperationalError):
+                        cursor.execute('INSERT INTO t VALUES (1)')
+            finally:
+                primary.close()
+                replica.close()
+
+    def test_replica_routing(self):
+        self.assertEqual(database_routers(build_databases('db.sqlite3')), [])
+        databases = build_databases('db.sqlite3', replica_path='replica.sqlite3', conn_max_age=0)
+        self.assertEqual(database_routers(databases), ['elearning.database.PrimaryReplicaRouter'])
+        self.assertEqual(databases['replica']['TEST'], {'MIRROR': 'default'})
+        self.assertFalse(databases['default']['CONN_HEALTH_CHECKS'])
+
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_write(CustomUser), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'accounts'))
+        # Replica reads are opt-in, so reads after a write see it
+        self.assertEqual(router.db_for_read(CustomUser), 'default')
+        self.assertEqual(replica_alias(), 'default')
+        with mock.patch.object(settings, 'DATABASES', databases):
+            self.assertEqual(replica_alias(), 'replica')
+
+
+class MediaViewTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        for name in ('course_thumbnails/cover.png', 'course_files/notes.pdf', 'chunked_uploads/0001/000000.part'):
+            path = Path(self.media_root) / name
+            path.parent.mkdir(parents=True)
+            path.write_bytes(b'data')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_public_and_protected_files(self):
+        response = self.client.get('/media/course_thumbnails/cover.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'data')
+        self.assertEqual(self.client.get('/media/course_files/notes.pdf').status_code, 302)
+
+        self.client.force_login(CustomUser.objects.create_user(username='student', email='s@example.com'))
+        self.assertEqual(self.client.get('/media/course_files/notes.pdf').status_code, 200)
+        self.assertEqual(self.client.get('/media/course_files/missing.pdf').status_code, 404)
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/course_files/').status_code, 404)
+        self.assertEqual(self.client.get('/media/course_files').status_code, 404)
+        self.assertEqual(self.client.get('/media/chunked_uploads/0001/000000.part').status_code, 404)
+        self.assertEqual(self.client.get('/media/course_files/../chunked_uploads/0001/000000.part').status_code, 404)
+
+    def test_public_prefix_cannot_be_escaped(self):
+        response = self.client.get('/media/course_thumbnails/../course_files/notes.pdf')
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(PROTECTED_MEDIA_BACKEND='unknown')
+    def test_unknown_backend(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.client.get('/media/course_thumbnails/cover.png')
@@ -20,6 +20,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
 from accounts.views import DashboardView
+from .views import InstrumentationView, MediaView
 
 # Customize admin interface
 admin.site.site_header = "Smart Interactive Learning Platform Administration"
@@ -58,6 +59,9 @@ except:
     pass
 
 urlpatterns = [
+    # Request and cache statistics for staff, ahead of the admin catch-all
+    path('admin/instrumentation/', admin.site.admin_view(InstrumentationView.as_view()),
+         name='admin_instrumentation'),
     path('admin/', admin.site.urls),
     
     # User authentication
@@ -71,12 +75,15 @@ urlpatterns = [
     path('quizzes/', include('quizzes.urls')),
     path('forum/', include('forum.urls')),
     path('ai-assistant/', include('ai_assistant.urls')),
+    path('jobs/', include('jobs.urls')),
     
     # CKEditor
     path('ckeditor/', include('ckeditor_uploader.urls')),
+    
+    # Uploaded files, checked by Django and sent by the protected media backend
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', MediaView.as_view(), name='media'),
 ]
 
-# Serve media files in development environment
+# Serve static files in development environment
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
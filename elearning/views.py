@@ -0,0 +1,78 @@
+import os
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, JsonResponse
+from django.utils._os import safe_join
+from django.views import View
+from django.views.generic import TemplateView
+
+from .cache import configured_regions
+from .delivery import deliver
+from .instrumentation import setting, request_log
+
+
+class InstrumentationView(TemplateView):
+    """
+    Admin page with per-view latency, SQL and cache region statistics.
+
+    Figures come from the ring buffer of the process serving the page.
+    ``?format=json`` exports the summary and the raw records.
+    """
+    template_name = 'admin/instrumentation.html'
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('format') == 'json':
+            return JsonResponse({
+                'summary': request_log.summary(),
+                'cache_regions': [region.stats() for region in configured_regions()],
+                'requests': [record.as_dict() for record in request_log.records()],
+            })
+        return super().get(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        if 'clear' in request.POST:
+            request_log.clear()
+        return self.get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(admin.site.each_context(self.request))
+        context.update({
+            'title': 'Request instrumentation',
+            'summary': request_log.summary(),
+            'recorded': len(request_log),
+            'buffer_size': request_log.size,
+            'n_plus_one_threshold': setting('N_PLUS_ONE_THRESHOLD', 5),
+            'cache_regions': [region.stats() for region in configured_regions()],
+        })
+        return context
+
+
+class MediaView(View):
+    """
+    Uploaded files under MEDIA_URL.
+
+    Files under ``PUBLIC_MEDIA_PREFIXES`` (thumbnails, profile pictures)
+    are open to everyone, those under ``PRIVATE_MEDIA_PREFIXES`` to no one;
+    the rest need a signed-in user. Prefixes are matched against the
+    normalized path. Delivery goes through the protected media backend.
+    """
+
+    def get(self, request, path):
+        try:
+            full_path = safe_join(settings.MEDIA_ROOT, path)
+        except SuspiciousFileOperation:
+            raise Http404("File not found")
+        # safe_join resolved any "." and ".." segments
+        path = os.path.relpath(full_path, os.path.abspath(settings.MEDIA_ROOT)).replace(os.sep, '/')
+        if os.path.isdir(full_path):
+            path += '/'
+        if path.startswith(tuple(getattr(settings, 'PRIVATE_MEDIA_PREFIXES', ()))):
+            raise Http404("File not found")
+        public = path.startswith(tuple(getattr(settings, 'PUBLIC_MEDIA_PREFIXES', ())))
+        if not public and not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return deliver(request, full_path)
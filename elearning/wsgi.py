@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'elearning.settings')
 
 application = get_wsgi_application()
+
+# Flush buffered progress and counters even while no requests arrive
+from elearning.flushing import flusher  # noqa: E402
+
+flusher.start()
@@ -3,6 +3,7 @@ from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from ckeditor.fields import RichTextField
 from courses.models import Course
+from elearning.counters import counter
 
 class DiscussionBoard(models.Model):
     """Course discussion board model"""
@@ -65,9 +66,8 @@ class Post(models.Model):
         return self.comments.count()
     
     def increment_view(self):
-        """Increase view count"""
-        self.views += 1
-        self.save(update_fields=['views'])
+        """Count a view; buffered and written in batches by post_views"""
+        post_views.increment(self.pk)
 
 class Comment(models.Model):
     """Comment model"""
@@ -216,3 +216,6 @@ class Notification(models.Model):
         """Mark notification as read"""
         self.is_read = True
         self.save(update_fields=['is_read'])
+
+
+post_views = counter(Post, 'views')
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import CustomUser
+from courses.models import Course, Enrollment
+from .models import DiscussionBoard, Post
+from .summaries import invalidate_board_summaries
+
+
+@receiver([post_save, post_delete], sender=DiscussionBoard)
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Enrollment)
+def board_summary_changed(sender, instance, update_fields=None, **kwargs):
+    """Post counts, course titles or enrollments changed, rebuild the board list"""
+    if update_fields is not None and set(update_fields) <= {'views'}:
+        # Post view counters are not part of the summary
+        return
+    invalidate_board_summaries()
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def student_count_changed(sender, instance, created=None, **kwargs):
+    """Published courses count every student, so added or removed students change every board"""
+    # post_delete passes no ``created``; saves of existing users change nothing
+    if instance.user_type == 'student' and created is not False:
+        invalidate_board_summaries()
@@ -0,0 +1,58 @@
+from django.db.models import Count
+
+from courses.enrollment import count_students
+from elearning.cache import get_region
+from .models import DiscussionBoard, Post
+
+CACHE_KEY = 'forum:boards'
+
+region = get_region('forum_boards')
+
+
+class BoardSummary:
+    """What the board list shows for one discussion board"""
+
+    __slots__ = ('id', 'course_title', 'description', 'instructor', 'post_count', 'student_count')
+
+    def __init__(self, id, course_title, description, instructor, post_count, student_count):
+        self.id = id
+        self.course_title = course_title
+        self.description = description
+        self.instructor = instructor
+        self.post_count = post_count
+        self.student_count = student_count
+
+    def __repr__(self):
+        return f"<BoardSummary {self.id}: {self.course_title}>"
+
+
+def build_board_summaries():
+    """Summaries of every board from four queries, whatever the number of boards"""
+    boards = list(
+        DiscussionBoard.objects.order_by('id')
+        .values_list(
+            'id', 'course_id', 'course__title', 'description', 'course__instructor__username',
+            'course__is_published'
+        )
+    )
+    post_counts = dict(
+        Post.objects.values_list('board').annotate(count=Count('id'))
+    )
+    # Published courses enroll every student by policy, not by stored rows
+    student_counts = count_students({board[1]: board[5] for board in boards})
+    return [
+        BoardSummary(
+            board_id, course_title, description, instructor,
+            post_counts.get(board_id, 0), student_counts[course_id]
+        )
+        for board_id, course_id, course_title, description, instructor, _ in boards
+    ]
+
+
+def get_board_summaries():
+    """Return the cached board summaries, building them on a miss"""
+    return region.get_or_set(CACHE_KEY, build_board_summaries)
+
+
+def invalidate_board_summaries():
+    region.delete(CACHE_KEY)
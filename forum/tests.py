@@ -1,3 +1,140 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import CustomUser
+from courses.models import Course, Enrollment
+from elearning.cache import clear_regions
+from elearning.counters import Counter, flush_counters
+from .models import Post, post_views
+from .summaries import get_board_summaries
+
+
+class BoardSummaryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = CustomUser.objects.create_user(
+            username='teacher', email='teacher@example.com', user_type='teacher'
+        )
+        cls.student = CustomUser.objects.create_user(
+            username='student', email='student@example.com'
+        )
+
+    def setUp(self):
+        clear_regions()
+
+    def create_board(self, index):
+        course = Course.objects.create(
+            title=f'Course {index}', instructor=self.teacher, overview='Overview', is_published=True
+        )
+        Enrollment.objects.create(student=self.student, course=course)
+        # Boards are created with their course
+        board = course.discussion_board
+        Post.objects.create(board=board, author=self.student, title='Hello', content='Hello')
+        return board
+
+    def test_board_list_uses_cached_summaries(self):
+        for index in range(3):
+            self.create_board(index)
+        self.client.force_login(self.student)
+        self.client.get(reverse('forum:board_list'))
+        # Session and user lookups only; the board list itself is cached
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('forum:board_list'))
+        boards = response.context['boards']
+        self.assertEqual([board.course_title for board in boards], ['Course 0', 'Course 1', 'Course 2'])
+        self.assertEqual({(board.post_count, board.student_count) for board in boards}, {(1, 1)})
+        self.assertContains(response, 'Teacher: teacher')
+
+    def test_published_courses_count_every_student(self):
+        course = Course.objects.create(
+            title='Unstored', instructor=self.teacher, overview='Overview', is_published=True
+        )
+        Course.objects.create(title='Draft', instructor=self.teacher, overview='Overview')
+        counts = {board.course_title: board.student_count for board in get_board_summaries()}
+        self.assertEqual(counts, {'Unstored': 1, 'Draft': 0})
+
+        CustomUser.objects.create_user(username='other', email='other@example.com')
+        counts = {board.course_title: board.student_count for board in get_board_summaries()}
+        self.assertEqual(counts, {'Unstored': 2, 'Draft': 0})
+        self.assertFalse(Enrollment.objects.filter(course=course).exists())
+
+    def test_posts_invalidate_summaries(self):
+        board = self.create_board(0)
+        self.assertEqual(get_board_summaries()[0].post_count, 1)
+        post = Post.objects.create(board=board, author=self.student, title='Again', content='Again')
+        self.assertEqual(get_board_summaries()[0].post_count, 2)
+
+        # Counting a view does not rebuild the list
+        get_board_summaries()
+        post.increment_view()
+        post_views.flush()
+        with self.assertNumQueries(0):
+            get_board_summaries()
+
+        post.delete()
+        self.assertEqual(get_board_summaries()[0].post_count, 1)
+        board.course.delete()
+        self.assertEqual(get_board_summaries(), [])
+
+
+class ViewCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = CustomUser.objects.create_user(username='student', email='student@example.com')
+        course = Course.objects.create(title='Course', instructor=cls.student, overview='Overview')
+        cls.board = course.discussion_board
+        cls.posts = [
+            Post.objects.create(board=cls.board, author=cls.student, title=f'Post {index}', content='C')
+            for index in range(3)
+        ]
+
+    def setUp(self):
+        flush_counters()
+        clear_regions()
+        self.client.force_login(self.student)
+
+    def test_views_are_buffered_and_shown(self):
+        post = self.posts[0]
+        url = reverse('forum:post_detail', args=[self.board.id, post.id])
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.context['post'].views, 2)
+        post.refresh_from_db()
+        self.assertEqual(post.views, 0)
+
+        response = self.client.get(reverse('forum:board_detail', args=[self.board.id]))
+        self.assertEqual({item.id: item.views for item in response.context['posts']}[post.id], 2)
+
+        post_views.flush()
+        post.refresh_from_db()
+        self.assertEqual(post.views, 2)
+        self.assertEqual(post_views.value(post), 2)
+
+    def test_flush_adds_to_stored_counts(self):
+        counter = Counter(Post, 'views', flush_interval=3600)
+        first, second, third = self.posts
+        # Written meanwhile by another process
+        Post.objects.filter(id=first.id).update(views=10)
+        for post, amount in ((first, 2), (second, 2), (third, 5)):
+            counter.increment(post.id, amount)
+
+        # One UPDATE per distinct amount, in a savepoint
+        with self.assertNumQueries(4):
+            self.assertEqual(counter.flush(), 3)
+        self.assertEqual(
+            dict(Post.objects.filter(board=self.board).values_list('id', 'views')),
+            {first.id: 12, second.id: 2, third.id: 5}
+        )
+        self.assertEqual(counter.buffered([first.id, second.id, third.id]), {})
+        self.assertEqual(counter.flush(), 0)
+
+    def test_idle_counter_flushes_when_due(self):
+        counter = Counter(Post, 'views', flush_interval=3600)
+        counter.increment(self.posts[0].id)
+        self.assertEqual(counter.flush_if_due(), 0)
+        counter.flush_interval = 0
+        self.assertEqual(counter.flush_if_due(), 1)
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].views, 1)
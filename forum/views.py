@@ -2,7 +2,8 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import View, ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
-from .models import DiscussionBoard, Post, Comment, Notification, Like
+from .models import DiscussionBoard, Post, Comment, Notification, Like, post_views
+from .summaries import get_board_summaries
 from courses.models import Course
 from django.http import JsonResponse
 
@@ -13,8 +14,8 @@ class DiscussionBoardListView(LoginRequiredMixin, ListView):
     context_object_name = 'boards'
     
     def get_queryset(self):
-        # Get all discussion boards
-        return DiscussionBoard.objects.all()
+        # Cached summaries with post and student counts, see forum.summaries
+        return get_board_summaries()
 
 class DiscussionBoardDetailView(LoginRequiredMixin, DetailView):
     """Discussion board detail view"""
@@ -26,7 +27,7 @@ class DiscussionBoardDetailView(LoginRequiredMixin, DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Get all posts in the discussion board
-        context['posts'] = self.object.posts.all()
+        context['posts'] = post_views.overlay(self.object.posts.all())
         # All users can post
         context['can_post'] = True
         return context
@@ -67,8 +68,10 @@ class PostDetailView(LoginRequiredMixin, DetailView):
     
     def get(self, request, *args, **kwargs):
         response = super().get(request, *args, **kwargs)
-        # Increase view count
+        # Increase view count; the template renders after this, with the
+        # buffered views added
         self.object.increment_view()
+        self.object.views = post_views.value(self.object)
         return response
 
 class PostUpdateView(LoginRequiredMixin, UpdateView):
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from jobs.worker import LOCK_TIMEOUT, Worker
+
+class Command(BaseCommand):
+    help = '运行后台任务队列中的任务'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues', help='只处理指定队列，可重复使用')
+        parser.add_argument('--once', action='store_true', help='处理完当前到期的任务后退出')
+        parser.add_argument('--max-jobs', type=int, help='处理指定数量的任务后退出')
+        parser.add_argument('--sleep', type=float, default=1.0, help='队列为空时的等待秒数')
+        parser.add_argument('--worker-id', help='工作进程标识，默认使用主机名和进程号')
+
+    def handle(self, *args, **options):
+        worker = Worker(worker_id=options['worker_id'], queues=options['queues'])
+        max_jobs = options['max_jobs']
+        verbosity = options['verbosity']
+        processed = 0
+        last_stale_check = 0
+
+        self.stdout.write(f'工作进程 {worker.worker_id} 已启动')
+        try:
+            while max_jobs is None or processed < max_jobs:
+                # Drop connections the database may have closed while idle
+                close_old_connections()
+                if time.monotonic() - last_stale_check > LOCK_TIMEOUT / 2:
+                    requeued = worker.requeue_stale()
+                    if requeued:
+                        self.stdout.write(self.style.WARNING(f'重新排队 {requeued} 个超时任务'))
+                    last_stale_check = time.monotonic()
+
+                job = worker.run_next()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+
+                processed += 1
+                if verbosity > 1 or job.status == job.FAILED:
+                    self.stdout.write(f'任务 {job.name} #{job.pk}: {job.get_status_display()}')
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'共处理 {processed} 个任务'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last time the running worker reported it was still working on the job', null=True, verbose_name='Heartbeat At'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+class Job(models.Model):
+    """Queued background job, run by the run_jobs worker command"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, _('Queued')),
+        (RUNNING, _('Running')),
+        (SUCCEEDED, _('Succeeded')),
+        (FAILED, _('Failed')),
+    )
+    
+    name = models.CharField(max_length=100, verbose_name=_('Task Name'))
+    queue = models.CharField(max_length=50, default='default', verbose_name=_('Queue'))
+    payload = models.JSONField(default=dict, blank=True, verbose_name=_('Payload'))
+    priority = models.IntegerField(default=0, verbose_name=_('Priority'), help_text=_('Higher runs first'))
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED, verbose_name=_('Status'))
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_('Attempts'))
+    max_attempts = models.PositiveIntegerField(default=3, verbose_name=_('Max Attempts'))
+    run_at = models.DateTimeField(default=timezone.now, verbose_name=_('Run At'))
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name=_('Locked By'))
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Locked At'))
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=_('Last time the running worker reported it was still working on the job'),
+        verbose_name=_('Heartbeat At')
+    )
+    result = models.JSONField(null=True, blank=True, verbose_name=_('Result'))
+    last_error = models.TextField(blank=True, verbose_name=_('Last Error'))
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name=_('Created By')
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Finished At'))
+    
+    class Meta:
+        verbose_name = _('Job')
+        verbose_name_plural = _('Jobs')
+        ordering = ['-created_at']
+        indexes = [
+            # Worker claim query: next queued job by priority and due time
+            models.Index(fields=['status', '-priority', 'run_at'], name='job_claim_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
@@ -0,0 +1,66 @@
+from django.utils import timezone
+
+from .models import Job
+
+registry = {}
+
+
+class PermanentFailure(Exception):
+    """Raised by a task to fail its job without further retries"""
+
+
+class Task:
+    """
+    A function that can run in the background.
+
+    ``concurrency`` limits how many jobs of this task run at once across
+    all workers; ``retry_delay`` is the first retry delay in seconds and
+    doubles with every further attempt.
+    """
+
+    def __init__(self, func, name, queue='default', priority=0, max_attempts=3,
+                 concurrency=None, retry_delay=30):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+        self.retry_delay = retry_delay
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<Task {self.name}>"
+
+    def enqueue(self, priority=None, run_at=None, created_by=None, **kwargs):
+        """
+        Queue the task with JSON-serializable keyword arguments.
+
+        The job row is written in the current transaction, so a job queued
+        by a request that rolls back is never run.
+        """
+        return Job.objects.create(
+            name=self.name,
+            queue=self.queue,
+            payload=kwargs,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts,
+            run_at=run_at or timezone.now(),
+            created_by=created_by,
+        )
+
+
+def task(name, **options):
+    """Register a function as a background task under ``name``"""
+    def decorator(func):
+        registered = Task(func, name, **options)
+        registry[name] = registered
+        return registered
+    return decorator
+
+
+def enqueue(name, **kwargs):
+    """Queue a registered task by name"""
+    return registry[name].enqueue(**kwargs)
@@ -0,0 +1,140 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from .models import Job
+from .registry import PermanentFailure, registry, task
+from .worker import Worker, run_pending
+
+calls = []
+
+
+@task('tests.record', priority=1)
+def record(value):
+    calls.append(value)
+    return {'value': value}
+
+
+@task('tests.flaky', max_attempts=2, retry_delay=0)
+def flaky(fail_times):
+    calls.append('flaky')
+    if calls.count('flaky') <= fail_times:
+        raise RuntimeError('boom')
+
+
+@task('tests.permanent')
+def permanent():
+    raise PermanentFailure('no')
+
+
+@task('tests.limited', concurrency=1)
+def limited():
+    pass
+
+
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_priority_and_run_at_order(self):
+        record.enqueue(value='low', priority=0)
+        record.enqueue(value='high', priority=5)
+        record.enqueue(value='later', run_at=timezone.now() + timedelta(hours=1))
+        record.enqueue(value='default')
+        self.assertEqual(run_pending(), 3)
+        self.assertEqual(calls, ['high', 'default', 'low'])
+        job = Job.objects.get(payload__value='high')
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {'value': 'high'})
+
+    def test_retries_then_fails(self):
+        job = flaky.enqueue(fail_times=1)
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.SUCCEEDED, 2))
+
+        calls.clear()
+        job = flaky.enqueue(fail_times=5)
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('boom', job.last_error)
+
+    def test_permanent_failure_and_unknown_task(self):
+        job = permanent.enqueue()
+        unknown = Job.objects.create(name='tests.missing')
+        run_pending()
+        job.refresh_from_db()
+        unknown.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+        self.assertEqual(unknown.status, Job.FAILED)
+
+    def test_concurrency_limit(self):
+        limited.enqueue()
+        limited.enqueue()
+        worker = Worker(worker_id='a')
+        first = worker.claim()
+        self.assertEqual(first.status, Job.RUNNING)
+        self.assertIsNone(Worker(worker_id='b').claim())
+        worker.run(first)
+        self.assertIsNotNone(Worker(worker_id='b').claim())
+
+    def test_concurrency_limit_is_enforced_by_the_claim(self):
+        limited.enqueue()
+        limited.enqueue()
+        first, second = Worker(worker_id='a'), Worker(worker_id='b')
+        # As if both workers checked the limit before either claimed
+        first._blocked_tasks = second._blocked_tasks = lambda: []
+        self.assertIsNotNone(first.claim())
+        self.assertIsNone(second.claim())
+        self.assertEqual(Job.objects.filter(status=Job.RUNNING).count(), 1)
+
+    def test_stale_jobs_are_requeued(self):
+        job = record.enqueue(value='stale')
+        Job.objects.filter(id=job.id).update(
+            status=Job.RUNNING, locked_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(Worker().requeue_stale(), 1)
+        self.assertEqual(run_pending(), 1)
+
+    def test_long_running_jobs_with_heartbeats_are_kept(self):
+        running = record.enqueue(value='long')
+        dead = record.enqueue(value='dead')
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Job.objects.filter(id=running.id).update(
+            status=Job.RUNNING, locked_at=an_hour_ago, heartbeat_at=timezone.now()
+        )
+        Job.objects.filter(id=dead.id).update(status=Job.RUNNING, locked_at=an_hour_ago, heartbeat_at=an_hour_ago)
+        self.assertEqual(Worker().requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(id=running.id).status, Job.RUNNING)
+        self.assertEqual(Job.objects.get(id=dead.id).status, Job.QUEUED)
+
+    def test_command(self):
+        record.enqueue(value='command')
+        out = StringIO()
+        call_command('run_jobs', '--once', stdout=out)
+        self.assertEqual(calls, ['command'])
+        self.assertIn('1', out.getvalue())
+
+    def test_status_view(self):
+        owner = CustomUser.objects.create_user(username='owner', email='owner@example.com')
+        other = CustomUser.objects.create_user(username='other', email='other@example.com')
+        job = record.enqueue(value='view', created_by=owner)
+        run_pending()
+        self.client.force_login(owner)
+        response = self.client.get(reverse('jobs:job_status', args=[job.id]))
+        self.assertEqual(response.json()['result'], {'value': 'view'})
+        self.client.force_login(other)
+        response = self.client.get(reverse('jobs:job_status', args=[job.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_app_tasks_are_registered(self):
+        for name in ['courses.remove_media_files', 'courses.reconcile_enrollments',
+                     'quizzes.rescore_quiz', 'ai_assistant.answer_query']:
+            self.assertIn(name, registry)
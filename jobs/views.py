@@ -0,0 +1,24 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views import View
+
+from .models import Job
+
+class JobStatusView(LoginRequiredMixin, View):
+    """Poll the status of a job queued by the current user"""
+    def get(self, request, job_id):
+        job = get_object_or_404(Job, id=job_id)
+        if job.created_by_id != request.user.id and not request.user.is_staff:
+            return JsonResponse({'error': 'Job not found'}, status=404)
+        
+        data = {
+            'id': job.id,
+            'status': job.status,
+            'attempts': job.attempts,
+        }
+        if job.status == Job.SUCCEEDED:
+            data['result'] = job.result
+        elif job.status == Job.FAILED:
+            data['error'] = 'Job failed'
+        return JsonResponse(data)
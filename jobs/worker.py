@@ -0,0 +1,186 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.db.models import Count, F, IntegerField, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import LessThan
+from django.utils import timezone
+
+from .models import Job
+from .registry import PermanentFailure, registry
+
+logger = logging.getLogger(__name__)
+
+# A worker refreshes the heartbeat of the job it is running this often
+# (seconds); running jobs without a heartbeat for LOCK_TIMEOUT are assumed
+# to belong to a worker that died and are queued again
+HEARTBEAT_INTERVAL = 30
+LOCK_TIMEOUT = 60 * 5
+
+# Queued jobs considered per claim attempt
+CLAIM_CANDIDATES = 10
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class Heartbeat:
+    """Refreshes a running job's heartbeat_at from a thread until stopped"""
+
+    def __init__(self, job, worker_id, interval=HEARTBEAT_INTERVAL):
+        self.job = job
+        self.worker_id = worker_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'heartbeat-{job.pk}', daemon=True)
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                Job.objects.filter(pk=self.job.pk, status=Job.RUNNING, locked_by=self.worker_id).update(
+                    heartbeat_at=timezone.now()
+                )
+        except Exception:
+            logger.exception("Heartbeat for job %s failed", self.job)
+        finally:
+            connections.close_all()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+class Worker:
+    """
+    Claims and runs queued jobs.
+
+    Jobs are claimed with a conditional UPDATE on their status, which is
+    atomic on every database backend, so several worker processes can share
+    one table without a broker or row locks. For tasks with a concurrency
+    limit the same UPDATE also counts the running jobs; SQLite runs it
+    under the write lock taken by BEGIN IMMEDIATE, so the count cannot
+    change before the claim lands.
+    """
+
+    def __init__(self, worker_id=None, queues=None):
+        self.worker_id = worker_id or default_worker_id()
+        self.queues = queues
+
+    def _blocked_tasks(self):
+        """Tasks that have reached their concurrency limit, to skip their jobs early"""
+        limited = {name: task.concurrency for name, task in registry.items() if task.concurrency}
+        if not limited:
+            return []
+        running = dict(
+            Job.objects.filter(status=Job.RUNNING, name__in=limited)
+            .values_list('name')
+            .annotate(count=Count('id'))
+        )
+        return [name for name, limit in limited.items() if running.get(name, 0) >= limit]
+
+    def claim(self):
+        """Mark the next due job as running for this worker and return it"""
+        now = timezone.now()
+        candidates = Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+        if self.queues:
+            candidates = candidates.filter(queue__in=self.queues)
+        blocked = self._blocked_tasks()
+        if blocked:
+            candidates = candidates.exclude(name__in=blocked)
+
+        for job_id, name in candidates.order_by('-priority', 'run_at', 'id').values_list('id', 'name')[:CLAIM_CANDIDATES]:
+            claim = Job.objects.filter(id=job_id, status=Job.QUEUED)
+            task = registry.get(name)
+            if task is not None and task.concurrency:
+                # Count running jobs in the claiming UPDATE itself, so two
+                # workers cannot both see a free slot and take it
+                running = (
+                    Job.objects.filter(name=name, status=Job.RUNNING)
+                    .values('name').annotate(count=Count('id')).values('count')
+                )
+                claim = claim.filter(LessThan(
+                    Coalesce(Subquery(running, output_field=IntegerField()), Value(0)), task.concurrency
+                ))
+            with transaction.atomic():
+                claimed = claim.update(
+                    status=Job.RUNNING,
+                    locked_by=self.worker_id,
+                    locked_at=now,
+                    heartbeat_at=now,
+                    attempts=F('attempts') + 1,
+                )
+            if claimed:
+                return Job.objects.get(id=job_id)
+        return None
+
+    def run(self, job):
+        """Run a claimed job and record its outcome; returns the final status"""
+        task = registry.get(job.name)
+        now = timezone.now()
+        try:
+            if task is None:
+                raise PermanentFailure(f"Unknown task {job.name}")
+            with Heartbeat(job, self.worker_id):
+                result = task.func(**job.payload)
+        except Exception as e:
+            job.last_error = traceback.format_exc()
+            job.locked_by = ''
+            job.locked_at = None
+            job.heartbeat_at = None
+            if isinstance(e, PermanentFailure) or job.attempts >= job.max_attempts:
+                logger.error("Job %s failed: %s", job, e)
+                job.status = Job.FAILED
+                job.finished_at = now
+            else:
+                delay = (task.retry_delay if task else 0) * 2 ** (job.attempts - 1)
+                logger.warning("Job %s failed, retrying in %ss: %s", job, delay, e)
+                job.status = Job.QUEUED
+                job.run_at = now + timedelta(seconds=delay)
+            job.save(update_fields=['status', 'last_error', 'locked_by', 'locked_at', 'heartbeat_at', 'finished_at', 'run_at'])
+            return job.status
+
+        job.status = Job.SUCCEEDED
+        job.result = result
+        job.finished_at = timezone.now()
+        job.locked_by = ''
+        job.locked_at = None
+        job.heartbeat_at = None
+        job.save(update_fields=['status', 'result', 'finished_at', 'locked_by', 'locked_at', 'heartbeat_at'])
+        return job.status
+
+    def requeue_stale(self, timeout=LOCK_TIMEOUT):
+        """Queue again running jobs whose worker stopped sending heartbeats"""
+        cutoff = timezone.now() - timedelta(seconds=timeout)
+        # Jobs claimed before heartbeats were recorded only have locked_at
+        stale = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, locked_at__lt=cutoff)
+        return Job.objects.filter(stale, status=Job.RUNNING).update(
+            status=Job.QUEUED, locked_by='', locked_at=None, heartbeat_at=None
+        )
+
+    def run_next(self):
+        """Claim and run one job; returns it, or None when nothing is due"""
+        job = self.claim()
+        if job is not None:
+            self.run(job)
+        return job
+
+
+def run_pending(queues=None, limit=None):
+    """Run due jobs in this process until none are left; returns how many ran"""
+    worker = Worker(queues=queues)
+    count = 0
+    while limit is None or count < limit:
+        if worker.run_next() is None:
+            break
+        count += 1
+    return count
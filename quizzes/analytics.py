@@ -0,0 +1,203 @@
+from django.db.models import Avg, Count, Max, Min, Q
+
+from elearning.cache import get_region
+
+from .answer_keys import get_answer_key
+from .models import QuizAttempt, StudentAnswer
+
+CACHE_KEY = 'quizzes:analytics:{quiz_id}'
+# Incremental updates are not atomic across processes; a bounded lifetime
+# makes any drift self-correcting with a full recompute
+CACHE_TIMEOUT = 60 * 10
+
+region = get_region('quiz_analytics')
+
+BUCKET_WIDTH = 10
+BUCKET_COUNT = 100 // BUCKET_WIDTH
+
+# Share of attempts in the upper and lower groups used for discrimination
+DISCRIMINATION_GROUP = 0.27
+
+
+def _bucket(score):
+    return min(int(score // BUCKET_WIDTH), BUCKET_COUNT - 1)
+
+
+def _bucket_filter(index):
+    low = index * BUCKET_WIDTH
+    if index == BUCKET_COUNT - 1:
+        return Q(score__gte=low)
+    return Q(score__gte=low, score__lt=low + BUCKET_WIDTH)
+
+
+class QuizAnalytics:
+    """Score statistics and per-question item analysis for one quiz"""
+
+    def __init__(self, quiz_id, count=0, total=0.0, minimum=None, maximum=None,
+                 histogram=None, question_correct=None, median=None,
+                 discrimination=None):
+        self.quiz_id = quiz_id
+        self.count = count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+        self.histogram = histogram or [0] * BUCKET_COUNT
+        self.question_correct = question_correct or {}
+        # Order statistics cannot be updated incrementally; None means stale
+        self.median = median
+        self.discrimination = discrimination
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def buckets(self):
+        """(label, count) pairs for the score histogram"""
+        return [
+            (f"{i * BUCKET_WIDTH}-{100 if i == BUCKET_COUNT - 1 else (i + 1) * BUCKET_WIDTH - 1}%", n)
+            for i, n in enumerate(self.histogram)
+        ]
+
+    def difficulty(self, question_id):
+        """Share of completed attempts answering the question correctly"""
+        if not self.count:
+            return None
+        return self.question_correct.get(question_id, 0) / self.count
+
+    @property
+    def questions(self):
+        """Per-question difficulty and discrimination in quiz order"""
+        answer_key = get_answer_key(self.quiz_id)
+        discrimination = self.discrimination or {}
+        return [
+            {
+                'question': question,
+                'difficulty': self.difficulty(question.id),
+                'discrimination': discrimination.get(question.id),
+            }
+            for question in answer_key.questions
+        ]
+
+    @property
+    def is_stale(self):
+        return self.count > 0 and (self.median is None or self.discrimination is None)
+
+    def add_attempt(self, score, correct_question_ids):
+        """Fold one newly completed attempt into the running statistics"""
+        self.count += 1
+        self.total += score
+        self.minimum = score if self.minimum is None else min(self.minimum, score)
+        self.maximum = score if self.maximum is None else max(self.maximum, score)
+        self.histogram[_bucket(score)] += 1
+        for question_id in correct_question_ids:
+            self.question_correct[question_id] = self.question_correct.get(question_id, 0) + 1
+        self.median = None
+        self.discrimination = None
+
+
+def _completed_attempts(quiz_id):
+    return QuizAttempt.objects.filter(quiz_id=quiz_id, is_completed=True)
+
+
+def _median(attempts, count):
+    scores = attempts.order_by('score').values_list('score', flat=True)
+    middle = list(scores[(count - 1) // 2:count // 2 + 1]) if count else []
+    return sum(middle) / len(middle) if middle else None
+
+
+def _discrimination(attempts, count):
+    """Upper-group minus lower-group correct rate for each question"""
+    if count < 2:
+        return {}
+    group = max(int(round(count * DISCRIMINATION_GROUP)), 1)
+    ordered = attempts.order_by('score').values_list('score', flat=True)
+    lower_cut = ordered[group - 1]
+    upper_cut = ordered[count - group]
+    group_sizes = attempts.aggregate(
+        upper=Count('id', filter=Q(score__gte=upper_cut)),
+        lower=Count('id', filter=Q(score__lte=lower_cut)),
+    )
+    if not group_sizes['upper'] or not group_sizes['lower']:
+        return {}
+    rows = (
+        StudentAnswer.objects.filter(attempt__in=attempts, selected_choice__is_correct=True)
+        .values('question_id')
+        .annotate(
+            upper=Count('id', filter=Q(attempt__score__gte=upper_cut)),
+            lower=Count('id', filter=Q(attempt__score__lte=lower_cut)),
+        )
+    )
+    return {
+        row['question_id']: row['upper'] / group_sizes['upper'] - row['lower'] / group_sizes['lower']
+        for row in rows
+    }
+
+
+def _refresh_order_statistics(analytics):
+    attempts = _completed_attempts(analytics.quiz_id)
+    count = attempts.count()
+    analytics.median = _median(attempts, count)
+    analytics.discrimination = _discrimination(attempts, count)
+
+
+def compute_quiz_analytics(quiz_id):
+    """Compute all statistics for a quiz from aggregate queries"""
+    attempts = _completed_attempts(quiz_id)
+    summary = attempts.aggregate(
+        count=Count('id'),
+        mean=Avg('score'),
+        minimum=Min('score'),
+        maximum=Max('score'),
+        **{f'bucket_{i}': Count('id', filter=_bucket_filter(i)) for i in range(BUCKET_COUNT)}
+    )
+    question_correct = dict(
+        StudentAnswer.objects.filter(attempt__in=attempts, selected_choice__is_correct=True)
+        .values_list('question_id')
+        .annotate(correct=Count('id'))
+    )
+    analytics = QuizAnalytics(
+        quiz_id,
+        count=summary['count'],
+        total=(summary['mean'] or 0) * summary['count'],
+        minimum=summary['minimum'],
+        maximum=summary['maximum'],
+        histogram=[summary[f'bucket_{i}'] for i in range(BUCKET_COUNT)],
+        question_correct=question_correct,
+    )
+    _refresh_order_statistics(analytics)
+    return analytics
+
+
+def get_quiz_analytics(quiz_id):
+    """
+    Return cached analytics for a quiz.
+
+    Counts, mean, extremes, histogram and difficulty are kept up to date by
+    record_completed_attempt; median and discrimination are recomputed here
+    only when an attempt has completed since they were last calculated.
+    """
+    key = CACHE_KEY.format(quiz_id=quiz_id)
+    analytics = region.get(key)
+    if analytics is None:
+        analytics = compute_quiz_analytics(quiz_id)
+        region.set(key, analytics, CACHE_TIMEOUT)
+    elif analytics.is_stale:
+        _refresh_order_statistics(analytics)
+        region.set(key, analytics, CACHE_TIMEOUT)
+    return analytics
+
+
+def record_completed_attempt(quiz_id, score, correct_question_ids):
+    """Update cached analytics for a quiz with one newly completed attempt"""
+    key = CACHE_KEY.format(quiz_id=quiz_id)
+    analytics = region.get(key)
+    if analytics is None:
+        # Nothing cached yet; the next read computes everything from scratch
+        return
+    analytics.add_attempt(score, correct_question_ids)
+    region.set(key, analytics, CACHE_TIMEOUT)
+
+
+def invalidate_quiz_analytics(quiz_id):
+    region.delete(CACHE_KEY.format(quiz_id=quiz_id))
@@ -0,0 +1,136 @@
+import secrets
+
+from elearning.cache import get_region
+
+from .models import Choice, Question, Quiz
+
+# Keys carry the quiz's answer_key_version, which changes in the same
+# transaction as the questions and choices. Readers see the new version
+# exactly when the change commits, in every process, whatever the cache
+# backend; entries for old versions are never read again and expire.
+CACHE_KEY = 'quizzes:answer_key:{quiz_id}:{version}'
+
+region = get_region('quiz_keys')
+
+
+class ChoiceEntry:
+    __slots__ = ('id', 'choice_number', 'choice_text', 'is_correct')
+
+    def __init__(self, id, choice_number, choice_text, is_correct):
+        self.id = id
+        self.choice_number = choice_number
+        self.choice_text = choice_text
+        self.is_correct = is_correct
+
+    def __eq__(self, other):
+        return isinstance(other, ChoiceEntry) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class QuestionEntry:
+    __slots__ = ('id', 'question_number', 'question_text', 'choices')
+
+    def __init__(self, id, question_number, question_text, choices):
+        self.id = id
+        self.question_number = question_number
+        self.question_text = question_text
+        self.choices = choices
+
+
+class AnswerKey:
+    """
+    Immutable snapshot of a quiz's questions and choices.
+
+    Holds the ordered question and choice payloads used to render attempts
+    and results, plus question id to correct choice id lookups for grading.
+    """
+
+    def __init__(self, quiz_id, questions):
+        self.quiz_id = quiz_id
+        self.questions = questions
+        self.question_ids = [question.id for question in questions]
+        self.choices = {}
+        self.valid_choices = {}
+        self.correct_choices = {}
+        for question in questions:
+            self.valid_choices[question.id] = {choice.id for choice in question.choices}
+            self.correct_choices[question.id] = {choice.id for choice in question.choices if choice.is_correct}
+            for choice in question.choices:
+                self.choices[choice.id] = choice
+
+    def __getstate__(self):
+        return {'quiz_id': self.quiz_id, 'questions': self.questions}
+
+    def __setstate__(self, state):
+        self.__init__(state['quiz_id'], state['questions'])
+
+    @property
+    def total_questions(self):
+        return len(self.question_ids)
+
+    def correct_choice(self, question_id):
+        """Id of the (first) correct choice for a question, or None"""
+        return min(self.correct_choices.get(question_id, ()), default=None)
+
+    def is_valid(self, question_id, choice_id):
+        return choice_id in self.valid_choices.get(question_id, ())
+
+    def is_correct(self, question_id, choice_id):
+        return choice_id in self.correct_choices.get(question_id, ())
+
+    def score(self, answers):
+        """Percentage of all questions answered correctly"""
+        if not self.question_ids:
+            return 0
+        correct = sum(
+            1 for question_id, choice_id in answers.items()
+            if self.is_correct(question_id, choice_id)
+        )
+        return (correct / self.total_questions) * 100
+
+
+def build_answer_key(quiz_id):
+    """Load a quiz's questions and choices in two queries"""
+    choices = {}
+    for choice in (
+        Choice.objects.filter(question__quiz_id=quiz_id)
+        .order_by('choice_number', 'id')
+        .values_list('id', 'question_id', 'choice_number', 'choice_text', 'is_correct')
+    ):
+        choices.setdefault(choice[1], []).append(
+            ChoiceEntry(choice[0], choice[2], choice[3], choice[4])
+        )
+    questions = [
+        QuestionEntry(question_id, number, text, choices.get(question_id, []))
+        for question_id, number, text in (
+            Question.objects.filter(quiz_id=quiz_id)
+            .order_by('question_number', 'id')
+            .values_list('id', 'question_number', 'question_text')
+        )
+    ]
+    return AnswerKey(quiz_id, questions)
+
+
+def get_answer_key(quiz_id):
+    """
+    Return the cached answer key for the quiz's current version, building
+    it on a miss; costs one primary key lookup for the version.
+    """
+    version = Quiz.objects.filter(pk=quiz_id).values_list('answer_key_version', flat=True).first()
+    if version is None:
+        return build_answer_key(quiz_id)
+    return region.get_or_set(
+        CACHE_KEY.format(quiz_id=quiz_id, version=version), lambda: build_answer_key(quiz_id)
+    )
+
+
+def invalidate_answer_key(quiz_id):
+    """
+    Give the quiz a new answer key version in the current transaction.
+
+    Versions are random rather than counted so a rolled back change can
+    never hand its version, and anything cached under it, to a later one.
+    """
+    Quiz.objects.filter(pk=quiz_id).update(answer_key_version=secrets.randbits(63))
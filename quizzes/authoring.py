@@ -0,0 +1,224 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils.translation import gettext as _
+
+from .analytics import invalidate_quiz_analytics
+from .answer_keys import invalidate_answer_key
+from .models import Choice, Question, QuizAttempt
+from .tasks import rescore_quiz
+
+BATCH_SIZE = 500
+
+
+class QuestionDocument:
+    """Question text plus (choice text, is_correct) pairs in display order"""
+
+    def __init__(self, text, choices):
+        self.text = text
+        self.choices = choices
+
+
+class AuthoringReport:
+    """Row counts written by apply_quiz_document"""
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.deleted = 0
+
+    @property
+    def changed(self):
+        return bool(self.created or self.updated or self.deleted)
+
+    def __str__(self):
+        return f"{self.created} created, {self.updated} updated, {self.deleted} deleted"
+
+
+def quiz_form_documents(quiz=None, questions=5, choices=4):
+    """
+    Question documents to render in the quiz form: every question and
+    choice of ``quiz``, or a blank ``questions`` x ``choices`` grid.
+    """
+    if quiz is not None:
+        documents = [
+            QuestionDocument(question.question_text, [(choice.choice_text, choice.is_correct) for choice in question.choices.all()])
+            for question in Question.objects.filter(quiz=quiz).order_by('question_number').prefetch_related(
+                Prefetch('choices', queryset=Choice.objects.order_by('choice_number'))
+            )
+        ]
+        if documents:
+            return documents
+    return [QuestionDocument('', [('', False)] * choices) for _ in range(questions)]
+
+
+def parse_quiz_form(data):
+    """
+    Read ``question_<i>``, ``question_<i>_choice_<j>`` and
+    ``question_<i>_correct`` fields into question documents.
+
+    Questions and choices are numbered from 1 and read until the first
+    missing number, so the form is not tied to a fixed 5x4 layout.
+    """
+    questions = []
+    number = 1
+    while f'question_{number}' in data:
+        text = data.get(f'question_{number}', '').strip()
+        if not text:
+            raise ValidationError(_("All questions must be filled out."))
+
+        correct = data.get(f'question_{number}_correct')
+        if not correct:
+            raise ValidationError(_("Question {} must have a correct answer selected.").format(number))
+
+        choices = []
+        choice_number = 1
+        while f'question_{number}_choice_{choice_number}' in data:
+            choice_text = data.get(f'question_{number}_choice_{choice_number}', '').strip()
+            if not choice_text:
+                raise ValidationError(_("All choices for question {} must be filled out.").format(number))
+            choices.append((choice_text, str(choice_number) == correct))
+            choice_number += 1
+
+        questions.append(QuestionDocument(text, choices))
+        number += 1
+
+    if not questions:
+        raise ValidationError(_("All questions must be filled out."))
+    return questions
+
+
+def parse_question_json(raw):
+    """
+    Read the question editor's JSON payload into question documents.
+
+    Each item is ``{"question": ..., "options": [...], "correctOptions": [...]}``
+    where correct options are indexes into ``options``. Empty questions and
+    options are skipped.
+    """
+    try:
+        items = json.loads(raw)
+    except (TypeError, ValueError):
+        raise ValidationError(_("Invalid question data format."))
+    if not isinstance(items, list):
+        raise ValidationError(_("Invalid question data format."))
+
+    questions = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValidationError(_("Invalid question data format."))
+        text = str(item.get('question') or '').strip()
+        options = item.get('options') or []
+        correct = set(item.get('correctOptions') or [])
+        choices = [
+            (str(option).strip(), index in correct)
+            for index, option in enumerate(options)
+            if option and str(option).strip()
+        ]
+        if text and choices:
+            questions.append(QuestionDocument(text, choices))
+    return questions
+
+
+def apply_quiz_document(quiz, questions, append=False, delete_missing=True):
+    """
+    Make a quiz's questions and choices match ``questions``.
+
+    Existing rows are matched by question and choice number and compared
+    with the document; only changed rows are written, with bulk_create and
+    bulk_update, and surplus rows are removed with one delete per table.
+    With ``append`` the document is added after the existing questions
+    instead of replacing them; without ``delete_missing`` questions and
+    choices numbered past the end of the document are left alone.
+    """
+    report = AuthoringReport()
+
+    with transaction.atomic():
+        existing_questions = {
+            question.question_number: question
+            for question in Question.objects.filter(quiz=quiz).only('id', 'question_number', 'question_text')
+        }
+        existing_choices = {}
+        for choice in Choice.objects.filter(question__quiz=quiz).only(
+            'id', 'question_id', 'choice_number', 'choice_text', 'is_correct'
+        ):
+            existing_choices.setdefault(choice.question_id, {})[choice.choice_number] = choice
+
+        offset = max(existing_questions, default=0) if append else 0
+        new_questions = []
+        changed_questions = []
+        kept_question_ids = set()
+        for number, document in enumerate(questions, start=offset + 1):
+            question = existing_questions.get(number)
+            if question is None:
+                new_questions.append(Question(quiz=quiz, question_number=number, question_text=document.text))
+                continue
+            kept_question_ids.add(question.id)
+            if question.question_text != document.text:
+                question.question_text = document.text
+                changed_questions.append(question)
+
+        if new_questions:
+            Question.objects.bulk_create(new_questions, batch_size=BATCH_SIZE)
+        if changed_questions:
+            Question.objects.bulk_update(changed_questions, ['question_text'], batch_size=BATCH_SIZE)
+
+        created_by_number = {question.question_number: question for question in new_questions}
+        new_choices = []
+        changed_choices = []
+        stale_choice_ids = []
+        corrected_question_ids = set()
+        for number, document in enumerate(questions, start=offset + 1):
+            question = created_by_number.get(number) or existing_questions[number]
+            current = existing_choices.get(question.id, {})
+            for choice_number, (text, is_correct) in enumerate(document.choices, start=1):
+                choice = current.pop(choice_number, None)
+                if choice is None:
+                    new_choices.append(Choice(
+                        question=question, choice_number=choice_number,
+                        choice_text=text, is_correct=is_correct
+                    ))
+                elif choice.choice_text != text or choice.is_correct != is_correct:
+                    if choice.is_correct != is_correct:
+                        corrected_question_ids.add(question.id)
+                    choice.choice_text = text
+                    choice.is_correct = is_correct
+                    changed_choices.append(choice)
+            if delete_missing:
+                stale_choice_ids.extend(choice.id for choice in current.values())
+
+        if new_choices:
+            Choice.objects.bulk_create(new_choices, batch_size=BATCH_SIZE)
+        if changed_choices:
+            Choice.objects.bulk_update(changed_choices, ['choice_text', 'is_correct'], batch_size=BATCH_SIZE)
+
+        stale_question_ids = []
+        if delete_missing and not append:
+            stale_question_ids = [
+                question.id for question in existing_questions.values()
+                if question.id not in kept_question_ids
+            ]
+        if stale_choice_ids:
+            Choice.objects.filter(id__in=stale_choice_ids).delete()
+        if stale_question_ids:
+            Question.objects.filter(id__in=stale_question_ids).delete()
+
+        report.created = len(new_questions) + len(new_choices)
+        report.updated = len(changed_questions) + len(changed_choices)
+        report.deleted = len(stale_question_ids) + len(stale_choice_ids)
+
+        if report.changed:
+            # Bulk writes bypass the model signals that normally do this. The
+            # new answer key version commits together with the writes, so no
+            # grader or rescore job can pair the new questions with the old key
+            invalidate_answer_key(quiz.id)
+            transaction.on_commit(lambda: invalidate_quiz_analytics(quiz.id))
+
+        # Only corrected answers on existing questions change past scores;
+        # added or removed questions apply to attempts made from now on
+        if corrected_question_ids and QuizAttempt.objects.filter(quiz=quiz, is_completed=True).exists():
+            rescore_quiz.enqueue(quiz_id=quiz.id)
+
+    return report
@@ -0,0 +1,109 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .analytics import record_completed_attempt
+from .answer_keys import get_answer_key
+from .models import StudentAnswer
+
+
+def parse_submitted_answers(data):
+    """Read ``question_<id>`` = choice id pairs from submitted form data"""
+    answers = {}
+    for name, value in data.items():
+        if not name.startswith('question_'):
+            continue
+        try:
+            answers[int(name[len('question_'):])] = int(value)
+        except (TypeError, ValueError):
+            continue
+    return answers
+
+
+def grade_attempt(attempt, submitted, answer_key=None, completed_at=None):
+    """
+    Store a student's answers and score the attempt in one transaction.
+
+    Submitted choices are validated against the cached answer key,
+    previous answers are replaced with a single bulk_create, and the score
+    is computed without further queries.
+    """
+    if answer_key is None:
+        answer_key = get_answer_key(attempt.quiz_id)
+
+    answers = {
+        question_id: choice_id
+        for question_id, choice_id in submitted.items()
+        if answer_key.is_valid(question_id, choice_id)
+    }
+
+    with transaction.atomic():
+        StudentAnswer.objects.filter(attempt=attempt).delete()
+        StudentAnswer.objects.bulk_create([
+            StudentAnswer(attempt=attempt, question_id=question_id, selected_choice_id=choice_id)
+            for question_id, choice_id in answers.items()
+        ])
+        attempt.score = answer_key.score(answers)
+        attempt.question_count = answer_key.total_questions
+        attempt.is_completed = True
+        attempt.completed_at = completed_at or timezone.now()
+        attempt.save(update_fields=['score', 'question_count', 'is_completed', 'completed_at'])
+        _record_analytics(attempt, answer_key, answers)
+
+    return attempt.score
+
+
+def complete_attempt(attempt, completed_at=None, answer_key=None):
+    """Close an attempt with whatever answers were already stored"""
+    if answer_key is None:
+        answer_key = get_answer_key(attempt.quiz_id)
+    answers = dict(
+        StudentAnswer.objects.filter(attempt=attempt).values_list('question_id', 'selected_choice_id')
+    )
+    with transaction.atomic():
+        attempt.score = answer_key.score(answers)
+        attempt.question_count = answer_key.total_questions
+        attempt.is_completed = True
+        attempt.completed_at = completed_at or timezone.now()
+        attempt.save(update_fields=['score', 'question_count', 'is_completed', 'completed_at'])
+        _record_analytics(attempt, answer_key, answers)
+
+    return attempt.score
+
+
+def _record_analytics(attempt, answer_key, answers):
+    correct = [
+        question_id for question_id, choice_id in answers.items()
+        if answer_key.is_correct(question_id, choice_id)
+    ]
+    transaction.on_commit(
+        lambda: record_completed_attempt(attempt.quiz_id, attempt.score, correct)
+    )
+
+
+def score_stored_answers(attempt, answer_key=None):
+    """Score an attempt from the answers already stored for it"""
+    if answer_key is None:
+        answer_key = get_answer_key(attempt.quiz_id)
+    answers = dict(
+        StudentAnswer.objects.filter(attempt=attempt).values_list('question_id', 'selected_choice_id')
+    )
+    return answer_key.score(answers)
+
+
+def build_answer_results(answer_key, student_answers):
+    """
+    Pair every question of the answer key with the student's answer.
+
+    ``student_answers`` are StudentAnswer rows (typically prefetched); the
+    selected choice and its correctness come from the answer key, so no
+    further queries are made.
+    """
+    selected = {answer.question_id: answer.selected_choice_id for answer in student_answers}
+    return [
+        {
+            'question': question,
+            'selected_choice': answer_key.choices.get(selected.get(question.id)),
+            'is_correct': answer_key.is_correct(question.id, selected.get(question.id)),
+        }
+        for question in answer_key.questions
+    ]
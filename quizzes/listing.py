@@ -0,0 +1,127 @@
+import base64
+
+from django.db.models import Case, CharField, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Quiz, QuizAttempt
+
+PAGE_SIZE = 12
+
+STATUSES = ('available', 'upcoming', 'expired', 'completed')
+
+
+def student_quizzes(student, course_id=None, status=None, now=None):
+    """
+    Published quizzes annotated with the student's attempt status.
+
+    The latest completed attempt, its score and the availability window are
+    all evaluated in SQL, so a page of quizzes is a single query.
+    """
+    now = now or timezone.now()
+    completed = QuizAttempt.objects.filter(
+        quiz=OuterRef('pk'), student=student, is_completed=True
+    ).order_by('-completed_at', '-id')
+
+    quizzes = Quiz.objects.filter(is_published=True)
+    if course_id is not None:
+        quizzes = quizzes.filter(course_id=course_id)
+
+    quizzes = quizzes.annotate(
+        course_title=F('course__title'),
+        attempt_id=Subquery(completed.values('id')[:1]),
+        attempt_score=Subquery(completed.values('score')[:1]),
+        attempt_completed_at=Subquery(completed.values('completed_at')[:1]),
+        status=Case(
+            When(Exists(completed), then=Value('completed')),
+            When(start_time__gt=now, then=Value('upcoming')),
+            When(end_time__lt=now, then=Value('expired')),
+            default=Value('available'),
+            output_field=CharField(),
+        ),
+    ).only(
+        'id', 'title', 'description', 'time_limit', 'start_time', 'end_time', 'created_at'
+    )
+
+    if status in STATUSES:
+        quizzes = quizzes.filter(status=status)
+    return quizzes
+
+
+def encode_cursor(quiz):
+    value = f'{quiz.created_at.isoformat()}|{quiz.id}'
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor string, or None if it is malformed"""
+    try:
+        created_at, quiz_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        created_at = parse_datetime(created_at)
+        quiz_id = int(quiz_id)
+    except (TypeError, ValueError, UnicodeError):
+        return None
+    if created_at is None:
+        return None
+    return created_at, quiz_id
+
+
+class KeysetPage:
+    """One page of quizzes ordered newest first, addressed by cursors"""
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def keyset_page(queryset, after=None, before=None, page_size=PAGE_SIZE):
+    """
+    Slice a queryset ordered by (-created_at, -id) without OFFSET.
+
+    ``after`` continues past the last quiz of a page and ``before`` goes
+    back from the first one; each page costs one indexed range query.
+    """
+    after = decode_cursor(after) if after else None
+    before = decode_cursor(before) if before else None
+
+    if before:
+        created_at, quiz_id = before
+        rows = list(
+            queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=quiz_id))
+            .order_by('created_at', 'id')[:page_size + 1]
+        )
+        has_more = len(rows) > page_size
+        items = rows[:page_size][::-1]
+        return KeysetPage(
+            items,
+            next_cursor=encode_cursor(items[-1]) if items else None,
+            previous_cursor=encode_cursor(items[0]) if items and has_more else None,
+        )
+
+    if after:
+        created_at, quiz_id = after
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=quiz_id)
+        )
+    rows = list(queryset.order_by('-created_at', '-id')[:page_size + 1])
+    items = rows[:page_size]
+    return KeysetPage(
+        items,
+        next_cursor=encode_cursor(items[-1]) if len(rows) > page_size else None,
+        previous_cursor=encode_cursor(items[0]) if items and after else None,
+    )
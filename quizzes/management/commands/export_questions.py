@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from quizzes.models import Quiz
+from quizzes.question_bank import FORMATS, export_question_bank
+
+class Command(BaseCommand):
+    help = '将测验题库导出为 JSON Lines 或 CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', type=int, help='测验 ID')
+        parser.add_argument('--output', '-o', help='输出文件路径，默认输出到标准输出')
+        parser.add_argument('--format', choices=FORMATS, help='文件格式，默认根据扩展名判断')
+
+    def handle(self, *args, **options):
+        try:
+            quiz = Quiz.objects.get(id=options['quiz_id'])
+        except Quiz.DoesNotExist:
+            raise CommandError(f'测验 {options["quiz_id"]} 不存在')
+
+        path = options['output']
+        format = options['format'] or ('csv' if path and path.endswith('.csv') else 'jsonl')
+
+        if not path:
+            for chunk in export_question_bank(quiz, format=format):
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(path, 'w', encoding='utf-8', newline='') as output:
+            output.writelines(export_question_bank(quiz, format=format))
+        self.stdout.write(self.style.SUCCESS(f"题库已导出到 {path}"))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from quizzes.models import Quiz
+from quizzes.question_bank import BATCH_SIZE, FORMATS, import_question_bank
+
+class Command(BaseCommand):
+    help = '从 JSON Lines 或 CSV 文件导入题库到测验'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', type=int, help='目标测验 ID')
+        parser.add_argument('path', help='题库文件路径')
+        parser.add_argument('--format', choices=FORMATS, help='文件格式，默认根据扩展名判断')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='每批写入的题目数')
+
+    def handle(self, *args, **options):
+        try:
+            quiz = Quiz.objects.get(id=options['quiz_id'])
+        except Quiz.DoesNotExist:
+            raise CommandError(f'测验 {options["quiz_id"]} 不存在')
+
+        path = options['path']
+        format = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        verbosity = options['verbosity']
+
+        def progress(report):
+            if verbosity > 1:
+                self.stdout.write(f'已导入 {report.imported} 道题目')
+
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as lines:
+                report = import_question_bank(
+                    quiz, lines, format=format, batch_size=options['batch_size'], progress=progress
+                )
+        except OSError as e:
+            raise CommandError(f'无法读取文件: {e}')
+
+        for line_number, message in report.errors:
+            self.stderr.write(f'第 {line_number} 行: {message}')
+        if report.error_count > len(report.errors):
+            self.stderr.write(f'另有 {report.error_count - len(report.errors)} 个错误未显示')
+
+        self.stdout.write(self.style.SUCCESS(f'成功导入 {report.imported} 道题目到测验 "{quiz.title}"'))
+        if report.error_count:
+            self.stdout.write(self.style.WARNING(f'跳过 {report.error_count} 条无效记录'))
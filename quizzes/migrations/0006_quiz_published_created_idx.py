@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0005_auto_20250318_1504'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['is_published', '-created_at', '-id'], name='quiz_published_created_idx'),
+        ),
+    ]
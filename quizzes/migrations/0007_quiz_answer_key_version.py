@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_quiz_published_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='answer_key_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, help_text='Changed whenever questions or choices change; part of the answer key cache key', verbose_name='Answer Key Version'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0007_quiz_answer_key_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='question_count',
+            field=models.PositiveIntegerField(blank=True, help_text='Questions in the quiz when the attempt was graded', null=True, verbose_name='Question Count'),
+        ),
+    ]
@@ -35,11 +35,21 @@ class Quiz(models.Model):
     is_published = models.BooleanField(default=False, verbose_name=_('Is Published'))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Updated At'))
+    answer_key_version = models.PositiveBigIntegerField(
+        default=0,
+        editable=False,
+        help_text=_('Changed whenever questions or choices change; part of the answer key cache key'),
+        verbose_name=_('Answer Key Version')
+    )
     
     class Meta:
         verbose_name = _('Quiz')
         verbose_name_plural = _('Quizzes')
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the student quiz list
+            models.Index(fields=['is_published', '-created_at', '-id'], name='quiz_published_created_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -60,27 +70,16 @@ class Quiz(models.Model):
         return True
     
     def delete(self, *args, **kwargs):
-        """Override delete method for safe cascade deletion"""
-        try:
-            # Delete related attempts and answers
-            for attempt in self.attempts.all():
-                # Try to delete answers associated with this attempt
-                attempt.answers.all().delete()
-                attempt.delete()
-            
-            # Delete questions and choices
-            for question in self.questions.all():
-                question.choices.all().delete()
-                question.delete()
-            
-            # Call parent delete method
-            super().delete(*args, **kwargs)
-        except Exception as e:
-            # Log error and continue
-            print(f"Error deleting quiz: {e}")
-            
-            # Force delete quiz
-            super().delete(*args, **kwargs)
+        """Delete quiz with set-based deletes of its attempts, answers, questions and choices"""
+        from courses.deletion import delete_cascade
+        
+        counts = delete_cascade(Quiz._base_manager.filter(pk=self.pk))
+        # Dependants are deleted without signals; the quiz's own post_delete
+        # receivers drop its cached answer key, analytics and dashboards
+        models.signals.post_delete.send(sender=Quiz, instance=self, using=self._state.db, origin=self)
+        
+        self.pk = None
+        return sum(counts.values()), counts
 
 class Question(models.Model):
     """Question model - supports only multiple choice questions"""
@@ -153,6 +152,12 @@ class QuizAttempt(models.Model):
     started_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Started At'))
     completed_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Completed At'))
     is_completed = models.BooleanField(default=False, verbose_name=_('Is Completed'))
+    question_count = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text=_('Questions in the quiz when the attempt was graded'),
+        verbose_name=_('Question Count')
+    )
     
     class Meta:
         verbose_name = _('Quiz Attempt')
@@ -163,28 +168,14 @@ class QuizAttempt(models.Model):
         return f"{self.student.username}'s attempt on {self.quiz.title}"
     
     def calculate_score(self):
-        """Calculate quiz score"""
-        total_questions = self.quiz.questions.count()
-        if total_questions == 0:
-            return 0
-        
-        # Get the number of questions answered by the student
-        student_answers = StudentAnswer.objects.filter(attempt=self)
-        answered_questions_count = student_answers.count()
-        
-        # Get the number of correct answers
-        correct_answers = student_answers.filter(selected_choice__is_correct=True).count()
-        
-        # Add debug information
-        print(f"Debug - correct_answers: {correct_answers}, answered_questions: {answered_questions_count}, total_questions: {total_questions}")
+        """Calculate quiz score from the stored answers"""
+        from .grading import score_stored_answers
         
-        # Calculate the score based on number of correct answers divided by total questions
-        # This ensures 2 correct answers out of 5 questions gives 40% not 20%
-        score_percentage = (correct_answers / total_questions) * 100
-            
-        self.score = score_percentage
-        self.save()
-        return score_percentage
+        # Score is the number of correct answers divided by total questions,
+        # so 2 correct answers out of 5 questions gives 40%
+        self.score = score_stored_answers(self)
+        self.save(update_fields=['score'])
+        return self.score
 
 class StudentAnswer(models.Model):
     """Student answer model"""
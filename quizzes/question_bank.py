@@ -0,0 +1,243 @@
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+from django.utils.translation import gettext as _
+
+from .analytics import invalidate_quiz_analytics
+from .answer_keys import invalidate_answer_key
+from .authoring import QuestionDocument
+from .models import Choice, Question, Quiz
+
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+BATCH_SIZE = 500
+# Keep at most this many error lines in a report; the rest are only counted
+MAX_REPORTED_ERRORS = 200
+
+# Question banks are exchanged as one record per line:
+#   jsonl: {"question": "...", "choices": ["A", "B", ...], "correct": [2]}
+#   csv:   question,correct,choice_1,choice_2,...  with correct as "2" or "1;3"
+# Correct answers are 1-based choice numbers.
+
+
+class ImportReport:
+    """Outcome of a question bank import"""
+
+    def __init__(self):
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+    def __str__(self):
+        return f"{self.imported} imported, {self.error_count} errors"
+
+
+def parse_record(record):
+    """Validate one question bank record and return a QuestionDocument"""
+    if not isinstance(record, dict):
+        raise ValidationError(_("Record must be an object."))
+    text = str(record.get('question') or '').strip()
+    if not text:
+        raise ValidationError(_("Question text is required."))
+
+    choices = record.get('choices')
+    if not isinstance(choices, list) or len(choices) < 2:
+        raise ValidationError(_("At least two choices are required."))
+    choices = [str(choice).strip() for choice in choices]
+    if not all(choices):
+        raise ValidationError(_("Choices cannot be empty."))
+    if any(len(choice) > Choice._meta.get_field('choice_text').max_length for choice in choices):
+        raise ValidationError(_("Choice text is too long."))
+
+    correct = record.get('correct')
+    if isinstance(correct, int):
+        correct = [correct]
+    if not isinstance(correct, list) or not correct:
+        raise ValidationError(_("At least one correct choice is required."))
+    try:
+        correct = {int(number) for number in correct}
+    except (TypeError, ValueError):
+        raise ValidationError(_("Correct choices must be choice numbers."))
+    if not correct <= set(range(1, len(choices) + 1)):
+        raise ValidationError(_("Correct choice is out of range."))
+
+    return QuestionDocument(
+        text, [(choice, number in correct) for number, choice in enumerate(choices, start=1)]
+    )
+
+
+def _text_lines(lines):
+    """Decode byte lines and drop a byte order mark, as spreadsheet programs write"""
+    for index, line in enumerate(lines):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if index == 0:
+            line = line.lstrip('\ufeff')
+        yield line
+
+
+def _jsonl_records(lines):
+    for line_number, line in enumerate(_text_lines(lines), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, ValidationError(_("Invalid JSON."))
+
+
+def _csv_records(lines):
+    reader = csv.reader(_text_lines(lines))
+    header = next(reader, None)
+    if header is None:
+        return
+    for row in reader:
+        if not any(row):
+            continue
+        record = dict(zip(header, row))
+        yield reader.line_num, {
+            'question': record.get('question'),
+            'correct': [number for number in (record.get('correct') or '').split(';') if number],
+            'choices': [
+                record[name] for name in header
+                if name.startswith('choice_') and record.get(name)
+            ],
+        }
+
+
+def read_records(lines, format='jsonl'):
+    """Yield (line number, record or ValidationError) from an iterable of lines"""
+    if format == 'csv':
+        return _csv_records(lines)
+    return _jsonl_records(lines)
+
+
+def _append_batch(quiz, documents):
+    """Add documents after the quiz's last question; call in a transaction"""
+    # Lock the quiz so concurrent imports number their questions one after
+    # the other (SQLite connections already hold the write lock here)
+    Quiz.objects.select_for_update().filter(pk=quiz.pk).exists()
+    first_number = (Question.objects.filter(quiz=quiz).aggregate(last=Max('question_number'))['last'] or 0) + 1
+    questions = Question.objects.bulk_create([
+        Question(quiz=quiz, question_number=number, question_text=document.text)
+        for number, document in enumerate(documents, start=first_number)
+    ])
+    Choice.objects.bulk_create([
+        Choice(question=question, choice_number=number, choice_text=text, is_correct=is_correct)
+        for question, document in zip(questions, documents)
+        for number, (text, is_correct) in enumerate(document.choices, start=1)
+    ], batch_size=BATCH_SIZE * 4)
+    # Commits with the batch, so no grader sees the new questions with the old key
+    invalidate_answer_key(quiz.id)
+
+
+def import_question_bank(quiz, lines, format='jsonl', batch_size=BATCH_SIZE, progress=None):
+    """
+    Append questions streamed from ``lines`` to a quiz.
+
+    Records are validated one at a time and written in batches, each in its
+    own transaction, so memory use does not grow with the size of the bank.
+    Invalid lines are reported and skipped. ``progress`` is called with the
+    report after every batch.
+    """
+    report = ImportReport()
+    batch = []
+
+    def flush():
+        nonlocal batch
+        if not batch:
+            return
+        with transaction.atomic():
+            _append_batch(quiz, batch)
+        report.imported += len(batch)
+        batch = []
+        if progress:
+            progress(report)
+
+    try:
+        for line_number, record in read_records(lines, format):
+            try:
+                if isinstance(record, ValidationError):
+                    raise record
+                batch.append(parse_record(record))
+            except ValidationError as e:
+                report.add_error(line_number, e.messages[0])
+                continue
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    except (UnicodeDecodeError, csv.Error) as e:
+        report.add_error(None, str(e))
+    finally:
+        if report.imported:
+            invalidate_quiz_analytics(quiz.id)
+
+    return report
+
+
+def _iter_questions(quiz):
+    """(question text, [(choice text, is_correct)]) in order, from one streamed query"""
+    # Joined from the question side so questions without choices are kept
+    rows = (
+        Question.objects.filter(quiz=quiz)
+        .order_by('question_number', 'id', 'choices__choice_number')
+        .values_list('id', 'question_text', 'choices__choice_text', 'choices__is_correct')
+        .iterator(chunk_size=2000)
+    )
+    current_id = None
+    text = None
+    choices = []
+    for question_id, question_text, choice_text, is_correct in rows:
+        if question_id != current_id:
+            if current_id is not None:
+                yield text, choices
+            current_id, text, choices = question_id, question_text, []
+        if choice_text is not None:
+            choices.append((choice_text, is_correct))
+    if current_id is not None:
+        yield text, choices
+
+
+def _correct_numbers(choices):
+    return [number for number, (choice, is_correct) in enumerate(choices, start=1) if is_correct]
+
+
+def export_question_bank(quiz, format='jsonl'):
+    """Yield a quiz's questions as JSON Lines or CSV text, one record at a time"""
+    if format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def row(values):
+            writer.writerow(values)
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return value
+
+        width = Choice.objects.filter(question__quiz=quiz).aggregate(width=Max('choice_number'))['width'] or 0
+        yield row(['question', 'correct'] + [f'choice_{number}' for number in range(1, width + 1)])
+        for text, choices in _iter_questions(quiz):
+            correct = ';'.join(str(number) for number in _correct_numbers(choices))
+            yield row([text, correct] + [choice for choice, is_correct in choices])
+        return
+
+    for text, choices in _iter_questions(quiz):
+        yield json.dumps({
+            'question': text,
+            'choices': [choice for choice, is_correct in choices],
+            'correct': _correct_numbers(choices),
+        }, ensure_ascii=False) + '\n'
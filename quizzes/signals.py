@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .analytics import invalidate_quiz_analytics
+from .answer_keys import invalidate_answer_key
+from .models import Choice, Question, Quiz, QuizAttempt
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    """Question added, edited or removed, drop the cached answer key"""
+    invalidate_answer_key(instance.quiz_id)
+
+
+@receiver([post_save, post_delete], sender=Choice)
+def choice_changed(sender, instance, **kwargs):
+    """Choice text or correctness changed, drop the cached answer key"""
+    if Choice.question.is_cached(instance):
+        quiz_id = instance.question.quiz_id
+    else:
+        quiz_id = Question.objects.filter(pk=instance.question_id).values_list('quiz_id', flat=True).first()
+    if quiz_id is not None:
+        invalidate_answer_key(quiz_id)
+
+
+@receiver(post_delete, sender=Quiz)
+def quiz_deleted(sender, instance, **kwargs):
+    # Its answer keys can no longer be looked up, having no version
+    invalidate_quiz_analytics(instance.pk)
+
+
+@receiver(post_delete, sender=QuizAttempt)
+def attempt_deleted(sender, instance, **kwargs):
+    """Removed attempts cannot be subtracted incrementally, recompute later"""
+    invalidate_quiz_analytics(instance.quiz_id)
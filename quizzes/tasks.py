@@ -0,0 +1,38 @@
+from django.db.models import Count, Q
+
+from jobs.registry import task
+from .analytics import invalidate_quiz_analytics
+from .answer_keys import get_answer_key
+from .models import QuizAttempt
+
+
+@task('quizzes.rescore_quiz', queue='maintenance', concurrency=2)
+def rescore_quiz(quiz_id):
+    """
+    Recalculate completed attempt scores after answers to existing
+    questions were corrected.
+
+    Each attempt keeps the number of questions it was graded against, so
+    questions added or removed since do not change its score.
+    """
+    answer_key = get_answer_key(quiz_id)
+    attempts = list(
+        QuizAttempt.objects.filter(quiz_id=quiz_id, is_completed=True)
+        .annotate(correct=Count(
+            'answers',
+            filter=Q(answers__selected_choice__is_correct=True, answers__question_id__in=answer_key.question_ids)
+        ))
+        .only('id', 'score', 'question_count')
+    )
+    changed = []
+    for attempt in attempts:
+        # Attempts graded before question_count was stored use the current size
+        total = attempt.question_count or answer_key.total_questions
+        score = min(attempt.correct / total, 1) * 100 if total else 0
+        if attempt.score != score:
+            attempt.score = score
+            changed.append(attempt)
+    if changed:
+        QuizAttempt.objects.bulk_update(changed, ['score'], batch_size=500)
+        invalidate_quiz_analytics(quiz_id)
+    return {'attempts': len(attempts), 'rescored': len(changed)}
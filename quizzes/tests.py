@@ -1,3 +1,523 @@
+import io
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from courses.models import Course
+from elearning.cache import clear_regions
+from .analytics import get_quiz_analytics
+from .answer_keys import get_answer_key, region as answer_key_region
+from .authoring import QuestionDocument, apply_quiz_document, parse_question_json, parse_quiz_form
+from .grading import grade_attempt, parse_submitted_answers
+from .listing import keyset_page, student_quizzes
+from .question_bank import export_question_bank, import_question_bank
+from .models import Choice, Question, Quiz, QuizAttempt, StudentAnswer
+
+
+class QuizTestMixin:
+    """Shared fixtures for quiz tests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = CustomUser.objects.create_user(
+            username='teacher', email='teacher@example.com', user_type='teacher'
+        )
+        cls.student = CustomUser.objects.create_user(
+            username='student', email='student@example.com'
+        )
+        cls.course = Course.objects.create(
+            title='Course', instructor=cls.teacher, overview='Overview', is_published=True
+        )
+
+    def setUp(self):
+        clear_regions()
+
+    def create_quiz(self, questions=5, choices=4, **kwargs):
+        kwargs.setdefault('is_published', True)
+        kwargs.setdefault('time_limit', 0)
+        quiz = Quiz.objects.create(title='Quiz', course=self.course, **kwargs)
+        for number in range(1, questions + 1):
+            question = Question.objects.create(
+                quiz=quiz, question_text=f'Question {number}', question_number=number
+            )
+            for choice_number in range(1, choices + 1):
+                Choice.objects.create(
+                    question=question,
+                    choice_text=f'Choice {choice_number}',
+                    choice_number=choice_number,
+                    is_correct=choice_number == 1
+                )
+        return quiz
+
+    def submission(self, quiz, correct):
+        """Form data answering the first ``correct`` questions correctly"""
+        data = {}
+        for index, question in enumerate(quiz.questions.all()):
+            choice = question.choices.get(choice_number=1 if index < correct else 2)
+            data[f'question_{question.id}'] = choice.id
+        return data
+
+
+class QuizGradingTests(QuizTestMixin, TestCase):
+
+    def submit(self, quiz, data):
+        QuizAttempt.objects.create(quiz=quiz, student=self.student)
+        self.client.force_login(self.student)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('quizzes:quiz_attempt', args=[quiz.id]), data)
+        self.assertEqual(response.status_code, 302)
+        return QuizAttempt.objects.get(quiz=quiz, student=self.student), len(queries)
+
+    def test_score_and_answers(self):
+        quiz = self.create_quiz()
+        data = self.submission(quiz, correct=2)
+        # A choice from another question is ignored
+        other = Question.objects.filter(quiz=quiz).last().choices.first()
+        data[f'question_{quiz.questions.first().id}'] = other.id
+        attempt, _ = self.submit(quiz, data)
+        self.assertTrue(attempt.is_completed)
+        self.assertEqual(attempt.score, 20)
+        self.assertEqual(StudentAnswer.objects.filter(attempt=attempt).count(), 4)
+        self.assertEqual(attempt.calculate_score(), 20)
+
+    def test_query_count_does_not_grow_with_questions(self):
+        quiz = self.create_quiz(questions=2)
+        small, small_queries = self.submit(quiz, self.submission(quiz, correct=1))
+        small.delete()
+        quiz = self.create_quiz(questions=30)
+        large, large_queries = self.submit(quiz, self.submission(quiz, correct=30))
+        self.assertEqual(large.score, 100)
+        self.assertEqual(small_queries, large_queries)
+
+
+class AnswerKeyTests(QuizTestMixin, TestCase):
+
+    def test_cached_and_invalidated(self):
+        quiz = self.create_quiz(questions=3)
+        answer_key = get_answer_key(quiz.id)
+        self.assertEqual([q.question_number for q in answer_key.questions], [1, 2, 3])
+        first = quiz.questions.get(question_number=1)
+        self.assertEqual(answer_key.correct_choice(first.id), first.choices.get(choice_number=1).id)
+        # Only the version lookup
+        with self.assertNumQueries(1):
+            get_answer_key(quiz.id)
+
+        choice = first.choices.get(choice_number=2)
+        choice.is_correct = True
+        choice.save()
+        self.assertTrue(get_answer_key(quiz.id).is_correct(first.id, choice.id))
+
+        first.delete()
+        self.assertEqual(get_answer_key(quiz.id).total_questions, 2)
+
+    def test_old_versions_are_not_read(self):
+        quiz = self.create_quiz(questions=2)
+        old_key = get_answer_key(quiz.id)
+        old_version = Quiz.objects.get(pk=quiz.id).answer_key_version
+        try:
+            with transaction.atomic():
+                quiz.questions.first().delete()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(Quiz.objects.get(pk=quiz.id).answer_key_version, old_version)
+
+        quiz.questions.first().delete()
+        # The entry for the previous version is still cached, as it would be
+        # in another process's cache, but is no longer looked up
+        self.assertIsNotNone(answer_key_region.get(f'quizzes:answer_key:{quiz.id}:{old_version}'))
+        self.assertEqual(old_key.total_questions, 2)
+        self.assertEqual(get_answer_key(quiz.id).total_questions, 1)
+
+    def test_attempt_page_renders_from_key(self):
+        quiz = self.create_quiz(questions=3)
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('quizzes:quiz_attempt', args=[quiz.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Choice 4', count=3)
+
+
+class QuizResultViewTests(QuizTestMixin, TestCase):
+
+    def result_queries(self, questions):
+        quiz = self.create_quiz(questions=questions)
+        attempt = QuizAttempt.objects.create(quiz=quiz, student=self.student)
+        grade_attempt(attempt, parse_submitted_answers(self.submission(quiz, correct=1)))
+        self.client.force_login(self.student)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('quizzes:quiz_result', args=[attempt.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['correct_answers'], 1)
+        self.assertEqual(response.context['total_questions'], questions)
+        return len(queries)
+
+    def test_fixed_query_count(self):
+        # The answer key was cached while grading
+        small = self.result_queries(2)
+        self.assertEqual(self.result_queries(40), small)
+
+    def test_other_students_are_forbidden(self):
+        quiz = self.create_quiz(questions=1)
+        attempt = QuizAttempt.objects.create(quiz=quiz, student=self.student)
+        other = CustomUser.objects.create_user(username='other', email='other@example.com')
+        self.client.force_login(other)
+        response = self.client.get(reverse('quizzes:quiz_result', args=[attempt.id]))
+        self.assertEqual(response.status_code, 403)
+
+
+class QuizAnalyticsTests(QuizTestMixin, TestCase):
+
+    def grade(self, quiz, correct):
+        number = CustomUser.objects.count()
+        student = CustomUser.objects.create_user(
+            username=f'student{number}', email=f'student{number}@example.com'
+        )
+        attempt = QuizAttempt.objects.create(quiz=quiz, student=student)
+        grade_attempt(attempt, parse_submitted_answers(self.submission(quiz, correct=correct)))
+        return attempt
+
+    def test_statistics(self):
+        quiz = self.create_quiz(questions=4)
+        for correct in (0, 1, 2, 4):
+            self.grade(quiz, correct)
+        # Unfinished attempts are ignored
+        QuizAttempt.objects.create(quiz=quiz, student=self.student, score=90)
+
+        analytics = get_quiz_analytics(quiz.id)
+        self.assertEqual(analytics.count, 4)
+        self.assertAlmostEqual(analytics.mean, 43.75)
+        self.assertEqual(analytics.minimum, 0)
+        self.assertEqual(analytics.maximum, 100)
+        self.assertEqual(analytics.median, 37.5)
+        self.assertEqual(analytics.histogram[0], 1)
+        self.assertEqual(analytics.histogram[9], 1)
+        first, last = quiz.questions.first(), quiz.questions.last()
+        self.assertEqual(analytics.difficulty(first.id), 0.75)
+        self.assertEqual(analytics.difficulty(last.id), 0.25)
+        # Upper group answered every question, lower group none
+        self.assertEqual(analytics.discrimination[first.id], 1)
+
+    def test_cached_and_updated_incrementally(self):
+        quiz = self.create_quiz(questions=2)
+        self.grade(quiz, 2)
+        get_quiz_analytics(quiz.id)
+        with self.assertNumQueries(0):
+            get_quiz_analytics(quiz.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grade(quiz, 1)
+            self.grade(quiz, 0)
+        analytics = get_quiz_analytics(quiz.id)
+        self.assertEqual(analytics.count, 3)
+        self.assertEqual(analytics.mean, 50)
+        self.assertEqual(analytics.minimum, 0)
+        # Only the order statistics were recomputed
+        self.assertEqual(analytics.median, 50)
+
+    def test_teacher_detail_view(self):
+        quiz = self.create_quiz(questions=2)
+        self.grade(quiz, 1)
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('quizzes:quiz_detail', args=[quiz.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['avg_score'], 50)
+        self.assertEqual(response.context['highest_score'], 50)
+
+
+class StudentQuizListTests(QuizTestMixin, TestCase):
+
+    def test_status_annotations(self):
+        now = timezone.now()
+        available = self.create_quiz(questions=1)
+        upcoming = self.create_quiz(questions=1, start_time=now + timedelta(days=1))
+        expired = self.create_quiz(questions=1, end_time=now - timedelta(days=1))
+        completed = self.create_quiz(questions=1, end_time=now - timedelta(days=1))
+        self.create_quiz(questions=1, is_published=False)
+        attempt = QuizAttempt.objects.create(quiz=completed, student=self.student)
+        grade_attempt(attempt, parse_submitted_answers(self.submission(completed, correct=1)))
+
+        with self.assertNumQueries(1):
+            quizzes = {quiz.id: quiz for quiz in student_quizzes(self.student)}
+        self.assertEqual(len(quizzes), 4)
+        self.assertEqual(quizzes[available.id].status, 'available')
+        self.assertEqual(quizzes[upcoming.id].status, 'upcoming')
+        self.assertEqual(quizzes[expired.id].status, 'expired')
+        self.assertEqual(quizzes[completed.id].status, 'completed')
+        self.assertEqual(quizzes[completed.id].attempt_id, attempt.id)
+        self.assertEqual(quizzes[completed.id].attempt_score, 100)
+        self.assertEqual(
+            [quiz.id for quiz in student_quizzes(self.student, status='completed')], [completed.id]
+        )
+
+    def test_keyset_pages(self):
+        quizzes = [self.create_quiz(questions=0) for _ in range(5)]
+        expected = [quiz.id for quiz in reversed(quizzes)]
+        queryset = student_quizzes(self.student)
+
+        first = keyset_page(queryset, page_size=2)
+        self.assertFalse(first.has_previous)
+        second = keyset_page(queryset, after=first.next_cursor, page_size=2)
+        third = keyset_page(queryset, after=second.next_cursor, page_size=2)
+        self.assertEqual([q.id for page in (first, second, third) for q in page], expected)
+        self.assertFalse(third.has_next)
+
+        back = keyset_page(queryset, before=third.previous_cursor, page_size=2)
+        self.assertEqual([q.id for q in back], expected[2:4])
+        self.assertTrue(back.has_previous)
+        # Malformed cursors fall back to the first page
+        self.assertEqual([q.id for q in keyset_page(queryset, after='bogus', page_size=2)], expected[:2])
+
+    def test_list_view(self):
+        self.create_quiz(questions=1)
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('quizzes:quiz_list'), {'status': 'available'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['quizzes']), 1)
+        self.assertContains(response, 'Course')
+
+
+class QuizAuthoringTests(QuizTestMixin, TestCase):
+
+    def document(self, questions, choices=4, correct=1, prefix='Question'):
+        return [
+            QuestionDocument(
+                f'{prefix} {number}',
+                [(f'Choice {j}', j == correct) for j in range(1, choices + 1)]
+            )
+            for number in range(1, questions + 1)
+        ]
+
+    def test_bulk_import_uses_constant_queries(self):
+        quiz = self.create_quiz(questions=0)
+        with CaptureQueriesContext(connection) as queries:
+            report = apply_quiz_document(quiz, self.document(300))
+        self.assertEqual(report.created, 1500)
+        self.assertLess(len(queries), 20)
+        self.assertEqual(Choice.objects.filter(question__quiz=quiz, is_correct=True).count(), 300)
+
+    def test_only_changes_are_written(self):
+        quiz = self.create_quiz(questions=3)
+        get_answer_key(quiz.id)
+        document = self.document(2, choices=3)
+        document[0].text = 'Edited'
+        document[1].choices[0] = ('Choice 1', False)
+        document[1].choices[1] = ('Choice 2', True)
+
+        report = apply_quiz_document(quiz, document)
+        self.assertEqual(report.updated, 3)
+        # Question 3 and the fourth choice of the other two
+        self.assertEqual(report.deleted, 3)
+        self.assertEqual(list(quiz.questions.values_list('question_text', flat=True)), ['Edited', 'Question 2'])
+        self.assertEqual(get_answer_key(quiz.id).total_questions, 2)
+        self.assertFalse(apply_quiz_document(quiz, document).changed)
+
+    def test_answer_key_version_commits_with_the_edit(self):
+        quiz = self.create_quiz(questions=2)
+        version = Quiz.objects.get(pk=quiz.pk).answer_key_version
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                apply_quiz_document(quiz, self.document(3))
+                # Already bumped inside the transaction that wrote the questions
+                self.assertNotEqual(Quiz.objects.get(pk=quiz.pk).answer_key_version, version)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_append_and_json(self):
+        quiz = self.create_quiz(questions=2)
+        questions = parse_question_json(
+            '[{"question": "New", "options": ["A", "", "B"], "correctOptions": [2]},'
+            ' {"question": "", "options": ["A"]}]'
+        )
+        apply_quiz_document(quiz, questions, append=True)
+        question = quiz.questions.get(question_number=3)
+        self.assertEqual(list(question.choices.values_list('choice_text', 'is_correct')), [('A', False), ('B', True)])
+        with self.assertRaises(ValidationError):
+            parse_question_json('not json')
+
+    def test_parse_quiz_form(self):
+        data = {'question_1': 'Q', 'question_1_choice_1': 'A', 'question_1_choice_2': 'B', 'question_1_correct': '2'}
+        [question] = parse_quiz_form(data)
+        self.assertEqual(question.choices, [('A', False), ('B', True)])
+        data['question_1_correct'] = ''
+        with self.assertRaises(ValidationError):
+            parse_quiz_form(data)
+
+    def test_update_view(self):
+        quiz = self.create_quiz(questions=6)
+        data = {'title': 'Quiz', 'course': self.course.id, 'time_limit': 10}
+        for i in range(1, 6):
+            data[f'question_{i}'] = f'Updated {i}'
+            data[f'question_{i}_correct'] = '1'
+            for j in range(1, 5):
+                data[f'question_{i}_choice_{j}'] = f'Choice {j}'
+        self.client.force_login(self.teacher)
+        response = self.client.post(reverse('quizzes:quiz_edit', args=[quiz.id]), data)
+        self.assertRedirects(response, reverse('quizzes:teacher_quiz_list'), fetch_redirect_response=False)
+        # Questions past the form are kept
+        self.assertEqual(quiz.questions.count(), 6)
+        self.assertEqual(quiz.questions.filter(question_text__startswith='Updated').count(), 5)
+
+    def test_edit_form_keeps_every_choice(self):
+        quiz = self.create_quiz(questions=2, choices=6)
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('quizzes:quiz_edit', args=[quiz.id]))
+        self.assertContains(response, 'name="question_2_choice_6"')
+        self.assertNotContains(response, 'name="question_3"')
+
+        # A form that only has the first four choices leaves the others alone
+        data = {'title': 'Quiz', 'course': self.course.id, 'time_limit': 10}
+        for i in range(1, 3):
+            data[f'question_{i}'] = f'Question {i}'
+            data[f'question_{i}_correct'] = '2'
+            for j in range(1, 5):
+                data[f'question_{i}_choice_{j}'] = f'Choice {j}'
+        self.client.post(reverse('quizzes:quiz_edit', args=[quiz.id]), data)
+        self.assertEqual(Choice.objects.filter(question__quiz=quiz).count(), 12)
+        self.assertEqual(Choice.objects.filter(question__quiz=quiz, is_correct=True, choice_number=2).count(), 2)
+
+
+class QuestionBankTests(QuizTestMixin, TestCase):
+
+    def test_round_trip_between_quizzes(self):
+        source = self.create_quiz(questions=3, choices=3)
+        for format in ('jsonl', 'csv'):
+            target = self.create_quiz(questions=1)
+            lines = ''.join(export_question_bank(source, format=format)).splitlines(keepends=True)
+            report = import_question_bank(target, lines, format=format, batch_size=2)
+            self.assertEqual((report.imported, report.error_count), (3, 0))
+            self.assertEqual(
+                list(target.questions.values_list('question_number', flat=True)), [1, 2, 3, 4]
+            )
+            imported = target.questions.get(question_number=4)
+            self.assertEqual(imported.question_text, 'Question 3')
+            self.assertEqual(
+                list(imported.choices.values_list('choice_text', 'is_correct')),
+                [('Choice 1', True), ('Choice 2', False), ('Choice 3', False)]
+            )
+
+    def test_invalid_lines_are_reported(self):
+        quiz = self.create_quiz(questions=0)
+        lines = [
+            '{"question": "Good", "choices": ["A", "B"], "correct": [2]}\n',
+            'not json\n',
+            '\n',
+            '{"question": "Bad", "choices": ["A", "B"], "correct": [3]}\n',
+            '{"question": "", "choices": ["A", "B"], "correct": 1}\n',
+        ]
+        report = import_question_bank(quiz, lines)
+        self.assertEqual(report.imported, 1)
+        self.assertEqual([line for line, message in report.errors], [2, 4, 5])
+
+    def test_byte_order_mark_and_empty_questions(self):
+        quiz = self.create_quiz(questions=1)
+        content = '\ufeffquestion,correct,choice_1,choice_2\r\nSaved from Excel,2,A,B\r\n'.encode('utf-8')
+        report = import_question_bank(quiz, io.BytesIO(content), format='csv')
+        self.assertEqual((report.imported, report.error_count), (1, 0))
+        self.assertEqual(quiz.questions.get(question_number=2).question_text, 'Saved from Excel')
+
+        Question.objects.create(quiz=quiz, question_number=3, question_text='No choices yet')
+        lines = list(export_question_bank(quiz))
+        self.assertEqual(len(lines), 3)
+        self.assertIn('"choices": []', lines[2])
+
+    def test_export_and_import_views(self):
+        source = self.create_quiz(questions=2)
+        target = self.create_quiz(questions=0)
+        self.client.force_login(self.teacher)
+        response = self.client.get(
+            reverse('quizzes:question_bank_export', args=[source.id]), {'format': 'csv'}
+        )
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'question,correct,choice_1'))
+
+        upload = SimpleUploadedFile('bank.csv', content, content_type='text/csv')
+        response = self.client.post(
+            reverse('quizzes:question_bank_import', args=[target.id]), {'file': upload}
+        )
+        self.assertRedirects(response, reverse('quizzes:question_list', args=[target.id]))
+        self.assertEqual(target.questions.count(), 2)
+
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('quizzes:question_bank_export', args=[source.id]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_commands(self):
+        source = self.create_quiz(questions=2)
+        target = self.create_quiz(questions=0)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bank.jsonl')
+            call_command('export_questions', source.id, output=path, stdout=io.StringIO())
+            call_command('import_questions', target.id, path, stdout=io.StringIO())
+        self.assertEqual(target.questions.count(), 2)
+
+
+class QuizDeletionTests(QuizTestMixin, TestCase):
+
+    def delete_queries(self, attempts):
+        quiz = self.create_quiz(questions=3)
+        for number in range(attempts):
+            student = CustomUser.objects.create_user(
+                username=f'deleting{attempts}-{number}', email=f'deleting{attempts}-{number}@example.com'
+            )
+            attempt = QuizAttempt.objects.create(quiz=quiz, student=student)
+            grade_attempt(attempt, parse_submitted_answers(self.submission(quiz, correct=1)))
+        quiz_id = quiz.id
+        get_answer_key(quiz_id)
+        with CaptureQueriesContext(connection) as queries:
+            quiz.delete()
+        self.assertFalse(Question.objects.filter(quiz_id=quiz_id).exists())
+        self.assertFalse(StudentAnswer.objects.exists())
+        self.assertEqual(get_answer_key(quiz_id).total_questions, 0)
+        return len(queries)
+
+    def test_set_based(self):
+        self.assertEqual(self.delete_queries(2), self.delete_queries(20))
+
+
+class RescoreTests(QuizTestMixin, TestCase):
+
+    def test_answer_key_change_rescores_in_background(self):
+        from jobs.worker import run_pending
+
+        quiz = self.create_quiz(questions=2)
+        attempt = QuizAttempt.objects.create(quiz=quiz, student=self.student)
+        grade_attempt(attempt, parse_submitted_answers(self.submission(quiz, correct=1)))
+        self.assertEqual(attempt.score, 50)
+
+        document = [
+            QuestionDocument(question.question_text, [
+                (choice.choice_text, choice.choice_number == 2) for choice in question.choices.all()
+            ])
+            for question in quiz.questions.all()
+        ]
+        apply_quiz_document(quiz, document)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 50)
+        self.assertEqual(run_pending(), 1)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 50)
+        self.assertEqual(get_quiz_analytics(quiz.id).mean, 50)
+
+        # Added and removed questions apply to later attempts only
+        apply_quiz_document(quiz, document[:1], append=True)
+        import_question_bank(quiz, ['{"question": "Q", "choices": ["A", "B"], "correct": [1]}\n'])
+        self.assertEqual(run_pending(), 0)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 50)
 
-# Create your tests here.
+        # A correction after that is still scored out of the original two
+        document[0].choices[0] = (document[0].choices[0][0], True)
+        apply_quiz_document(quiz, document, delete_missing=False)
+        self.assertEqual(run_pending(), 1)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 100)
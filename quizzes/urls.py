@@ -20,6 +20,10 @@ urlpatterns = [
     
     # 问题管理
     path('manage/<int:quiz_id>/questions/', views.QuestionListView.as_view(), name='question_list'),
+    path('manage/<int:quiz_id>/questions/export/', 
+         views.QuestionBankExportView.as_view(), name='question_bank_export'),
+    path('manage/<int:quiz_id>/questions/import/', 
+         views.QuestionBankImportView.as_view(), name='question_bank_import'),
     path('manage/<int:quiz_id>/questions/create/', views.QuestionCreateView.as_view(), name='question_create'),
     path('manage/<int:quiz_id>/questions/<int:question_id>/edit/', 
          views.QuestionUpdateView.as_view(), name='question_update'),
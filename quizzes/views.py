@@ -7,12 +7,21 @@ from django.forms import modelform_factory
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.db import transaction
-from django.http import HttpResponseForbidden, JsonResponse
+from django.http import HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.core.exceptions import ValidationError
 import json
 
 from courses.models import Course
 from .models import Quiz, Question, Choice, QuizAttempt, StudentAnswer
 from .forms import QuizForm, QuestionForm, ChoiceForm, StudentAnswerForm, ChoiceFormSet
+from .answer_keys import get_answer_key
+from .analytics import get_quiz_analytics
+from .grading import build_answer_results, complete_attempt, grade_attempt, parse_submitted_answers
+from .listing import keyset_page, student_quizzes
+from .authoring import apply_quiz_document, parse_question_json, parse_quiz_form, quiz_form_documents
+from .question_bank import CONTENT_TYPES as QUESTION_BANK_CONTENT_TYPES, FORMATS as QUESTION_BANK_FORMATS
+from .question_bank import export_question_bank, import_question_bank
+from .tasks import rescore_quiz
 
 class QuizListView(LoginRequiredMixin, View):
     """Quiz List View"""
@@ -21,64 +30,21 @@ class QuizListView(LoginRequiredMixin, View):
         if hasattr(request.user, 'is_student') and request.user.is_student():
             # Get quizzes from all courses
             # Not using student_profile.enrolled_courses due to auto-registration logic
-            course_filter = {}
+            course_id = None
             if 'course' in request.GET and request.GET['course']:
                 try:
                     course_id = int(request.GET['course'])
-                    course_filter = {'id': course_id}
                 except (ValueError, TypeError):
                     pass
-                
-            enrolled_courses = Course.objects.filter(**course_filter)
-            
-            # Get published quizzes from these courses
-            available_quizzes = Quiz.objects.filter(
-                course__in=enrolled_courses,
-                is_published=True
-            ).order_by('-created_at')
-            
-            # Get completed quizzes and their attempt records
-            completed_attempts = QuizAttempt.objects.filter(
-                student=request.user,
-                is_completed=True
-            ).select_related('quiz')
             
-            completed_quiz_ids = [attempt.quiz_id for attempt in completed_attempts]
-            completed_attempts_dict = {attempt.quiz_id: attempt for attempt in completed_attempts}
+            # Status, latest attempt and availability are annotated in one query
+            quizzes = student_quizzes(request.user, course_id=course_id, status=request.GET.get('status'))
+            page = keyset_page(quizzes, after=request.GET.get('after'), before=request.GET.get('before'))
             
-            # Add status information for each quiz
-            now = timezone.now()
-            quizzes_with_status = []
-            
-            for quiz in available_quizzes:
-                quiz_status = {}
-                quiz_status['id'] = quiz.id
-                quiz_status['title'] = quiz.title
-                quiz_status['description'] = quiz.description
-                quiz_status['course'] = quiz.course
-                quiz_status['time_limit'] = quiz.time_limit
-                quiz_status['start_time'] = quiz.start_time
-                quiz_status['end_time'] = quiz.end_time
-                
-                # Check if the quiz has been completed
-                if quiz.id in completed_quiz_ids:
-                    quiz_status['status'] = 'completed'
-                    quiz_status['attempt'] = completed_attempts_dict[quiz.id]
-                # Check if the quiz can be taken
-                elif (quiz.start_time is None or now >= quiz.start_time) and (quiz.end_time is None or now <= quiz.end_time):
-                    quiz_status['status'] = 'available'
-                # Check if the quiz will start soon
-                elif quiz.start_time and now < quiz.start_time:
-                    quiz_status['status'] = 'upcoming'
-                # Check if the quiz has expired
-                elif quiz.end_time and now > quiz.end_time:
-                    quiz_status['status'] = 'expired'
-                
-                quizzes_with_status.append(quiz_status)
-                
             return render(request, 'quizzes/quiz_list.html', {
-                'quizzes': quizzes_with_status,
-                'enrolled_courses': enrolled_courses
+                'quizzes': page,
+                'page': page,
+                'enrolled_courses': Course.objects.only('id', 'title').order_by('title')
             })
         
         # Teacher view - display quizzes created by the teacher
@@ -108,16 +74,13 @@ class QuizDetailView(LoginRequiredMixin, View):
 
         # If it's a teacher, get all student attempt records
         if is_teacher:
-            attempts = QuizAttempt.objects.filter(quiz=quiz).order_by('-started_at')
-            context['attempts'] = attempts
+            context['attempts'] = QuizAttempt.objects.filter(quiz=quiz).order_by('-started_at')
             
-            # Calculate average and highest scores
-            if attempts.exists():
-                total_score = sum(attempt.score for attempt in attempts)
-                avg_score = total_score / attempts.count()
-                highest_score = max(attempt.score for attempt in attempts)
-                context['avg_score'] = avg_score
-                context['highest_score'] = highest_score
+            # Score statistics come from cached aggregate queries
+            analytics = get_quiz_analytics(quiz.id)
+            context['analytics'] = analytics
+            context['avg_score'] = analytics.mean
+            context['highest_score'] = analytics.maximum
             
             return render(request, 'quizzes/quiz_detail.html', context)
             
@@ -202,26 +165,20 @@ class QuizAttemptView(LoginRequiredMixin, View):
             defaults={'started_at': now}
         )
         
-        # Get quiz questions
-        questions = quiz.get_questions()
-        
-        # Prepare question forms
-        question_forms = []
-        for question in questions:
-            # Check if there is already an answer
-            try:
-                answer = StudentAnswer.objects.get(attempt=attempt, question=question)
-                form = StudentAnswerForm(instance=answer, question=question)
-            except StudentAnswer.DoesNotExist:
-                form = StudentAnswerForm(question=question)
-            
-            question_forms.append((question, form))
+        # Questions and choices come from the cached answer key
+        answer_key = get_answer_key(quiz.id)
+        selected = dict(
+            StudentAnswer.objects.filter(attempt=attempt).values_list('question_id', 'selected_choice_id')
+        )
+        question_answers = [
+            (question, selected.get(question.id)) for question in answer_key.questions
+        ]
         
         # Prepare context
         context = {
             'quiz': quiz,
             'attempt': attempt,
-            'question_forms': question_forms,
+            'question_answers': question_answers,
             'time_limit': quiz.time_limit,
             'end_time': attempt.started_at + timezone.timedelta(minutes=quiz.time_limit) if quiz.time_limit > 0 else None
         }
@@ -252,38 +209,12 @@ class QuizAttemptView(LoginRequiredMixin, View):
             now = timezone.now()
             end_time = attempt.started_at + timezone.timedelta(minutes=quiz.time_limit)
             if now > end_time:
-                attempt.is_completed = True
-                attempt.completed_at = end_time
-                attempt.save()
-                attempt.calculate_score()
+                complete_attempt(attempt, completed_at=end_time)
                 messages.warning(request, _("Time is up! Your answers have been automatically submitted."))
                 return redirect('quizzes:quiz_result', attempt_id=attempt.id)
         
-        # Process student answers
-        questions = quiz.get_questions()
-        for question in questions:
-            choice_id = request.POST.get(f'question_{question.id}')
-            if not choice_id:
-                continue
-            
-            try:
-                choice = Choice.objects.get(id=choice_id, question=question)
-                # Create or update answer
-                StudentAnswer.objects.update_or_create(
-                    attempt=attempt,
-                    question=question,
-                    defaults={'selected_choice': choice}
-                )
-            except Choice.DoesNotExist:
-                continue
-        
-        # Mark attempt as completed
-        attempt.is_completed = True
-        attempt.completed_at = timezone.now()
-        attempt.save()
-        
-        # Calculate score
-        attempt.calculate_score()
+        # Validate, store and score all answers at once
+        grade_attempt(attempt, parse_submitted_answers(request.POST))
         
         messages.success(request, _("Quiz completed! You can now view your results."))
         return redirect('quizzes:quiz_result', attempt_id=attempt.id)
@@ -291,38 +222,21 @@ class QuizAttemptView(LoginRequiredMixin, View):
 class QuizResultView(LoginRequiredMixin, View):
     """Quiz Result View"""
     def get(self, request, attempt_id):
-        attempt = get_object_or_404(QuizAttempt, id=attempt_id)
+        # Attempt, quiz and course in one query, the answers in one prefetch
+        attempt = get_object_or_404(
+            QuizAttempt.objects.select_related('quiz__course').prefetch_related('answers'),
+            id=attempt_id
+        )
         
         # Verify permission to view
-        if attempt.student != request.user and attempt.quiz.course.instructor != request.user:
+        if attempt.student_id != request.user.id and attempt.quiz.course.instructor_id != request.user.id:
             return HttpResponseForbidden(_("You don't have permission to view this quiz result."))
         
-        # Get questions and answers
-        questions = attempt.quiz.get_questions()
-        answers = []
-        
-        for question in questions:
-            try:
-                answer = StudentAnswer.objects.get(attempt=attempt, question=question)
-                is_correct = answer.selected_choice.is_correct
-                answers.append({
-                    'question': question,
-                    'selected_choice': answer.selected_choice,
-                    'is_correct': is_correct
-                })
-            except StudentAnswer.DoesNotExist:
-                # Questions without answers
-                answers.append({
-                    'question': question,
-                    'selected_choice': None,
-                    'is_correct': False
-                })
-        
-        # Add debug information
+        # Per-question correctness is computed in memory from the answer key
+        answer_key = get_answer_key(attempt.quiz_id)
+        answers = build_answer_results(answer_key, attempt.answers.all())
         correct_count = sum(1 for a in answers if a['is_correct'])
-        total_count = questions.count()
-        expected_score = (correct_count / total_count) * 100 if total_count > 0 else 0
-        print(f"Debug - view: correct_answers: {correct_count}, total_questions: {total_count}, expected_score: {expected_score}, actual_score: {attempt.score}")
+        total_count = answer_key.total_questions
         
         # Prepare context
         context = {
@@ -368,6 +282,7 @@ class QuizCreateView(LoginRequiredMixin, View):
         return render(request, 'quizzes/quiz_form.html', {
             'form': form,
             'courses': courses,
+            'form_questions': quiz_form_documents(),
             'is_create': True
         })
     
@@ -381,71 +296,23 @@ class QuizCreateView(LoginRequiredMixin, View):
         form.fields['course'].queryset = courses
         
         if form.is_valid():
-            # Save quiz
-            quiz = form.save()
-            
-            # Process 5 questions
-            questions_data = []
-            for i in range(1, 6):  # Fixed 5 questions
-                question_text = request.POST.get(f'question_{i}')
-                if not question_text:
-                    messages.error(request, _("All questions must be filled out."))
-                    return render(request, 'quizzes/quiz_form.html', {
-                        'form': form,
-                        'courses': courses,
-                        'is_create': True
-                    })
-                
-                # Create question
-                question = Question.objects.create(
-                    quiz=quiz,
-                    question_text=question_text,
-                    question_number=i
-                )
-                
-                # Process 4 choices
-                choices_data = []
-                correct_option = request.POST.get(f'question_{i}_correct')
-                
-                if not correct_option:
-                    messages.error(request, _(f"Question {i} must have a correct answer selected."))
-                    # Delete created question and choices
-                    question.delete()
-                    return render(request, 'quizzes/quiz_form.html', {
-                        'form': form,
-                        'courses': courses,
-                        'is_create': True
-                    })
-                    
-                correct_option_num = int(correct_option)
+            try:
+                questions = parse_quiz_form(request.POST)
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+            else:
+                # Save quiz, then its questions and choices in bulk
+                quiz = form.save()
+                apply_quiz_document(quiz, questions)
                 
-                for j in range(1, 5):  # Fixed 4 choices
-                    choice_text = request.POST.get(f'question_{i}_choice_{j}')
-                    is_correct = (j == correct_option_num)
-                    
-                    if not choice_text:
-                        messages.error(request, _(f"All choices for question {i} must be filled out."))
-                        return render(request, 'quizzes/quiz_form.html', {
-                            'form': form,
-                            'courses': courses,
-                            'is_create': True
-                        })
-                    
-                    # Create choice
-                    Choice.objects.create(
-                        question=question,
-                        choice_text=choice_text,
-                        is_correct=is_correct,
-                        choice_number=j
-                    )
-            
-            messages.success(request, _("Quiz created successfully!"))
-            return redirect('quizzes:teacher_quiz_list')
+                messages.success(request, _("Quiz created successfully!"))
+                return redirect('quizzes:teacher_quiz_list')
         
         # Form validation failed
         return render(request, 'quizzes/quiz_form.html', {
             'form': form,
             'courses': courses,
+            'form_questions': quiz_form_documents(),
             'is_create': True
         })
 
@@ -464,13 +331,11 @@ class QuizUpdateView(LoginRequiredMixin, View):
         courses = Course.objects.filter(instructor=request.user)
         form.fields['course'].queryset = courses
         
-        # Get quiz questions and choices
-        questions = quiz.get_questions()
-        
+        # Every question and choice, so saving the form keeps them all
         return render(request, 'quizzes/quiz_form.html', {
             'form': form,
             'quiz': quiz,
-            'questions': questions,
+            'form_questions': quiz_form_documents(quiz),
             'courses': courses,
             'is_create': False
         })
@@ -490,89 +355,24 @@ class QuizUpdateView(LoginRequiredMixin, View):
         form.fields['course'].queryset = courses
         
         if form.is_valid():
-            # Save quiz
-            quiz = form.save()
-            
-            # Process 5 questions
-            for i in range(1, 6):  # Fixed 5 questions
-                question_text = request.POST.get(f'question_{i}')
-                
-                if not question_text:
-                    messages.error(request, _("All questions must be filled out."))
-                    return render(request, 'quizzes/quiz_form.html', {
-                        'form': form,
-                        'quiz': quiz,
-                        'questions': quiz.get_questions(),
-                        'courses': courses,
-                        'is_create': False
-                    })
-                
-                # Get or create question
-                question = Question.objects.get_or_create(
-                    quiz=quiz,
-                    question_number=i,
-                    defaults={'question_text': question_text}
-                )[0]
-                
-                # Update question text
-                question.question_text = question_text
-                question.save()
-                
-                # Process 4 choices
-                correct_option = request.POST.get(f'question_{i}_correct')
-                
-                if not correct_option:
-                    messages.error(request, _(f"Question {i} must have a correct answer selected."))
-                    return render(request, 'quizzes/quiz_form.html', {
-                        'form': form,
-                        'quiz': quiz,
-                        'questions': quiz.get_questions(),
-                        'courses': courses,
-                        'is_create': False
-                    })
-                    
-                correct_option_num = int(correct_option)
-                
-                # First, reset all choices to not correct
-                existing_choices = Choice.objects.filter(question=question)
-                for choice in existing_choices:
-                    choice.is_correct = False
-                    choice.save()
+            try:
+                questions = parse_quiz_form(request.POST)
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+            else:
+                # Save quiz, then write only the questions and choices that changed;
+                # the form edits the first questions, imported ones past it are kept
+                quiz = form.save()
+                apply_quiz_document(quiz, questions, delete_missing=False)
                 
-                for j in range(1, 5):  # Fixed 4 choices
-                    choice_text = request.POST.get(f'question_{i}_choice_{j}')
-                    is_correct = (j == correct_option_num)
-                    
-                    if not choice_text:
-                        messages.error(request, _(f"All choices for question {i} must be filled out."))
-                        return render(request, 'quizzes/quiz_form.html', {
-                            'form': form,
-                            'quiz': quiz,
-                            'questions': quiz.get_questions(),
-                            'courses': courses,
-                            'is_create': False
-                        })
-                    
-                    # Get or create choice
-                    choice = Choice.objects.get_or_create(
-                        question=question,
-                        choice_number=j,
-                        defaults={'choice_text': choice_text, 'is_correct': is_correct}
-                    )[0]
-                    
-                    # Update choice
-                    choice.choice_text = choice_text
-                    choice.is_correct = is_correct
-                    choice.save()
-            
-            messages.success(request, _("Quiz updated successfully!"))
-            return redirect('quizzes:teacher_quiz_list')
+                messages.success(request, _("Quiz updated successfully!"))
+                return redirect('quizzes:teacher_quiz_list')
         
         # Form validation failed
         return render(request, 'quizzes/quiz_form.html', {
             'form': form,
             'quiz': quiz,
-            'questions': quiz.get_questions(),
+            'form_questions': quiz_form_documents(quiz),
             'courses': courses,
             'is_create': False
         })
@@ -588,54 +388,20 @@ class TeacherQuizListView(LoginRequiredMixin, View):
 
 class QuestionListView(LoginRequiredMixin, View):
     def get(self, request, quiz_id):
-        quiz = get_object_or_404(Quiz, id=quiz_id)
+        quiz = get_object_or_404(Quiz.objects.select_related('course'), id=quiz_id)
         
         # Check if the teacher is the instructor of the course
-        if quiz.course.instructor != request.user:
+        if quiz.course.instructor_id != request.user.id:
             messages.error(request, _("You can only manage questions for courses you teach."))
             return redirect('quizzes:teacher_quiz_list')
         
-        # Get question data from session and process
+        # Import question data left in the session by the question editor
         question_data = request.session.pop('question_data', None)
         if question_data:
-            # Process question data directly here, not using post method
-            import json
-            try:
-                questions_list = json.loads(question_data)
-                
-                # Create questions and choices
-                for idx, q_data in enumerate(questions_list):
-                    if not q_data.get('question', '') or not any(q_data.get('options', [])):
-                        continue  # Skip empty questions
-                    
-                    # Create question
-                    question = Question.objects.create(
-                        quiz=quiz,
-                        question_text=q_data['question'],
-                        question_type='multiple_choice',
-                        points=1,
-                        order=idx
-                    )
-                    
-                    # Create choices
-                    for opt_idx, option_text in enumerate(q_data['options']):
-                        if not option_text:
-                            continue  # Skip empty options
-                            
-                        Choice.objects.create(
-                            question=question,
-                            choice_text=option_text,
-                            is_correct=opt_idx in q_data.get('correctOptions', [])
-                        )
-                
-                messages.success(request, _("Questions added successfully!"))
-            except json.JSONDecodeError:
-                messages.error(request, _("Invalid question data format."))
-            except Exception as e:
-                messages.error(request, _("Error adding questions: {}").format(str(e)))
+            self.import_questions(request, quiz, question_data)
         
         # Get questions for this quiz
-        questions = quiz.questions.all().order_by('order')
+        questions = quiz.questions.prefetch_related('choices').order_by('question_number')
         
         context = {
             'quiz': quiz,
@@ -647,54 +413,77 @@ class QuestionListView(LoginRequiredMixin, View):
         return render(request, 'quizzes/question_list.html', context)
     
     def post(self, request, quiz_id):
-        quiz = get_object_or_404(Quiz, id=quiz_id)
+        quiz = get_object_or_404(Quiz.objects.select_related('course'), id=quiz_id)
         
         # Check if the teacher is the instructor of the course
-        if quiz.course.instructor != request.user:
+        if quiz.course.instructor_id != request.user.id:
             messages.error(request, _("You can only manage questions for courses you teach."))
             return redirect('quizzes:teacher_quiz_list')
         
         # Get question data from request or session
         question_data = request.POST.get('question_data', '')
         if not question_data and hasattr(request, 'session'):
-            question_data = request.session.get('question_data', '')
+            question_data = request.session.pop('question_data', '')
         
         if question_data:
-            import json
-            try:
-                questions_list = json.loads(question_data)
-                
-                # Create questions and choices
-                for idx, q_data in enumerate(questions_list):
-                    if not q_data.get('question', '') or not any(q_data.get('options', [])):
-                        continue  # Skip empty questions
-                    
-                    # Create question
-                    question = Question.objects.create(
-                        quiz=quiz,
-                        question_text=q_data['question'],
-                        question_type='multiple_choice',
-                        points=1,
-                        order=idx
-                    )
-                    
-                    # Create choices
-                    for opt_idx, option_text in enumerate(q_data['options']):
-                        if not option_text:
-                            continue  # Skip empty options
-                            
-                        Choice.objects.create(
-                            question=question,
-                            choice_text=option_text,
-                            is_correct=opt_idx in q_data.get('correctOptions', [])
-                        )
-                
-                messages.success(request, _("Questions added successfully!"))
-            except json.JSONDecodeError:
-                messages.error(request, _("Invalid question data format."))
-            except Exception as e:
-                messages.error(request, _("Error adding questions: {}").format(str(e)))
+            self.import_questions(request, quiz, question_data)
+        
+        return redirect('quizzes:question_list', quiz_id=quiz.id)
+    
+    def import_questions(self, request, quiz, question_data):
+        """Append questions from the editor's JSON payload in one transaction"""
+        try:
+            apply_quiz_document(quiz, parse_question_json(question_data), append=True)
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+        else:
+            messages.success(request, _("Questions added successfully!"))
+
+class QuestionBankExportView(LoginRequiredMixin, View):
+    """Stream a quiz's questions as JSON Lines or CSV"""
+    def get(self, request, quiz_id):
+        quiz = get_object_or_404(Quiz.objects.select_related('course'), id=quiz_id)
+        
+        if quiz.course.instructor_id != request.user.id:
+            return HttpResponseForbidden(_("You can only export questions for courses you teach."))
+        
+        format = request.GET.get('format', 'jsonl')
+        if format not in QUESTION_BANK_FORMATS:
+            format = 'jsonl'
         
+        response = StreamingHttpResponse(
+            export_question_bank(quiz, format=format),
+            content_type=f'{QUESTION_BANK_CONTENT_TYPES[format]}; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="quiz-{quiz.id}-questions.{format}"'
+        return response
+
+class QuestionBankImportView(LoginRequiredMixin, View):
+    """Append questions from an uploaded JSON Lines or CSV question bank"""
+    def post(self, request, quiz_id):
+        quiz = get_object_or_404(Quiz.objects.select_related('course'), id=quiz_id)
+        
+        if quiz.course.instructor_id != request.user.id:
+            messages.error(request, _("You can only manage questions for courses you teach."))
+            return redirect('quizzes:teacher_quiz_list')
+        
+        upload = request.FILES.get('file')
+        if upload is None:
+            messages.error(request, _("Please choose a question bank file."))
+            return redirect('quizzes:question_list', quiz_id=quiz.id)
+        
+        # The upload is read line by line, never loaded whole
+        format = 'csv' if upload.name.lower().endswith('.csv') else 'jsonl'
+        report = import_question_bank(quiz, upload, format=format)
+        
+        if report.imported:
+            messages.success(request, _("{} questions imported.").format(report.imported))
+        if report.error_count:
+            details = '; '.join(
+                _("line {}: {}").format(line_number, message)
+                for line_number, message in report.errors[:5]
+            )
+            messages.warning(request, _("{} records were skipped ({}).").format(report.error_count, details))
         return redirect('quizzes:question_list', quiz_id=quiz.id)
 
 class QuestionCreateView(View):
@@ -727,8 +516,9 @@ class QuestionDeleteView(View):
             messages.error(request, _("You can only delete questions for quizzes in courses you teach."))
             return redirect('quizzes:teacher_quiz_list')
         
-        # Delete question
+        # Delete question; completed attempts are rescored in the background
         question.delete()
+        rescore_quiz.enqueue(quiz_id=quiz_id, created_by=request.user)
         
         # Add success message
         messages.success(request, _("Question has been deleted successfully."))
@@ -0,0 +1,128 @@
+/*
+ * Chunked, resumable uploads for large files.
+ *
+ * A form opts in with data-chunked-upload="<target>" on its file input and
+ * data-upload-url="{% url 'courses:chunked_upload_start' %}" on the form.
+ * Files above CHUNKED_THRESHOLD are sent in parts before the form is
+ * submitted; the form then carries <field>_upload with the upload id
+ * instead of the file. The upload id is remembered per file, so reloading
+ * the page and choosing the same file resumes from the parts the server
+ * already has.
+ */
+(function () {
+    const CHUNKED_THRESHOLD = 20 * 1024 * 1024;
+    const RETRIES = 5;
+
+    function csrfToken(form) {
+        return form.querySelector('[name=csrfmiddlewaretoken]').value;
+    }
+
+    function storageKey(file) {
+        return 'chunked-upload:' + [file.name, file.size, file.lastModified].join(':');
+    }
+
+    async function hex(buffer) {
+        const digest = await crypto.subtle.digest('SHA-256', buffer);
+        return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    async function request(url, options, form) {
+        options.headers = Object.assign({'X-CSRFToken': csrfToken(form)}, options.headers || {});
+        options.credentials = 'same-origin';
+        for (let attempt = 1; ; attempt++) {
+            let response = null;
+            try {
+                response = await fetch(url, options);
+            } catch (error) {
+                // Network error
+                if (attempt >= RETRIES) throw error;
+            }
+            if (response && response.status < 500) {
+                const data = await response.json();
+                if (!response.ok) throw new Error(data.error || response.statusText);
+                return data;
+            }
+            if (response && attempt >= RETRIES) throw new Error(response.statusText);
+            // Back off before trying again
+            await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** attempt));
+        }
+    }
+
+    async function resume(baseUrl, file, form) {
+        const uploadId = localStorage.getItem(storageKey(file));
+        if (!uploadId) return null;
+        try {
+            const status = await request(baseUrl + uploadId + '/', {method: 'GET'}, form);
+            return status.status === 'uploading' || status.status === 'complete' ? status : null;
+        } catch (error) {
+            localStorage.removeItem(storageKey(file));
+            return null;
+        }
+    }
+
+    async function upload(input, form, onProgress) {
+        const file = input.files[0];
+        const baseUrl = form.dataset.uploadUrl;
+        let status = await resume(baseUrl, file, form);
+        if (!status) {
+            status = await request(baseUrl, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({target: input.dataset.chunkedUpload, filename: file.name, size: file.size}),
+            }, form);
+            localStorage.setItem(storageKey(file), status.upload_id);
+        }
+
+        const received = new Set(status.received);
+        let done = received.size;
+        for (let index = 0; index < status.part_count && status.status === 'uploading'; index++) {
+            if (received.has(index)) continue;
+            const blob = file.slice(index * status.chunk_size, (index + 1) * status.chunk_size);
+            const buffer = await blob.arrayBuffer();
+            await request(baseUrl + status.upload_id + '/parts/' + index + '/', {
+                method: 'PUT',
+                headers: {'X-Part-SHA256': await hex(buffer)},
+                body: buffer,
+            }, form);
+            onProgress(++done / status.part_count);
+        }
+        if (status.status === 'uploading') {
+            status = await request(baseUrl + status.upload_id + '/complete/', {method: 'POST'}, form);
+        }
+        localStorage.removeItem(storageKey(file));
+        return status.upload_id;
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('input[type=file][data-chunked-upload]').forEach(function (input) {
+            const form = input.form;
+            const progress = document.createElement('div');
+            progress.className = 'form-text';
+            input.after(progress);
+
+            form.addEventListener('submit', async function (event) {
+                const file = input.files[0];
+                if (!file || file.size < CHUNKED_THRESHOLD || form.dataset.uploaded) return;
+                event.preventDefault();
+                form.querySelectorAll('[type=submit]').forEach(button => button.disabled = true);
+                try {
+                    const uploadId = await upload(input, form, function (fraction) {
+                        progress.textContent = 'Uploaded ' + Math.round(fraction * 100) + '%';
+                    });
+                    const hidden = document.createElement('input');
+                    hidden.type = 'hidden';
+                    hidden.name = input.name + '_upload';
+                    hidden.value = uploadId;
+                    form.appendChild(hidden);
+                    // The file is already on the server
+                    input.value = '';
+                    form.dataset.uploaded = 'true';
+                    form.submit();
+                } catch (error) {
+                    progress.textContent = 'Upload interrupted: ' + error.message + '. Submit again to resume.';
+                    form.querySelectorAll('[type=submit]').forEach(button => button.disabled = false);
+                }
+            });
+        });
+    });
+})();
@@ -0,0 +1,32 @@
+/*
+ * Waiting for background jobs.
+ *
+ * Views that queue a job answer 202 with {job_id, status_url}. waitForJob
+ * polls the status URL until the job has finished and resolves with the
+ * job's result, or rejects when it failed or took longer than TIMEOUT.
+ *
+ *     waitForJob(data.status_url).then(result => show(result.response));
+ */
+(function () {
+    const INTERVAL = 1000;
+    const MAX_INTERVAL = 5000;
+    const TIMEOUT = 3 * 60 * 1000;
+
+    async function waitForJob(statusUrl) {
+        const deadline = Date.now() + TIMEOUT;
+        let interval = INTERVAL;
+        while (Date.now() < deadline) {
+            await new Promise(resolve => setTimeout(resolve, interval));
+            const response = await fetch(statusUrl, {credentials: 'same-origin'});
+            const data = await response.json();
+            if (!response.ok) throw new Error(data.error || response.statusText);
+            if (data.status === 'succeeded') return data.result;
+            if (data.status === 'failed') throw new Error(data.error || 'Job failed');
+            // Poll less often the longer the job is queued or running
+            interval = Math.min(interval * 1.5, MAX_INTERVAL);
+        }
+        throw new Error('Timed out waiting for the job');
+    }
+
+    window.waitForJob = waitForJob;
+})();